@@ -0,0 +1,81 @@
+"""
+コマンドライン一括描画のスループットを計測するベンチマーク。
+
+約 2 KB・8 変数のテンプレートと JSONL の変数ファイルを生成し、
+ワーカー数 1, 2, 4, 8 で cli.main を実行したときの 1 秒あたりの行数を表示します。
+出力は入力の順になっていることも確認します。
+
+使い方:
+    python benchmarks/bench_cli_render.py [行数]
+"""
+
+import os
+import sys
+import json
+import time
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cli
+
+ROW_COUNT = 200_000
+VARIABLE_COUNT = 8
+WORKER_COUNTS = (1, 2, 4, 8)
+
+
+def build_files(directory, row_count):
+    """テンプレートと変数ファイルを作成し、それぞれのパスを返す。"""
+    filler = "次の条件に従って回答してください。Answer the question using the context below.\n" * 3
+    template = ''.join(f"{filler}{{{{var_{i}}}}}\n" for i in range(VARIABLE_COUNT)) + "ID: {{id}}"
+    template_path = os.path.join(directory, 'template.txt')
+    with open(template_path, 'w', encoding='utf-8') as f:
+        f.write(template)
+    rows_path = os.path.join(directory, 'rows.jsonl')
+    with open(rows_path, 'w', encoding='utf-8') as f:
+        for row in range(row_count):
+            values = {f"var_{i}": f"値 {row}-{i} " * 4 for i in range(VARIABLE_COUNT)}
+            values['id'] = row
+            f.write(json.dumps(values, ensure_ascii=False))
+            f.write('\n')
+    return template_path, rows_path
+
+
+def run(template_path, rows_path, output_path, workers):
+    """cli.main を実行して経過時間を返す。"""
+    argv = ['--template-file', template_path, '--input', rows_path,
+            '--output-format', 'jsonl', '--workers', str(workers)]
+    with open(output_path, 'w', encoding='utf-8') as stdout:
+        start = time.perf_counter()
+        if cli.main(argv, stdout=stdout) != 0:
+            raise RuntimeError("描画に失敗しました。")
+        return time.perf_counter() - start
+
+
+def check_order(output_path, row_count):
+    """出力が入力の順に並んでいることを確認する。"""
+    with open(output_path, 'r', encoding='utf-8') as f:
+        for expected, line in enumerate(f):
+            if not json.loads(line)['prompt'].endswith(f"ID: {expected}"):
+                raise AssertionError(f"{expected} 行目の順序が正しくありません。")
+    if expected != row_count - 1:
+        raise AssertionError("出力の行数が一致しません。")
+
+
+def main():
+    row_count = int(sys.argv[1]) if len(sys.argv) > 1 else ROW_COUNT
+    print(f"CPU コア数: {os.cpu_count()}, 行数: {row_count:,}")
+    with tempfile.TemporaryDirectory() as directory:
+        template_path, rows_path = build_files(directory, row_count)
+        output_path = os.path.join(directory, 'out.jsonl')
+        baseline = None
+        for workers in WORKER_COUNTS:
+            elapsed = run(template_path, rows_path, output_path, workers)
+            check_order(output_path, row_count)
+            rate = row_count / elapsed
+            baseline = baseline or rate
+            print(f"workers={workers}: {elapsed:6.2f} 秒  {rate:10,.0f} 行/秒  (x{rate / baseline:.2f})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+大きなプロンプトの書き出しのベンチマーク。
+
+約 10 MB の値を持つプロンプトについて、メインスレッドでまとめて作成した場合に UI が止まる時間と、
+ExportJob でバックグラウンドに回した場合のメインスレッドの最長の停止時間 (poll の間隔) を比較します。
+ファイルに結び付けた変数をファイルへ書き出す場合のピークメモリも表示します。
+
+使い方:
+    python benchmarks/bench_export.py [MB]
+"""
+
+import os
+import sys
+import time
+import tempfile
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from template_engine import CompiledTemplate
+from file_values import FileValue
+from export import ExportJob, export_to_file, prepare_clipboard_text
+
+TEMPLATE = "次の文書を要約してください。\n\n{{document}}\n\n観点: {{focus}}"
+POLL_SECONDS = 0.05
+
+
+def run_job(function, *args):
+    """ExportJob を実行し、経過時間と poll 1回あたりの最長時間 (UI が止まる時間) を返す。"""
+    start = time.perf_counter()
+    job = ExportJob(function, *args)
+    longest = 0.0
+    while True:
+        poll_start = time.perf_counter()
+        done = job.poll()
+        longest = max(longest, time.perf_counter() - poll_start)
+        if done:
+            break
+        time.sleep(POLL_SECONDS)
+    if job.error is not None:
+        raise job.error
+    return time.perf_counter() - start, longest
+
+
+def main():
+    megabytes = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    document = "これは大きな文書の1行です。This is one line of a large document.\n" * (megabytes * 1024 * 1024 // 90)
+    compiled = CompiledTemplate(TEMPLATE)
+    values = {'document': document, 'focus': "結論"}
+    print(f"prompt: {len(document) / 1e6:.1f} M chars")
+
+    start = time.perf_counter()
+    ''.join(compiled.stream(values)).strip()
+    print(f"  main thread copy prep : UI blocked {(time.perf_counter() - start) * 1000:7.1f} ms")
+    elapsed, longest = run_job(prepare_clipboard_text, compiled, values)
+    print(f"  ExportJob copy prep   : total {elapsed * 1000:7.1f} ms, longest poll {longest * 1000:5.2f} ms")
+
+    with tempfile.TemporaryDirectory() as directory:
+        source = os.path.join(directory, 'document.txt')
+        with open(source, 'w', encoding='utf-8') as f:
+            f.write(document)
+        del document, values
+        file_values = {'document': FileValue(source), 'focus': "結論"}
+        tracemalloc.start()
+        elapsed, longest = run_job(export_to_file, compiled, file_values, os.path.join(directory, 'out.txt'))
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print(f"  ExportJob file export : total {elapsed * 1000:7.1f} ms, longest poll {longest * 1000:5.2f} ms,"
+              f" peak memory {peak / 1e6:5.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
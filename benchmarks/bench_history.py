@@ -0,0 +1,73 @@
+"""
+テンプレートの版の履歴のベンチマーク。
+
+約 20 KB のテンプレートを数行ずつ編集して保存することを繰り返し、履歴のデータベースの大きさを
+各版を別のテンプレートとして複製した場合の大きさと比較します。
+任意の版の復元にかかる時間 (最悪の場合と平均) も表示します。
+
+使い方:
+    python benchmarks/bench_history.py [版数]
+"""
+
+import os
+import sys
+import time
+import random
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from history import TemplateHistory, HISTORY_SNAPSHOT_INTERVAL
+
+VERSION_COUNT = 200
+LINE_COUNT = 400
+
+
+def edit(lines, rng, number):
+    """数行を書き換え、ときどき行を追加・削除する。"""
+    lines = lines[:]
+    for _ in range(rng.randint(1, 3)):
+        lines[rng.randrange(len(lines))] = f"編集 {number}: {{{{value}}}} を使って説明してください。\n"
+    if number % 3 == 0:
+        lines.insert(rng.randrange(len(lines)), "追加された注意事項の行です。\n")
+    if number % 5 == 0:
+        del lines[rng.randrange(len(lines))]
+    return lines
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else VERSION_COUNT
+    rng = random.Random(0)
+    lines = [f"{i:03d}: あなたは {{{{role}}}} です。次の規約に従ってください。\n" for i in range(LINE_COUNT)]
+    versions = []
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'history.db')
+        history = TemplateHistory(path)
+        start = time.perf_counter()
+        for number in range(count):
+            lines = edit(lines, rng, number)
+            versions.append(''.join(lines))
+            history.record('テンプレート', versions[-1])
+        record_ms = (time.perf_counter() - start) * 1000 / count
+        history.close()
+
+        history = TemplateHistory(path)  # キャッシュのない状態で復元する
+        timings = []
+        for version in range(1, count + 1):
+            start = time.perf_counter()
+            assert history.get('テンプレート', version) == versions[version - 1]
+            timings.append((time.perf_counter() - start) * 1000)
+        history.close()
+
+        history_bytes = os.path.getsize(path)
+        copies_bytes = sum(len(text.encode('utf-8')) for text in versions)
+        print(f"{count} versions of a {len(versions[-1].encode('utf-8')) / 1024:.1f} KB template"
+              f" (snapshot every {HISTORY_SNAPSHOT_INTERVAL})")
+        print(f"  full copies : {copies_bytes / 1e6:7.2f} MB")
+        print(f"  history.db  : {history_bytes / 1e6:7.2f} MB ({history_bytes / copies_bytes:.1%})")
+        print(f"  record      : {record_ms:6.2f} ms/version")
+        print(f"  rebuild     : avg {sum(timings) / len(timings):6.2f} ms, worst {max(timings):6.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
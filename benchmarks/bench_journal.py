@@ -0,0 +1,80 @@
+"""
+JSON保存形式のジャーナルによる保存時間のベンチマーク。
+
+10k 件と 100k 件のプロンプトについて、update_prompt 1回あたりの時間 (ジャーナルへの追記) と、
+以前のようにライブラリ全体をシリアライズして書き直す時間を比較します。
+あわせて、ジャーナルに操作が残っている状態での読み込み (スナップショット + ジャーナルの再生) の時間を表示します。
+
+使い方:
+    python benchmarks/bench_journal.py [件数 ...]
+"""
+
+import os
+import sys
+import json
+import time
+import tempfile
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import persistence
+from models import PromptManager
+
+PROMPT_COUNTS = (10_000, 100_000)
+EDITS = 200
+
+
+def build_snapshot(directory, count):
+    """prompts.json を作成する。"""
+    body = "次の文章を要約してください。Summarize the following text. {{text}}\n" * 4
+    prompts = [{'name': f"テンプレート {i:06d}", 'template': f"{i}: {body}"} for i in range(count)]
+    with open(os.path.join(directory, 'prompts.json'), 'w', encoding='utf-8') as f:
+        json.dump(prompts, f, ensure_ascii=False)
+
+
+def full_rewrite(path, prompts):
+    """ジャーナルを使わない場合に1回の保存で行っていた、全体のシリアライズと書き直し。"""
+    data = [{'name': p['name'], 'template': p['template']} for p in prompts]
+    persistence.atomic_write(path, json.dumps(data, ensure_ascii=False, indent=2).encode('utf-8'))
+
+
+def measure(count):
+    with tempfile.TemporaryDirectory() as directory:
+        build_snapshot(directory, count)
+        manager = PromptManager('json', appdata_path=directory, lazy_templates=False)
+        names = manager.names()[::max(1, count // EDITS)][:EDITS]
+
+        journal = []
+        for i, name in enumerate(names):
+            start = time.perf_counter()
+            manager.update_prompt(name, f"edited {i}")
+            journal.append(time.perf_counter() - start)
+        persistence.flush_all()
+
+        rewrite = []
+        for _ in range(5):
+            start = time.perf_counter()
+            full_rewrite(os.path.join(directory, 'prompts.bench.json'), manager.prompts)
+            rewrite.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        reloaded = PromptManager('json', appdata_path=directory, lazy_templates=False)
+        load_ms = (time.perf_counter() - start) * 1000
+        assert reloaded.prompts == manager.prompts
+
+        journal_ms = statistics.median(journal) * 1000
+        rewrite_ms = statistics.median(rewrite) * 1000
+        print(f"{count:>8,} prompts: journal save {journal_ms:7.2f} ms (max {max(journal) * 1000:7.2f})"
+              f" | full rewrite {rewrite_ms:8.1f} ms | x{rewrite_ms / journal_ms:6.0f}"
+              f" | load with journal {load_ms:7.1f} ms")
+
+
+def main():
+    counts = [int(arg) for arg in sys.argv[1:]] or PROMPT_COUNTS
+    for count in counts:
+        measure(count)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+保存形式ごとの読み込み時間とメモリ使用量のベンチマーク。
+
+約 2 KB の本文を持つ 100k 件のプロンプトについて、PromptManager の作成
+(一覧を表示できるようになるまで) にかかる時間と、その時点のメモリ増加量 (tracemalloc) を
+json / sqlite / sqlite (lazy) / packed で比較します。あわせて get_prompt で本文を
+取り出す時間と、100 件の本文を開いた後のメモリ増加量を表示します。
+
+使い方:
+    python benchmarks/bench_packed_storage.py [件数]
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import tempfile
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import PromptManager
+
+PROMPT_COUNT = 100_000
+OPENED = 100
+CASES = (('json', False), ('sqlite', False), ('sqlite', True), ('packed', False))
+
+
+def build_data_dir(directory, count):
+    """prompts.json を作成し、各形式のファイルを事前に作成しておく。"""
+    body = "次の文章を要約してください。Summarize the following text. {{text}}\n" * 30
+    prompts = [{'name': f"テンプレート {i:06d}", 'template': f"{i}: {body}"} for i in range(count)]
+    with open(os.path.join(directory, 'prompts.json'), 'w', encoding='utf-8') as f:
+        json.dump(prompts, f, ensure_ascii=False)
+    close(PromptManager('sqlite', appdata_path=directory, lazy_templates=True))
+    close(PromptManager('packed', appdata_path=directory))
+
+
+def close(manager):
+    """PromptManager が開いているファイルを閉じる。"""
+    storage = manager.storage
+    if hasattr(storage, 'connection'):
+        storage.connection.close()
+    elif hasattr(storage, 'close'):
+        storage.close()
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else PROMPT_COUNT
+    names = [f"テンプレート {i:06d}" for i in random.Random(0).sample(range(count), OPENED)]
+    with tempfile.TemporaryDirectory() as directory:
+        build_data_dir(directory, count)
+        print(f"{count:,} prompts")
+        for backend, lazy in CASES:
+            # 時間は tracemalloc の負荷を含まないよう、メモリとは別に計測する
+            start = time.perf_counter()
+            close(PromptManager(backend, appdata_path=directory, lazy_templates=lazy))
+            open_ms = (time.perf_counter() - start) * 1000
+
+            tracemalloc.start()
+            manager = PromptManager(backend, appdata_path=directory, lazy_templates=lazy)
+            open_mb = tracemalloc.get_traced_memory()[0] / 1e6
+
+            start = time.perf_counter()
+            opened = [manager.get_prompt(name)['template'] for name in names]
+            get_us = (time.perf_counter() - start) / OPENED * 1e6
+            after_mb = tracemalloc.get_traced_memory()[0] / 1e6
+            tracemalloc.stop()
+
+            label = f"{backend}{' (lazy)' if lazy else ''}"
+            print(f"{label:>13}: open {open_ms:8.1f} ms, {open_mb:7.1f} MB"
+                  f" | get_prompt {get_us:7.1f} us | {OPENED} opened {after_mb:7.1f} MB")
+            close(manager)
+            del manager, opened
+
+
+if __name__ == "__main__":
+    main()
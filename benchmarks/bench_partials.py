@@ -0,0 +1,82 @@
+"""
+{{> テンプレート名}} による取り込みのベンチマーク。
+
+約 4 KB の共通の前文を持つ 500 件のテンプレートについて、前文を各テンプレートに複製した場合と
+取り込みで共有した場合の prompts.json のサイズ、全テンプレートのコンパイル時間、
+前文を編集した後に全テンプレートを描画し直す時間を比較します。
+
+使い方:
+    python benchmarks/bench_partials.py [件数]
+"""
+
+import os
+import sys
+import json
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from template_engine import TemplateComposer, CompiledTemplate
+
+TEMPLATE_COUNT = 500
+PREAMBLE = "あなたは {{role}} として回答します。以下の規約に従ってください。Follow the rules below.\n" * 60
+
+
+def build_library(count, shared):
+    """テンプレートの辞書 (名前 → 本文) を作成する。"""
+    library = {'共通前文': PREAMBLE} if shared else {}
+    for i in range(count):
+        head = "{{> 共通前文}}" if shared else PREAMBLE
+        library[f"テンプレート {i:04d}"] = f"{head}\n課題 {i}: {{{{text}}}}"
+    return library
+
+
+def json_size(library):
+    data = [{'name': name, 'template': template} for name, template in library.items()]
+    return len(json.dumps(data, ensure_ascii=False, indent=2).encode('utf-8'))
+
+
+def measure(count, shared):
+    library = build_library(count, shared)
+    names = [name for name in library if name != '共通前文']
+    values = {'role': "編集者", 'text': "本文"}
+    composer = TemplateComposer(library.get, max_sources=count * 2)
+
+    def compile_all():
+        if shared:
+            return [composer.compile(library[name]) for name in names]
+        return [CompiledTemplate(library[name]) for name in names]
+
+    start = time.perf_counter()
+    compiled = compile_all()
+    compile_ms = (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    for template in compiled:
+        template.render(values)
+    render_ms = (time.perf_counter() - start) * 1000
+
+    # 前文の編集: 共有している場合は前文を1回書き換えるだけで、依存するテンプレートが展開し直される
+    start = time.perf_counter()
+    if shared:
+        library['共通前文'] = PREAMBLE.replace("規約", "新しい規約")
+        composer.invalidate('共通前文')
+    else:
+        for name in names:
+            library[name] = library[name].replace("規約", "新しい規約")
+    compile_all()
+    edit_ms = (time.perf_counter() - start) * 1000
+
+    label = "include" if shared else "copy"
+    print(f"{label:>8}: prompts.json {json_size(library) / 1e6:6.2f} MB | compile {compile_ms:7.1f} ms"
+          f" | render {render_ms:6.1f} ms | edit preamble + recompile {edit_ms:7.1f} ms")
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else TEMPLATE_COUNT
+    print(f"{count:,} templates")
+    measure(count, shared=False)
+    measure(count, shared=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+PromptManager の名前索引のベンチマーク。
+
+1k / 10k / 100k 件のプロンプトに対して get_prompt と delete_prompt の所要時間を計測し、
+従来のリスト走査による実装と比較します。ストレージには一時ディレクトリの SQLite を使用します。
+
+使い方:
+    python benchmarks/bench_prompt_index.py
+"""
+
+import os
+import sys
+import json
+import random
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+SIZES = (1_000, 10_000, 100_000)
+LOOKUPS = 1_000
+DELETES = 100
+
+
+def list_get(prompts, name):
+    """従来の get_prompt と同じリスト走査。"""
+    for prompt in prompts:
+        if prompt['name'] == name:
+            return prompt
+    return None
+
+
+def list_delete(prompts, name):
+    """従来の delete_prompt と同じリストの再構築。"""
+    return [p for p in prompts if p['name'] != name]
+
+
+def bench(size):
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ['LOCALAPPDATA'] = tmp
+        os.makedirs(os.path.join(tmp, 'flashprompt'))
+        prompts = [{'name': f"prompt {i}", 'template': f"template {i} {{{{var}}}}"} for i in range(size)]
+        with open(os.path.join(tmp, 'flashprompt', 'prompts.json'), 'w', encoding='utf-8') as f:
+            json.dump(prompts, f)
+
+        from models import PromptManager
+        manager = PromptManager('sqlite')
+        rng = random.Random(0)
+        names = [f"prompt {rng.randrange(size)}" for _ in range(LOOKUPS)]
+        victims = rng.sample(range(size), DELETES)
+
+        start = time.perf_counter()
+        for name in names:
+            list_get(prompts, name)
+        list_get_us = (time.perf_counter() - start) / LOOKUPS * 1e6
+
+        start = time.perf_counter()
+        for name in names:
+            manager.get_prompt(name)
+        index_get_us = (time.perf_counter() - start) / LOOKUPS * 1e6
+
+        start = time.perf_counter()
+        remaining = prompts
+        for i in victims:
+            remaining = list_delete(remaining, f"prompt {i}")
+        list_delete_us = (time.perf_counter() - start) / DELETES * 1e6
+
+        start = time.perf_counter()
+        for i in victims:
+            manager.delete_prompt(f"prompt {i}")
+        index_delete_us = (time.perf_counter() - start) / DELETES * 1e6
+
+        manager.storage.connection.close()
+
+    print(f"{size:>7} prompts | get: list {list_get_us:9.1f} us, index {index_get_us:6.2f} us"
+          f" | delete: list {list_delete_us:9.1f} us, index+sqlite {index_delete_us:7.1f} us")
+
+
+def main():
+    for size in SIZES:
+        bench(size)
+
+
+if __name__ == "__main__":
+    main()
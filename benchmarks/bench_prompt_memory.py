@@ -0,0 +1,88 @@
+"""
+プロンプト1件あたりのメモリ使用量のベンチマーク。
+
+100k 件のプロンプトを次の3通りでメモリ上に保持し、tracemalloc で計測した
+1件あたりのバイト数を比較します。
+
+- dict: 従来の {'name': ..., 'template': ...} の辞書 (名前の索引を含む)
+- Prompt: __slots__ の Prompt レコード (本文をメモリに保持)
+- Prompt (lazy): 本文を遅延読み込みする Prompt レコード (SQLite)
+
+「レコード」列は名前と本文の文字列自体を除いた、レコードと索引の構造による分です。
+
+使い方:
+    python benchmarks/bench_prompt_memory.py [件数]
+"""
+
+import os
+import sys
+import json
+import tempfile
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import PromptManager
+
+PROMPT_COUNT = 100_000
+
+
+def build_data_dir(directory, count):
+    """prompts.json を作成し、SQLite に取り込んだデータディレクトリを作成する。"""
+    prompts = [{'name': f"テンプレート {i:06d}",
+                'template': f"次の文章を{i % 13}行で要約してください。\n{{{{text}}}}\n" * 4}
+               for i in range(count)]
+    with open(os.path.join(directory, 'prompts.json'), 'w', encoding='utf-8') as f:
+        json.dump(prompts, f, ensure_ascii=False)
+    PromptManager('sqlite', appdata_path=directory, lazy_templates=False).storage.connection.close()
+
+
+def measure(build):
+    """build() が返したオブジェクトを保持している間のメモリ増加量を返す。"""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    kept = build()
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return used, kept
+
+
+def string_bytes(prompts):
+    """名前と本文の文字列自体のバイト数 (メモリに保持している分だけ) を返す。"""
+    total = 0
+    for prompt in prompts:
+        total += sys.getsizeof(prompt['name'])
+        if getattr(prompt, 'is_loaded', True):
+            total += sys.getsizeof(prompt['template'])
+    return total
+
+
+def load_dicts(directory):
+    """従来の実装と同じく、JSON の辞書を名前の索引に格納する。"""
+    with open(os.path.join(directory, 'prompts.json'), 'r', encoding='utf-8') as f:
+        return {p['name']: p for p in json.load(f)}
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else PROMPT_COUNT
+    with tempfile.TemporaryDirectory() as directory:
+        build_data_dir(directory, count)
+        cases = (
+            ('dict', lambda: load_dicts(directory), lambda kept: kept.values()),
+            ('Prompt', lambda: PromptManager('sqlite', appdata_path=directory, lazy_templates=False),
+             lambda kept: kept.prompts),
+            ('Prompt (lazy)', lambda: PromptManager('sqlite', appdata_path=directory, lazy_templates=True),
+             lambda kept: kept.prompts),
+        )
+        print(f"{count:,} prompts")
+        for label, build, records in cases:
+            used, kept = measure(build)
+            overhead = used - string_bytes(records(kept))
+            print(f"{label:>14}: {used / count:8.1f} bytes/prompt (レコード {overhead / count:6.1f} bytes/prompt)")
+            if isinstance(kept, PromptManager):
+                kept.storage.connection.close()
+            del kept
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+テンプレート検索索引のベンチマーク。
+
+50k 件のテンプレートで索引の作成時間と、代表的なクエリの応答時間を計測します。
+目標は 1 クエリあたり 5 ms 未満で、超えたクエリがある場合や、誤字を含むクエリ ('reveiw') が
+1件も返さない場合は終了コード 1 で終了します。
+
+使い方:
+    python benchmarks/bench_search_index.py
+"""
+
+import os
+import sys
+import random
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from search_index import SearchIndex
+
+SIZE = 50_000
+BUDGET_MS = 5.0
+# 誤字を訂正して結果を返す必要があるクエリ
+TYPO_QUERIES = ('reveiw',)
+QUERIES = ('要約', 'レビュー', 'trans', 'translate kaki', 'reveiw', 'email draft', 'コード 説明', 'sakito', 'x')
+
+WORDS = ("summary translate review code email draft report meeting minutes bug fix refactor "
+         "explain test plan customer support reply outline blog post tweet marketing sales "
+         "要約 翻訳 レビュー コード メール 下書き 議事録 報告 説明 テスト 顧客 返信 記事 企画 "
+         "英語 日本語 箇条書き 丁寧 簡潔 敬語 アシスタント").split()
+
+
+def build_prompts(size):
+    """
+    ベンチマーク用のプロンプトを生成する。
+
+    名前は共通語 1 つと、音節を組み合わせた 5000 語の語彙から選んだ語で構成します。
+    本文は共通語を中心に、まれな語を少し混ぜます。
+    """
+    rng = random.Random(0)
+    syllables = "ka ki ku ke ko sa shi su se so ta chi tsu te to na ni nu ne no ra ri ru re ro".split()
+    vocabulary = [''.join(rng.choice(syllables) for _ in range(3)) for _ in range(5000)]
+    prompts = []
+    for i in range(size):
+        name = ' '.join([rng.choice(WORDS)] + [rng.choice(vocabulary) for _ in range(rng.randint(1, 3))])
+        name += f" {i}"
+        words = [rng.choice(WORDS) for _ in range(rng.randint(30, 120))]
+        words += [f"{{{{var_{rng.randrange(50)}}}}}" for _ in range(3)]
+        words += [f"word{rng.randrange(20000)}" for _ in range(20)]
+        prompts.append({'name': name, 'template': ' '.join(words)})
+    return prompts
+
+
+def main():
+    prompts = build_prompts(SIZE)
+    start = time.perf_counter()
+    index = SearchIndex(prompts)
+    print(f"build: {time.perf_counter() - start:.2f} s for {SIZE} templates")
+
+    failures = []
+    for query in QUERIES:
+        repeat = 20
+        start = time.perf_counter()
+        for _ in range(repeat):
+            results = index.search(query)
+        elapsed = (time.perf_counter() - start) / repeat * 1e3
+        print(f"{query!r:>16}: {elapsed:6.2f} ms, {len(results)} results, top: {results[:2]}")
+        if elapsed >= BUDGET_MS:
+            failures.append(f"{query!r} took {elapsed:.2f} ms (budget {BUDGET_MS} ms)")
+        if query in TYPO_QUERIES and not results:
+            failures.append(f"{query!r} returned no results")
+
+    start = time.perf_counter()
+    for i in range(100):
+        index.update(prompts[i]['name'], prompts[i]['name'], prompts[i]['template'] + " 追記")
+    print(f"update: {(time.perf_counter() - start) / 100 * 1e3:.2f} ms per template")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,99 @@
+"""
+起動時間 (最初の画面が表示されるまでの時間) のベンチマーク。
+
+1k / 10k / 50k 件のテンプレートを登録した一時データディレクトリを作成し、
+新しいPythonプロセスでアプリケーションを起動して次の時間を計測します。
+
+- first frame: プロセス開始からメインウィンドウが表示されるまで
+- loaded: プロセス開始から全てのテンプレートが一覧に読み込まれるまで
+
+画面を表示するため、ディスプレイのある環境で実行してください。
+
+使い方:
+    python benchmarks/bench_startup.py
+"""
+
+import os
+import sys
+import json
+import subprocess
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+SIZES = (1_000, 10_000, 50_000)
+BACKENDS = ('sqlite', 'json')
+REPEAT = 3
+
+# 子プロセスで実行する計測用スクリプト
+CHILD_SCRIPT = r'''
+import time
+start = time.perf_counter()
+import sys
+import json
+sys.path.insert(0, sys.argv[1])
+import tkinter as tk
+from views import FlashPromptApp
+
+result = {}
+root = tk.Tk()
+app = FlashPromptApp(root)
+
+def on_idle():
+    result.setdefault('first_frame', time.perf_counter() - start)
+
+def poll_loaded():
+    if app.prompt_manager.loaded and 'first_frame' in result:
+        result['loaded'] = time.perf_counter() - start
+        result['count'] = len(app.prompt_list.items)
+        root.destroy()
+    else:
+        root.after(5, poll_loaded)
+
+root.bind('<Map>', lambda e: root.after_idle(on_idle) if e.widget is root else None)
+root.after(5, poll_loaded)
+root.mainloop()
+print(json.dumps(result))
+'''
+
+
+def build_library(directory, size, backend):
+    """一時データディレクトリにテンプレートと設定を作成する。"""
+    data_dir = os.path.join(directory, 'flashprompt')
+    os.makedirs(data_dir)
+    prompts = [{'name': f"テンプレート {i}",
+                'template': f"次の文章を要約してください。\n{{{{text}}}}\n条件: {{{{condition_{i % 7}}}}}\n" * 5}
+               for i in range(size)]
+    with open(os.path.join(data_dir, 'prompts.json'), 'w', encoding='utf-8') as f:
+        json.dump(prompts, f, ensure_ascii=False)
+    with open(os.path.join(data_dir, 'settings.json'), 'w', encoding='utf-8') as f:
+        json.dump({'storage_backend': backend, 'always_on_top': False}, f)
+    if backend == 'sqlite':
+        # 初回起動時の JSON 取り込みを計測に含めないよう、先にデータベースを作成しておく
+        from storage import create_storage
+        create_storage('sqlite', data_dir).connection.close()
+
+
+def run_child(directory):
+    """子プロセスでアプリケーションを起動し、計測結果を返す。"""
+    env = dict(os.environ, LOCALAPPDATA=directory)
+    output = subprocess.run([sys.executable, '-c', CHILD_SCRIPT, ROOT], env=env,
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    for backend in BACKENDS:
+        for size in SIZES:
+            with tempfile.TemporaryDirectory() as directory:
+                build_library(directory, size, backend)
+                results = [run_child(directory) for _ in range(REPEAT)]
+            first_frame = min(r['first_frame'] for r in results) * 1000
+            loaded = min(r['loaded'] for r in results) * 1000
+            print(f"{backend:>6} {size:>7} prompts | first frame {first_frame:7.1f} ms"
+                  f" | loaded {loaded:7.1f} ms ({results[0]['count']} items)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+起動時間が予算内に収まっているかを確認するスクリプト。
+
+一時データディレクトリにテンプレートを作成し、main.py --profile-startup で
+アプリケーションを起動して、レポートの各フェーズとマークを予算 (ミリ秒) と比較します。
+1つでも予算を超えた場合は終了コード 1 で終了するため、CIでの回帰検出に使用できます。
+
+DISPLAY が設定されていない環境では xvfb-run を使用して仮想ディスプレイ上で起動します。
+
+使い方:
+    python benchmarks/check_startup_budget.py [--size 10000] [--backend sqlite]
+                                              [--budget benchmarks/startup_budget.json]
+                                              [--report startup_profile.json]
+"""
+
+import os
+import sys
+import json
+import shutil
+import argparse
+import subprocess
+import tempfile
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCHMARK_DIR)
+sys.path.insert(0, ROOT)
+
+from bench_startup import build_library
+
+
+def run_profile(data_dir, report_path):
+    """
+    プロファイルモードでアプリケーションを起動し、レポートを読み込む。
+
+    Args:
+        data_dir (str): LOCALAPPDATA として使用するディレクトリ。
+        report_path (str): レポートを書き出すファイルのパス。
+
+    Returns:
+        dict: レポートの辞書。
+    """
+    command = [sys.executable, os.path.join(ROOT, 'main.py'), '--profile-startup', report_path]
+    if not os.environ.get('DISPLAY') and sys.platform.startswith('linux'):
+        if shutil.which('xvfb-run') is None:
+            raise SystemExit("DISPLAY が設定されておらず、xvfb-run も見つかりません。")
+        command = ['xvfb-run', '-a'] + command
+    subprocess.run(command, env=dict(os.environ, LOCALAPPDATA=data_dir), check=True, timeout=120)
+    with open(report_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def check_budget(report, budget):
+    """
+    レポートを予算と比較する。
+
+    Args:
+        report (dict): --profile-startup のレポート。
+        budget (dict): 'phases' と 'marks' にそれぞれ名前→予算 (ミリ秒) を持つ辞書。
+
+    Returns:
+        list: (種類, 名前, 計測値, 予算) のうち予算を超えたもののリスト。
+    """
+    over = []
+    measured = {
+        'phases': {name: phase['ms'] for name, phase in report['phases'].items()},
+        'marks': report['marks'],
+    }
+    for kind in ('phases', 'marks'):
+        for name, limit in budget.get(kind, {}).items():
+            value = measured[kind].get(name)
+            status = '  -  ' if value is None else ('OVER ' if value > limit else ' ok  ')
+            shown = '-' if value is None else f"{value:9.1f}"
+            print(f"{status} {kind[:-1]:>5} {name:<22} {shown:>9} ms / {limit:>7} ms")
+            if value is not None and value > limit:
+                over.append((kind, name, value, limit))
+    return over
+
+
+def main():
+    parser = argparse.ArgumentParser(description="起動時間の予算を確認します。")
+    parser.add_argument('--size', type=int, default=10_000, help="登録するテンプレート数 (既定: 10000)")
+    parser.add_argument('--backend', choices=('sqlite', 'json'), default='sqlite', help="ストレージバックエンド")
+    parser.add_argument('--budget', default=os.path.join(BENCHMARK_DIR, 'startup_budget.json'),
+                        help="予算を記述したJSONファイル")
+    parser.add_argument('--report', help="レポートを保存するパス (省略時は一時ファイル)")
+    args = parser.parse_args()
+
+    with open(args.budget, 'r', encoding='utf-8') as f:
+        budget = json.load(f)
+
+    with tempfile.TemporaryDirectory() as directory:
+        build_library(directory, args.size, args.backend)
+        report_path = args.report or os.path.join(directory, 'startup_profile.json')
+        report = run_profile(directory, report_path)
+
+    print(f"{args.backend}, {report.get('prompt_count')} prompts, total {report['total_ms']:.1f} ms")
+    print("slowest imports:")
+    for item in report['imports'][:10]:
+        print(f"  {item['module']:<40} {item['cumulative_ms']:8.1f} ms (self {item['self_ms']:.1f} ms)")
+    over = check_budget(report, budget)
+    if over:
+        print(f"{len(over)} 件が予算を超えました。")
+        sys.exit(1)
+    print("全て予算内です。")
+
+
+if __name__ == "__main__":
+    main()
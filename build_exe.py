@@ -24,5 +24,18 @@ PyInstaller.__main__.run([
     '--add-data', 'constants.py;.',  # constants.py を追加
     '--add-data', 'models.py;.',    # models.py を追加
     '--add-data', 'utils.py;.',     # utils.py を追加
-    '--add-data', 'views.py;.'       # views.py を追加
+    '--add-data', 'views.py;.',      # views.py を追加
+    '--add-data', 'template_engine.py;.',  # template_engine.py を追加
+    '--add-data', 'storage.py;.',    # storage.py を追加
+    '--add-data', 'virtual_list.py;.',  # virtual_list.py を追加
+    '--add-data', 'search_index.py;.',  # search_index.py を追加
+    '--add-data', 'cli.py;.',  # cli.py を追加
+    '--add-data', 'single_instance.py;.',  # single_instance.py を追加
+    '--add-data', 'profiling.py;.',  # profiling.py を追加
+    '--add-data', 'persistence.py;.',  # persistence.py を追加
+    '--add-data', 'file_watcher.py;.',  # file_watcher.py を追加
+    '--add-data', 'variable_form.py;.',  # variable_form.py を追加
+    '--add-data', 'file_values.py;.',  # file_values.py を追加
+    '--add-data', 'export.py;.',  # export.py を追加
+    '--add-data', 'history.py;.'  # history.py を追加
 ])
\ No newline at end of file
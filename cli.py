@@ -0,0 +1,439 @@
+"""
+コマンドラインからテンプレートを描画するモジュール。
+
+tkinter を読み込まずに PromptManager からテンプレートを取得し、
+標準入力またはファイルから読んだ変数 (JSON / JSONL / CSV) で描画した結果を
+標準出力またはディレクトリへ書き出します。入力は逐次読み込むため、
+行数が増えてもメモリ使用量は一定です。--workers を指定すると複数のプロセスで描画し、
+結果は入力の順に出力します。
+
+使い方:
+    python main.py render --template 要約 --input rows.jsonl > prompts.txt
+    python main.py render --template-file t.txt --format csv --output-dir out/ < rows.csv
+    python main.py render --template 要約 --input rows.jsonl --workers 8 > prompts.txt
+"""
+
+import os
+import sys
+import csv
+import json
+import argparse
+from collections import deque
+from contextlib import nullcontext
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from models import PromptManager
+from storage import DirectoryStorage
+from template_engine import compile_template
+
+# JSON 配列を読み進めるときに一度に読み込む文字数
+_JSON_CHUNK_SIZE = 64 * 1024
+
+# 複数プロセスで描画するときに1回でワーカーへ渡す行数の既定値
+DEFAULT_BATCH_SIZE = 1000
+
+# ワーカー1つあたりに割り当てておく、処理中のまとまりの数
+_PENDING_PER_WORKER = 2
+
+
+class RenderError(Exception):
+    """コマンドライン描画の入力や設定に誤りがある場合に送出される例外。"""
+
+
+def iter_json_rows(stream):
+    """
+    JSON の配列 (または単一のオブジェクト) から行を1つずつ読み出す。
+
+    配列全体を読み込まずに、要素ごとに JSONDecoder.raw_decode で復号します。
+
+    Args:
+        stream (io.TextIOBase): 入力ストリーム。
+
+    Yields:
+        dict: 変数名をキーとする辞書。
+    """
+    decoder = json.JSONDecoder()
+    buffer = ''
+    position = 0
+    in_array = None
+    eof = False
+    while True:
+        # 空白と区切り文字を読み飛ばす
+        while True:
+            while position < len(buffer) and buffer[position] in ' \t\r\n,':
+                position += 1
+            if position < len(buffer) or eof:
+                break
+            chunk = stream.read(_JSON_CHUNK_SIZE)
+            buffer, position, eof = buffer[position:] + chunk, 0, not chunk
+        if position >= len(buffer):
+            return
+        if in_array is None:
+            in_array = buffer[position] == '['
+            if in_array:
+                position += 1
+                continue
+        if in_array and buffer[position] == ']':
+            return
+        try:
+            row, end = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            if eof:
+                raise RenderError("JSON の形式が正しくありません。")
+            chunk = stream.read(_JSON_CHUNK_SIZE)
+            buffer, position, eof = buffer[position:] + chunk, 0, not chunk
+            continue
+        # 数値などは区切り文字の手前で切れている可能性があるため、続きがある場合は読み足す
+        if end == len(buffer) and not eof and not isinstance(row, (dict, list)):
+            chunk = stream.read(_JSON_CHUNK_SIZE)
+            buffer, position, eof = buffer[position:] + chunk, 0, not chunk
+            continue
+        position = end
+        yield row
+        if not in_array:
+            return
+
+
+def iter_jsonl_lines(stream):
+    """
+    JSON Lines の空でない行を1行ずつ読み出す。
+
+    行の復号は BatchRenderer が行うため、複数プロセスで描画する場合は
+    復号の処理もワーカーに分散されます。
+    """
+    for line in stream:
+        if line.strip():
+            yield line
+
+
+def iter_csv_rows(stream):
+    """ヘッダー付きの CSV から行を1つずつ読み出す。"""
+    yield from csv.DictReader(stream)
+
+
+ROW_READERS = {
+    'json': iter_json_rows,
+    'jsonl': iter_jsonl_lines,
+    'csv': iter_csv_rows,
+}
+
+
+def guess_format(path):
+    """
+    ファイルの拡張子から入力形式を推測する。
+
+    Args:
+        path (str or None): 入力ファイルのパス。標準入力の場合は None。
+
+    Returns:
+        str: 'json'、'jsonl'、'csv' のいずれか。推測できない場合は 'jsonl'。
+    """
+    extension = os.path.splitext(path or '')[1].lower()
+    return {'.json': 'json', '.csv': 'csv', '.jsonl': 'jsonl', '.ndjson': 'jsonl'}.get(extension, 'jsonl')
+
+
+def row_values(variables, row, strict=False):
+    """
+    1行分の入力から、テンプレートの変数に渡す値を作成する。
+
+    GUI の変数入力と同じく、値は前後の空白を取り除いた文字列とし、
+    入力にない変数は空文字列として扱います。
+
+    Args:
+        variables (iterable): テンプレートの変数名。
+        row (dict): 入力の1行。
+        strict (bool): True の場合、入力にない変数があると RenderError を送出します。
+
+    Returns:
+        dict: 変数名をキー、値を文字列とする辞書。
+    """
+    if not isinstance(row, dict):
+        raise RenderError(f"各行はオブジェクトである必要があります: {row!r}")
+    values = {}
+    for name in variables:
+        value = row.get(name)
+        if value is None:
+            if strict:
+                raise RenderError(f"変数 '{name}' の値がありません。")
+            value = ''
+        elif not isinstance(value, str):
+            value = json.dumps(value, ensure_ascii=False)
+        values[name] = value.strip()
+    return values
+
+
+def load_template(args):
+    """
+    コマンドライン引数で指定されたテンプレートを読み込む。
+
+    {{> テンプレート名}} による取り込みは、登録済みのテンプレートを使ってここで展開します。
+    ストレージは読み取り専用で開くため、データベースの作成や移行、重複した名前の書き直しは行いません。
+
+    Returns:
+        str: 取り込みを展開したテンプレート文字列。
+    """
+    if args.template_file:
+        with open(args.template_file, 'r', encoding='utf-8') as f:
+            template = f.read()
+        if '{{>' not in template:
+            return template
+    # 本文は指定されたテンプレートと、取り込むテンプレートの分だけ読み込む
+    manager = PromptManager(args.backend, appdata_path=args.data_dir, lazy_templates=True,
+                            template_directory=args.template_dir, read_only=True)
+    if not args.template_file:
+        prompt = manager.get_prompt(args.template)
+        if prompt is None:
+            raise RenderError(f"テンプレート '{args.template}' が見つかりません。")
+        template = prompt['template']
+    return manager.composer.expand(template)
+
+
+class BatchRenderer:
+    """
+    入力の行をまとめて描画し、出力する文字列を作成するクラス。
+
+    テンプレートはインスタンスの作成時に一度だけコンパイルします。
+    複数プロセスで描画する場合は各ワーカーが1つずつ保持します。
+    バッチの各行は値が異なるため、描画結果のキャッシュ (render_cache) は使わずに直接描画します。
+    """
+    def __init__(self, template, row_format, strict=False, output_dir=None, name_field=None,
+                 output_format='text', separator='\n'):
+        """
+        BatchRendererクラスのコンストラクタ。
+
+        Args:
+            template (str): テンプレート文字列。
+            row_format (str): 入力形式。'jsonl' の場合は行の文字列を復号してから描画します。
+            strict (bool): 入力にない変数をエラーとするかどうか。
+            output_dir (str, optional): 1件ずつファイルに書き出すディレクトリ。
+            name_field (str, optional): 出力ファイル名に使う入力の列名。
+            output_format (str): 標準出力の形式 ('text' または 'jsonl')。
+            separator (str): text 形式で各プロンプトの後に出力する区切り文字列。
+        """
+        self.compiled = compile_template(template)
+        self.decode = json.loads if row_format == 'jsonl' else None
+        self.strict = strict
+        self.output_dir = output_dir
+        self.name_field = name_field
+        self.output_format = output_format
+        self.separator = separator
+
+    def render(self, start, rows):
+        """
+        行のまとまりを描画する。
+
+        Args:
+            start (int): まとまりの先頭行の通し番号 (出力ファイル名に使用)。
+            rows (list): 入力の行のリスト。
+
+        Returns:
+            str or list: 標準出力に書き出す文字列。output_dir を指定した場合は
+                (通し番号, name_field の値, プロンプト) のタプルのリスト (OutputDirectory.write_batch に渡す)。
+        """
+        compiled = self.compiled
+        chunks = []
+        for index, row in enumerate(rows, start):
+            if self.decode is not None:
+                row = self.decode(row)
+            prompt = compiled.render(row_values(compiled.variables, row, self.strict))
+            if self.output_dir:
+                name = str(row.get(self.name_field, '')) if self.name_field else ''
+                chunks.append((index, name, prompt))
+            elif self.output_format == 'jsonl':
+                chunks.append(json.dumps({'prompt': prompt}, ensure_ascii=False))
+                chunks.append('\n')
+            else:
+                chunks.append(prompt)
+                chunks.append(self.separator)
+        return chunks if self.output_dir else ''.join(chunks)
+
+
+class OutputDirectory:
+    """
+    描画結果を1件ずつファイルに書き出すクラス。
+
+    ファイル名は入力の値から作るため、DirectoryStorage.filename_for と同じ規則で
+    パス区切りなどの文字をエスケープし、出力ディレクトリの外を指すパスは拒否します。
+    大文字と小文字だけが異なる名前を含め、同じファイル名になる行には「名前 (2).txt」のように番号を付けます。
+    ファイル名の重複を判定するため、複数プロセスで描画する場合も書き出しは親プロセスで行います。
+    """
+    def __init__(self, directory):
+        """
+        OutputDirectoryクラスのコンストラクタ。
+
+        Args:
+            directory (str): 書き出すディレクトリ。存在しない場合は作成します。
+        """
+        os.makedirs(directory, exist_ok=True)
+        self.directory = os.path.realpath(directory)
+        self._used = set()  # この実行で書き出したファイル名 (casefold した値)
+
+    def path_for(self, index, name):
+        """
+        1件分の出力ファイルのパスを決める。
+
+        Args:
+            index (int): 入力の行の通し番号 (name が空の場合に使用)。
+            name (str): name_field の値。
+
+        Returns:
+            str: 出力ファイルのパス。
+
+        Raises:
+            RenderError: パスが出力ディレクトリの外を指す場合。
+        """
+        stem = DirectoryStorage.filename_for(name or f'{index:06d}')[:-len(DirectoryStorage.EXTENSION)]
+        file_name = stem + DirectoryStorage.EXTENSION
+        number = 1
+        while file_name.casefold() in self._used:
+            number += 1
+            file_name = f"{stem} ({number}){DirectoryStorage.EXTENSION}"
+        path = os.path.realpath(os.path.join(self.directory, file_name))
+        if os.path.dirname(path) != self.directory:
+            raise RenderError(f"出力ファイル名が出力ディレクトリの外を指しています: {name!r}")
+        self._used.add(file_name.casefold())
+        return path
+
+    def write_batch(self, items):
+        """
+        BatchRenderer.render が返した描画結果を書き出す。
+
+        Args:
+            items (list): (通し番号, name_field の値, プロンプト) のタプルのリスト。
+        """
+        for index, name, prompt in items:
+            with open(self.path_for(index, name), 'w', encoding='utf-8') as f:
+                f.write(prompt)
+
+
+def iter_batches(rows, size):
+    """
+    行を size 件ずつのまとまりに分ける。
+
+    Yields:
+        tuple: (先頭行の通し番号, 行のリスト) のタプル。
+    """
+    rows = iter(rows)
+    start = 0
+    while True:
+        batch = list(islice(rows, size))
+        if not batch:
+            return
+        yield start, batch
+        start += len(batch)
+
+
+def render_serial(renderer, batches, write):
+    """現在のプロセスで全ての行を描画し、結果を write に渡す。"""
+    for start, batch in batches:
+        write(renderer.render(start, batch))
+
+
+# ワーカープロセスごとの BatchRenderer
+_worker_renderer = None
+
+
+def _init_worker(renderer_args):
+    """ワーカープロセスの初期化処理。テンプレートをコンパイルしておく。"""
+    global _worker_renderer
+    _worker_renderer = BatchRenderer(*renderer_args)
+
+
+def _render_in_worker(start, batch):
+    """ワーカープロセスで行のまとまりを描画する。"""
+    return _worker_renderer.render(start, batch)
+
+
+def render_parallel(renderer_args, batches, write, workers):
+    """
+    複数のプロセスで行を描画し、入力の順に書き出す。
+
+    処理中のまとまりは先頭から順に結果を待つキューで保持し、その数を
+    ワーカー数の _PENDING_PER_WORKER 倍までに制限します。後続のまとまりが
+    先に終わっても先頭が終わるまで書き出さないため、出力は入力の順になり、
+    メモリ上に保持する結果の量も一定に保たれます。
+
+    Args:
+        renderer_args (tuple): 各ワーカーで BatchRenderer に渡す引数。
+        batches (iterable): iter_batches が返すまとまりの列。
+        write (callable): 各まとまりの描画結果を渡す関数 (stdout.write または OutputDirectory.write_batch)。
+        workers (int): ワーカープロセス数。
+    """
+    max_pending = workers * _PENDING_PER_WORKER
+    pending = deque()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(renderer_args,)) as executor:
+        try:
+            for start, batch in batches:
+                if len(pending) >= max_pending:
+                    write(pending.popleft().result())
+                pending.append(executor.submit(_render_in_worker, start, batch))
+            while pending:
+                write(pending.popleft().result())
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+def build_parser():
+    """render サブコマンドの引数パーサーを作成する。"""
+    parser = argparse.ArgumentParser(prog='flashprompt render',
+                                     description="テンプレートを変数ファイルで一括描画します。")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--template', help="PromptManager に登録されたテンプレート名")
+    source.add_argument('--template-file', help="テンプレートを記述したファイルのパス")
+    parser.add_argument('--input', '-i', help="変数ファイルのパス (省略時は標準入力)")
+    parser.add_argument('--format', '-f', choices=sorted(ROW_READERS),
+                        help="入力形式 (省略時は拡張子から推測、標準入力は jsonl)")
+    parser.add_argument('--output-dir', '-o', help="1件ずつファイルに書き出すディレクトリ (省略時は標準出力)")
+    parser.add_argument('--name-field', help="出力ファイル名に使う入力の列名 (--output-dir 指定時)")
+    parser.add_argument('--output-format', choices=('text', 'jsonl'), default='text',
+                        help="標準出力の形式 (既定: text)")
+    parser.add_argument('--separator', default='\n',
+                        help="text 形式で各プロンプトの後に出力する区切り文字列 (既定: 改行)")
+    parser.add_argument('--strict', action='store_true', help="入力にない変数があればエラーにする")
+    parser.add_argument('--workers', '-j', type=int, default=1,
+                        help="描画に使うプロセス数 (0 で CPU コア数、既定: 1)")
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                        help=f"ワーカーへ一度に渡す行数 (既定: {DEFAULT_BATCH_SIZE})")
+    parser.add_argument('--data-dir', help="プロンプトを読み込むデータディレクトリ")
+    parser.add_argument('--backend', choices=('sqlite', 'json', 'packed', 'directory'), help="ストレージバックエンド")
+    parser.add_argument('--template-dir', help="テンプレートを1件1ファイルで保存した保存ディレクトリ (--backend directory)")
+    return parser
+
+
+def main(argv=None, stdin=None, stdout=None):
+    """
+    render サブコマンドのエントリーポイント。
+
+    Args:
+        argv (list, optional): コマンドライン引数 (サブコマンド名を除く)。
+        stdin (io.TextIOBase, optional): 標準入力。
+        stdout (io.TextIOBase, optional): 標準出力。
+
+    Returns:
+        int: 終了コード。
+    """
+    args = build_parser().parse_args(argv)
+    stdin = stdin or sys.stdin
+    stdout = stdout or sys.stdout
+    # シェルから渡しやすいよう、区切り文字列の \n と \t はエスケープとして解釈する
+    args.separator = args.separator.replace('\\n', '\n').replace('\\t', '\t')
+    workers = args.workers or os.cpu_count() or 1
+    try:
+        template = load_template(args)
+        row_format = args.format or guess_format(args.input)
+        renderer_args = (template, row_format, args.strict, args.output_dir, args.name_field,
+                         args.output_format, args.separator)
+        write = OutputDirectory(args.output_dir).write_batch if args.output_dir else stdout.write
+        with (open(args.input, 'r', encoding='utf-8', newline='') if args.input else nullcontext(stdin)) as f:
+            batches = iter_batches(ROW_READERS[row_format](f), max(1, args.batch_size))
+            if workers > 1:
+                render_parallel(renderer_args, batches, write, workers)
+            else:
+                render_serial(BatchRenderer(*renderer_args), batches, write)
+    except (RenderError, OSError, json.JSONDecodeError, csv.Error) as e:
+        print(f"エラー: {e}", file=sys.stderr)
+        return 1
+    stdout.flush()
+    return 0
@@ -30,14 +30,36 @@ WINDOW_SIZES = {
     'main_min': (300, 300),
     'prompt_creation': (700, 500), # サイズを少し大きくしました
     'prompt_creation_min': (600, 400),
-    'variable_dialog': (300, 150)
+    'variable_dialog': (300, 150),
+    'history': (720, 480)
 }
 
 # デフォルト設定
 DEFAULT_SETTINGS = {
-    'save_directory': '',  # デフォルトは空文字列
+    'save_directory': '',  # テンプレートを1件1ファイルで保存する共有ディレクトリ (空文字列の場合は使用しない)
     'always_on_top': True,   # 新しい設定: ウィンドウを常に最前面に表示するかどうか
+    'storage_backend': 'sqlite',  # プロンプトの保存形式: 'sqlite'、'json'、'packed' のいずれか
+    'preview_debounce_ms': 50,  # 変数入力からプレビューを更新する最小の間隔 (ミリ秒)
+    'single_instance': False,  # 起動中のプロセスを再利用し、閉じたウィンドウは常駐させる
+    'lazy_templates': False,  # テンプレート本文を参照されるまで読み込まない (SQLite と保存ディレクトリのみ。packed は常に遅延読み込み)
 }
 
+# テンプレート一覧の検索設定
+SEARCH_DELAY_MS = 80        # 最後の入力から検索を実行するまでの待ち時間 (ミリ秒)
+SEARCH_RESULT_LIMIT = 500   # 検索結果として表示する最大件数
+
+# 起動時のテンプレート読み込み設定
+PROMPT_LOAD_CHUNK = 2000    # 起動時の読み込みでテンプレート一覧に一度に追加する件数
+PROMPT_LOAD_POLL_MS = 15    # 起動時の読み込み結果を確認する間隔 (ミリ秒)
+
+# 2回目以降の起動から届いたメッセージを確認する間隔 (ミリ秒)
+INSTANCE_POLL_MS = 100
+
+# 共有ディレクトリで他のクライアントが変更したテンプレートを確認する間隔 (ミリ秒)
+FILE_CHANGE_POLL_MS = 250
+
+# プロンプトの書き出し (コピーの準備・ファイルへの保存) の進捗を確認する間隔 (ミリ秒)
+EXPORT_POLL_MS = 50
+
 # アプリケーションのバージョン番号
 VERSION = "1.0.0"
\ No newline at end of file
@@ -0,0 +1,221 @@
+"""
+生成したプロンプトをファイルやクリップボードへ書き出すモジュール。
+
+プロンプトはコンパイル済みテンプレートから CompiledTemplate.stream で少しずつ生成し、
+EXPORT_CHUNK_CHARS 文字ずつ書き出します。ファイルに結び付けた変数 (FileValue) の内容も
+1つの文字列に連結せずに書き出すため、数十MBのプロンプトでもメモリの使用量は一定です。
+ExportJob はこれらの処理をバックグラウンドスレッドで行い、進捗と結果をキューで受け渡します。
+tkinter に依存しないため、GUI 以外 (標準出力への書き出しなど) からも利用できます。
+"""
+
+import io
+import os
+import queue
+import threading
+from datetime import datetime
+from storage import DirectoryStorage
+
+# 一度に書き出す文字数
+EXPORT_CHUNK_CHARS = 256 * 1024
+# これより短いプロンプトは、バックグラウンドに回さずにその場でコピーする
+SYNC_EXPORT_CHARS = 1024 * 1024
+# 保存ディレクトリ ('save_directory') の中で、書き出したプロンプトを置くサブディレクトリ
+EXPORT_SUBDIRECTORY = 'exports'
+
+
+def iter_chunks(compiled, values, chunk_chars=EXPORT_CHUNK_CHARS):
+    """
+    プロンプトを chunk_chars 文字以下の部分文字列に分けて生成する。
+
+    Args:
+        compiled (CompiledTemplate): コンパイル済みテンプレート。
+        values (dict): 変数名をキー、文字列または FileValue を値とする辞書。
+        chunk_chars (int): 一度に生成する最大の文字数。
+
+    Yields:
+        str: プロンプトの一部。
+    """
+    for part in compiled.stream(values):
+        if len(part) <= chunk_chars:
+            yield part
+        else:
+            for start in range(0, len(part), chunk_chars):
+                yield part[start:start + chunk_chars]
+
+
+def estimate_length(compiled, values):
+    """
+    プロンプトの長さの見積もりを求める (進捗の表示に使用)。
+
+    FileValue はファイルのバイト数で見積もるため、実際の文字数より大きくなることがあります。
+
+    Args:
+        compiled (CompiledTemplate): コンパイル済みテンプレート。
+        values (dict): 変数名をキー、文字列または FileValue を値とする辞書。
+
+    Returns:
+        int: プロンプトの長さの見積もり (文字数)。
+    """
+    total = sum(len(part) for part in compiled.parts)
+    for index, name in compiled.slots:
+        value = values.get(name)
+        if value is None:
+            continue
+        total -= len(compiled.parts[index])
+        total += len(value) if isinstance(value, str) else value.size()
+    return total
+
+
+def write_prompt(compiled, values, out, progress=None):
+    """
+    プロンプトをテキストストリームに書き出す。
+
+    Args:
+        compiled (CompiledTemplate): コンパイル済みテンプレート。
+        values (dict): 変数名をキー、文字列または FileValue を値とする辞書。
+        out (io.TextIOBase): 書き出し先 (ファイルや標準出力)。
+        progress (callable, optional): 書き出すたびに (書き出した文字数, 見積もりの文字数) を引数に呼び出す関数。
+
+    Returns:
+        int: 書き出した文字数。
+    """
+    total = estimate_length(compiled, values) if progress is not None else 0
+    written = 0
+    for chunk in iter_chunks(compiled, values):
+        out.write(chunk)
+        written += len(chunk)
+        if progress is not None:
+            progress(written, max(total, written))
+    return written
+
+
+def export_to_file(compiled, values, path, progress=None):
+    """
+    プロンプトをファイルに書き出す。
+
+    一時ファイルに書き出してから置き換えるため、途中で失敗しても既存のファイルは壊れません。
+
+    Args:
+        compiled (CompiledTemplate): コンパイル済みテンプレート。
+        values (dict): 変数名をキー、文字列または FileValue を値とする辞書。
+        path (str): 書き出すファイルのパス。
+        progress (callable, optional): write_prompt と同じ進捗の通知先。
+
+    Returns:
+        str: 書き出したファイルのパス。
+    """
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(temp_path, 'w', encoding='utf-8', newline='') as f:
+            write_prompt(compiled, values, f, progress)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    return path
+
+
+def prepare_clipboard_text(compiled, values, progress=None):
+    """
+    クリップボードにコピーする文字列を作成する。
+
+    クリップボードには文字列全体を一度に渡す必要があるため、メモリ上のバッファに書き出します。
+    前後の空白は、プレビューからのコピーと同じく取り除きます。
+
+    Args:
+        compiled (CompiledTemplate): コンパイル済みテンプレート。
+        values (dict): 変数名をキー、文字列または FileValue を値とする辞書。
+        progress (callable, optional): write_prompt と同じ進捗の通知先。
+
+    Returns:
+        str: コピーする文字列。
+    """
+    buffer = io.StringIO()
+    write_prompt(compiled, values, buffer, progress)
+    return buffer.getvalue().strip()
+
+
+def export_path(directory, name, now=None):
+    """
+    保存ディレクトリに書き出すファイルのパスを作成する。
+
+    ファイルは保存ディレクトリの EXPORT_SUBDIRECTORY に「テンプレート名_日時.txt」の名前で作成します
+    (テンプレートは別のサブディレクトリ TEMPLATE_SUBDIRECTORY に保存されます)。
+
+    Args:
+        directory (str): 保存ディレクトリ。
+        name (str): テンプレート名。
+        now (datetime, optional): ファイル名に使う日時 (省略時は現在時刻)。
+
+    Returns:
+        str: 書き出すファイルのパス。
+    """
+    stem = DirectoryStorage.filename_for(name or 'prompt')[:-len(DirectoryStorage.EXTENSION)]
+    timestamp = (now or datetime.now()).strftime('%Y%m%d-%H%M%S')
+    return os.path.join(directory, EXPORT_SUBDIRECTORY, f"{stem}_{timestamp}.txt")
+
+
+class ExportJob:
+    """
+    書き出しをバックグラウンドスレッドで実行するクラス。
+
+    進捗と結果はキューに入れ、呼び出し側 (Tk のメインスレッド) が poll で受け取ります。
+    """
+    def __init__(self, function, *args):
+        """
+        ExportJobクラスのコンストラクタ。スレッドを開始します。
+
+        Args:
+            function (callable): 実行する関数。キーワード引数 progress で進捗の通知先を受け取ります。
+            *args: function に渡す引数。
+        """
+        self._queue = queue.Queue()
+        self.done = False
+        self.result = None
+        self.error = None
+        self.progress = (0, 0)
+        self._thread = threading.Thread(target=self._run, args=(function, args), daemon=True)
+        self._thread.start()
+
+    def _run(self, function, args):
+        try:
+            result = function(*args, progress=self._report)
+        except Exception as e:
+            self._queue.put(('error', e))
+        else:
+            self._queue.put(('done', result))
+
+    def _report(self, written, total):
+        self._queue.put(('progress', (written, total)))
+
+    def poll(self):
+        """
+        スレッドから届いた進捗と結果を反映する。
+
+        Returns:
+            bool: 書き出しが終了した (done が True になった) かどうか。
+        """
+        while True:
+            try:
+                kind, value = self._queue.get_nowait()
+            except queue.Empty:
+                return self.done
+            if kind == 'progress':
+                self.progress = value
+            else:
+                self.done = True
+                if kind == 'error':
+                    self.error = value
+                else:
+                    self.result = value
+
+    def percent(self):
+        """
+        進捗の割合を取得する。
+
+        Returns:
+            int: 進捗 (0〜100)。
+        """
+        written, total = self.progress
+        return min(100, written * 100 // total) if total else 0
@@ -0,0 +1,115 @@
+"""
+ファイルの内容を変数の値として扱うモジュール。
+
+数MBの文書を変数入力欄に貼り付けると、入力やプレビューの更新のたびに Text ウィジェットの
+内容全体を読み直すことになります。FileValue は変数の値としてファイルのパスだけを保持し、
+プレビューには先頭と末尾の抜粋 (excerpt) だけを表示します。クリップボードへのコピーや
+ファイルへの書き出しの時点で chunks() によりファイルの内容を読み出します。
+tkinter に依存しないため、GUI 以外の描画経路からも利用できます。
+"""
+
+import os
+
+# プレビューに表示する先頭と末尾の文字数
+EXCERPT_HEAD_CHARS = 2000
+EXCERPT_TAIL_CHARS = 1000
+# chunks() で一度に読み出す文字数
+CHUNK_CHARS = 1024 * 1024
+# UTF-8 の1文字の最大バイト数 (末尾の抜粋を読み出す範囲の計算に使用)
+_MAX_CHAR_BYTES = 4
+
+
+class FileValue:
+    """
+    ファイルの内容を値とする変数を表すクラス。
+
+    ファイルは UTF-8 として読み出し、デコードできないバイトは置換文字にします。
+    内容は保持せず、excerpt() と chunks() を呼び出すたびにファイルから読み出します。
+    """
+    __slots__ = ('path', 'encoding')
+
+    def __init__(self, path, encoding='utf-8'):
+        """
+        FileValueクラスのコンストラクタ。
+
+        Args:
+            path (str): 値とするファイルのパス。
+            encoding (str): ファイルの文字コード。
+        """
+        self.path = path
+        self.encoding = encoding
+
+    def __repr__(self):
+        return f"FileValue({self.path!r})"
+
+    def size(self):
+        """
+        ファイルのサイズを取得する。
+
+        Returns:
+            int: ファイルのサイズ (バイト)。ファイルがない場合は 0。
+        """
+        try:
+            return os.path.getsize(self.path)
+        except OSError:
+            return 0
+
+    def _open(self):
+        return open(self.path, 'r', encoding=self.encoding, errors='replace', newline='')
+
+    def chunks(self, chunk_chars=CHUNK_CHARS):
+        """
+        ファイルの内容を先頭から順に読み出す。
+
+        Args:
+            chunk_chars (int): 一度に読み出す文字数。
+
+        Yields:
+            str: ファイルの内容の一部。
+        """
+        with self._open() as f:
+            while True:
+                chunk = f.read(chunk_chars)
+                if not chunk:
+                    break
+                yield chunk
+
+    def read(self):
+        """
+        ファイルの内容全体を読み出す。
+
+        Returns:
+            str: ファイルの内容。
+        """
+        with self._open() as f:
+            return f.read()
+
+    def excerpt(self, head_chars=EXCERPT_HEAD_CHARS, tail_chars=EXCERPT_TAIL_CHARS):
+        """
+        プレビュー用に、ファイルの先頭と末尾の抜粋を作成する。
+
+        ファイルが短い場合は内容全体を返します。長い場合は先頭と末尾の間を省略し、
+        省略したことが分かる行を挟みます。読み出すのは先頭と末尾の数KBだけです。
+
+        Args:
+            head_chars (int): 先頭から表示する文字数。
+            tail_chars (int): 末尾から表示する文字数。
+
+        Returns:
+            str: 抜粋した文字列。ファイルを読み出せない場合はエラーの説明。
+        """
+        try:
+            size = os.path.getsize(self.path)
+            with self._open() as f:
+                head = f.read(head_chars + tail_chars + 1)
+            if len(head) <= head_chars + tail_chars:
+                return head
+            head = head[:head_chars]
+            with open(self.path, 'rb') as f:
+                tail_bytes = min(size, tail_chars * _MAX_CHAR_BYTES)
+                f.seek(size - tail_bytes)
+                # 読み出し位置が文字の途中になった場合は、先頭の不完全な文字を読み捨てる
+                tail = f.read().decode(self.encoding, errors='ignore')[-tail_chars:]
+        except (OSError, LookupError) as e:
+            return f"(ファイルを読み込めません: {e})"
+        return f"{head}\n…（中略: {self.path} 全 {size:,} バイト）…\n{tail}"
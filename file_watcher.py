@@ -0,0 +1,245 @@
+"""
+ディレクトリ内のファイルの変更を監視するモジュール。
+
+DirectoryWatcher は変更されたファイルの名前だけを通知するため、呼び出し側は
+ディレクトリ全体ではなく変更されたファイルだけを読み直せます。
+Linux のローカルディスクでは inotify を使用し、それ以外 (Windows、macOS、
+inotify が使えない環境、他のマシンからの変更が inotify に届かないネットワークファイルシステム) では
+os.scandir で一定間隔ごとに更新時刻とサイズを比較します。
+"""
+
+import os
+import sys
+import time
+import errno
+import select
+import struct
+import threading
+import traceback
+
+# ポーリングで監視する場合の確認間隔 (秒)
+DIRECTORY_POLL_SECONDS = 2.0
+# 最初の変更を受け取ってから通知するまでの待ち時間 (秒)。この間の変更はまとめて通知する
+WATCH_COALESCE_SECONDS = 0.1
+
+# inotify の定数 (linux/inotify.h)
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_FROM = 0x00000040
+_IN_MOVED_TO = 0x00000080
+_IN_DELETE = 0x00000200
+_IN_DELETE_SELF = 0x00000400
+_IN_MOVE_SELF = 0x00000800
+_IN_Q_OVERFLOW = 0x00004000
+_IN_IGNORED = 0x00008000
+_IN_EVENT = struct.Struct('iIII')  # wd, mask, cookie, len
+
+# inotify では他のマシンからの変更を受け取れないファイルシステム
+_NETWORK_FILESYSTEMS = frozenset(['nfs', 'nfs4', 'cifs', 'smb3', 'smbfs', 'ncpfs', 'afs', '9p',
+                                  'ceph', 'glusterfs', 'lustre', 'gpfs', 'fuse.sshfs'])
+
+
+def is_network_filesystem(path):
+    """
+    パスがネットワークファイルシステム上にあるかどうかを返す (Linux のみ判定)。
+
+    Args:
+        path (str): 調べるパス。
+
+    Returns:
+        bool: /proc/self/mounts でネットワークファイルシステムと判定できた場合はTrue。
+    """
+    path = os.path.realpath(path)
+    fstype, mount_length = None, -1
+    try:
+        with open('/proc/self/mounts', 'r', encoding='utf-8', errors='replace') as f:
+            for line in f:
+                fields = line.split()
+                if len(fields) < 3:
+                    continue
+                mount_point = fields[1].replace('\\040', ' ')
+                inside = path == mount_point or path.startswith(mount_point.rstrip('/') + '/')
+                if inside and len(mount_point) > mount_length:
+                    fstype, mount_length = fields[2], len(mount_point)
+    except OSError:
+        return False
+    return fstype in _NETWORK_FILESYSTEMS
+
+
+class _Inotify:
+    """ctypes で libc の inotify を呼び出す、1つのディレクトリ用のラッパー。"""
+    def __init__(self, directory):
+        """
+        Raises:
+            OSError: inotify を使用できない場合。
+        """
+        import ctypes
+        import ctypes.util
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+            init, add_watch = libc.inotify_init1, libc.inotify_add_watch
+        except (OSError, AttributeError) as e:
+            raise OSError(errno.ENOSYS, "inotify を使用できません。") from e
+        self.fd = init(os.O_CLOEXEC | os.O_NONBLOCK)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 に失敗しました。")
+        mask = (_IN_CLOSE_WRITE | _IN_MOVED_FROM | _IN_MOVED_TO | _IN_DELETE
+                | _IN_DELETE_SELF | _IN_MOVE_SELF)
+        if add_watch(self.fd, os.fsencode(directory), mask) < 0:
+            code = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(code, "inotify_add_watch に失敗しました。", directory)
+
+    def read(self, timeout):
+        """
+        イベントを読み込む。
+
+        Args:
+            timeout (float): イベントを待つ最大時間 (秒)。
+
+        Returns:
+            tuple: (変更されたファイル名の集合, ファイル名を特定できない変更があったか,
+                ディレクトリ自体が削除・移動されたか)。
+        """
+        filenames, overflow, gone = set(), False, False
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return filenames, overflow, gone
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return filenames, overflow, gone
+        offset = 0
+        while offset + _IN_EVENT.size <= len(data):
+            _, mask, _, length = _IN_EVENT.unpack_from(data, offset)
+            offset += _IN_EVENT.size
+            name = data[offset:offset + length].rstrip(b'\0')
+            offset += length
+            if mask & _IN_Q_OVERFLOW:
+                overflow = True
+            elif mask & (_IN_DELETE_SELF | _IN_MOVE_SELF | _IN_IGNORED):
+                gone = True
+            elif name:
+                filenames.add(os.fsdecode(name))
+        return filenames, overflow, gone
+
+    def close(self):
+        os.close(self.fd)
+
+
+class DirectoryWatcher:
+    """
+    ディレクトリ直下のファイルの変更を監視し、変更されたファイル名を通知するクラス。
+
+    監視はバックグラウンドスレッドで行い、on_change はそのスレッドから
+    on_change(filenames) の形式で呼び出されます。filenames は変更 (作成・更新・削除・改名) された
+    ファイル名の集合で、どのファイルが変更されたか分からない場合 (inotify のキューが溢れた場合など) は None です。
+    コンストラクタから戻った時点以降の変更を通知するため、監視を開始してから
+    ディレクトリを読み込めば変更を取りこぼしません。
+    """
+    def __init__(self, directory, on_change, poll_interval=DIRECTORY_POLL_SECONDS, use_inotify=None):
+        """
+        DirectoryWatcherクラスのコンストラクタ。
+
+        Args:
+            directory (str): 監視するディレクトリのパス。
+            on_change (callable): 変更を受け取るコールバック。
+            poll_interval (float): ポーリングで監視する場合の確認間隔 (秒)。
+            use_inotify (bool, optional): inotify を使用するかどうか。省略した場合は
+                Linux のローカルファイルシステムであれば使用します。
+
+        Raises:
+            OSError: ディレクトリを読み込めない場合。
+        """
+        self.directory = directory
+        self.on_change = on_change
+        self.poll_interval = poll_interval
+        self._stop = threading.Event()
+        self._inotify = None
+        if use_inotify is None:
+            use_inotify = sys.platform.startswith('linux') and not is_network_filesystem(directory)
+        if use_inotify:
+            try:
+                self._inotify = _Inotify(directory)
+            except OSError:
+                self._inotify = None
+        self.method = 'inotify' if self._inotify is not None else 'poll'
+        self._snapshot = None if self._inotify is not None else self._scan()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def close(self):
+        """監視を終了する。"""
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        """監視スレッドの本体。"""
+        if self._inotify is not None:
+            try:
+                self._watch_inotify()
+            finally:
+                self._inotify.close()
+                self._inotify = None
+            if self._stop.is_set():
+                return
+            # ディレクトリが削除・移動された場合は、作り直されるのをポーリングで待つ
+            self.method = 'poll'
+            self._snapshot = {}
+        self._watch_poll()
+
+    def _watch_inotify(self):
+        """inotify のイベントを受け取って通知する。ディレクトリがなくなった場合は戻る。"""
+        while not self._stop.is_set():
+            filenames, overflow, gone = self._inotify.read(0.5)
+            if not (filenames or overflow or gone):
+                continue
+            # 続けて届く変更をまとめる
+            deadline = time.monotonic() + WATCH_COALESCE_SECONDS
+            while not gone:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                more, more_overflow, gone = self._inotify.read(remaining)
+                filenames |= more
+                overflow = overflow or more_overflow
+            if gone:
+                return
+            self._notify(None if overflow else filenames)
+
+    def _watch_poll(self):
+        """一定間隔でディレクトリを走査し、更新時刻かサイズが変わったファイルを通知する。"""
+        while not self._stop.wait(self.poll_interval):
+            try:
+                snapshot = self._scan()
+            except OSError:
+                continue  # 共有ディレクトリに一時的に接続できない場合は次の確認を待つ
+            previous, self._snapshot = self._snapshot, snapshot
+            changed = {name for name in previous.keys() | snapshot.keys()
+                       if previous.get(name) != snapshot.get(name)}
+            if changed:
+                self._notify(changed)
+
+    def _scan(self):
+        """
+        ディレクトリ直下のファイルの状態を取得する。
+
+        Returns:
+            dict: ファイル名 → (更新時刻 (ナノ秒), サイズ)。
+        """
+        snapshot = {}
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_file():
+                        stat = entry.stat()
+                        snapshot[entry.name] = (stat.st_mtime_ns, stat.st_size)
+                except FileNotFoundError:
+                    pass  # 走査中に削除された
+        return snapshot
+
+    def _notify(self, filenames):
+        """コールバックを呼び出す。コールバックの例外で監視が止まらないようにする。"""
+        try:
+            self.on_change(filenames)
+        except Exception:
+            traceback.print_exc(file=sys.stderr)
@@ -0,0 +1,235 @@
+"""
+テンプレートの版の履歴を保存するモジュール。
+
+TemplateHistory はテンプレートを保存するたびに、前の版からの行単位の差分 (difflib による) を
+SQLite データベース (history.db) に1行追記します。HISTORY_SNAPSHOT_INTERVAL 版ごとに
+zlib で圧縮した本文全体 (スナップショット) を保存するため、どの版も直前のスナップショットから高々
+HISTORY_SNAPSHOT_INTERVAL - 1 個の差分を適用するだけで復元できます。
+履歴の大きさは本文の複製ではなく、編集した量にほぼ比例します。
+"""
+
+import json
+import time
+import zlib
+import sqlite3
+import difflib
+import threading
+from collections import OrderedDict
+
+# この版数ごとに本文全体を保存する
+HISTORY_SNAPSHOT_INTERVAL = 10
+# 最新版の本文をメモリ上に保持するテンプレートの数 (次の版の差分の計算に使用)
+_LATEST_CACHE_SIZE = 64
+
+
+def make_delta(old_lines, new_lines):
+    """
+    2つの版の行の差分を作成する。
+
+    差分は JSON に変換できるリストで、要素が [開始, 終了] の場合は前の版の行 [開始, 終了) をそのまま使い、
+    文字列の場合はその文字列 (1行以上の挿入・置換された行) を挿入することを表します。
+
+    Args:
+        old_lines (list): 前の版の行のリスト (改行を含む)。
+        new_lines (list): 新しい版の行のリスト (改行を含む)。
+
+    Returns:
+        list: 差分。
+    """
+    delta = []
+    matcher = difflib.SequenceMatcher(None, old_lines, new_lines, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal':
+            delta.append([i1, i2])
+        elif j2 > j1:  # 'replace' と 'insert'。'delete' は何も出力しない
+            delta.append(''.join(new_lines[j1:j2]))
+    return delta
+
+
+def apply_delta(old_lines, delta):
+    """
+    前の版の行に差分を適用して、新しい版の本文を作成する。
+
+    Args:
+        old_lines (list): 前の版の行のリスト (改行を含む)。
+        delta (list): make_delta で作成した差分。
+
+    Returns:
+        str: 新しい版の本文。
+    """
+    parts = []
+    for item in delta:
+        if isinstance(item, str):
+            parts.append(item)
+        else:
+            parts.extend(old_lines[item[0]:item[1]])
+    return ''.join(parts)
+
+
+class TemplateHistory:
+    """
+    テンプレートの版の履歴を SQLite データベースに保存するクラス。
+
+    版は1から始まる通し番号で、テンプレートの名前ごとに管理します。
+    複数のウィンドウやバックグラウンドスレッドから利用されるため、接続の利用はロックで直列化します。
+    """
+    def __init__(self, path, snapshot_interval=HISTORY_SNAPSHOT_INTERVAL):
+        """
+        TemplateHistoryクラスのコンストラクタ。
+
+        Args:
+            path (str): データベースファイルのパス。
+            snapshot_interval (int): 本文全体を保存する間隔 (版数)。
+        """
+        self.path = path
+        self.snapshot_interval = max(1, snapshot_interval)
+        self.connection = sqlite3.connect(self.path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._latest = OrderedDict()  # 名前 → (最新の版, 本文)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        with self.connection:
+            self.connection.execute(
+                'CREATE TABLE IF NOT EXISTS versions ('
+                'name TEXT NOT NULL, '
+                'version INTEGER NOT NULL, '
+                'snapshot INTEGER NOT NULL, '  # 1: data は zlib で圧縮した本文全体、0: data は前の版からの差分 (JSON)
+                'data BLOB NOT NULL, '
+                'saved_at REAL NOT NULL, '
+                'added INTEGER NOT NULL, '  # 前の版から追加・変更された行数
+                'removed INTEGER NOT NULL, '  # 前の版から削除・変更された行数
+                'PRIMARY KEY (name, version))'
+            )
+
+    def record(self, name, template, previous=None):
+        """
+        テンプレートの新しい版を記録する。
+
+        最新の版と同じ内容の場合は記録しません。履歴がないテンプレートで previous を指定した場合は、
+        先に previous を最初の版として記録します (履歴の機能を使う前から登録されていたテンプレート)。
+
+        Args:
+            name (str): テンプレート名。
+            template (str): 新しい本文。
+            previous (str, optional): 変更前の本文。
+
+        Returns:
+            int or None: 記録した版。記録しなかった場合は None。
+        """
+        with self._lock, self.connection:
+            latest = self._load_latest(name)
+            if latest is None and previous is not None and previous != template:
+                self._insert(name, 1, previous, None)
+                latest = (1, previous)
+            if latest is not None and latest[1] == template:
+                return None
+            version = latest[0] + 1 if latest is not None else 1
+            self._insert(name, version, template, latest[1] if latest is not None else None)
+            return version
+
+    def _insert(self, name, version, template, previous):
+        """版を1行追加し、最新版のキャッシュを更新する (ロックを取得した状態で呼び出す)。"""
+        new_lines = template.splitlines(keepends=True)
+        if previous is None:
+            added, removed = len(new_lines), 0
+        else:
+            old_lines = previous.splitlines(keepends=True)
+            delta = make_delta(old_lines, new_lines)
+            kept = sum(item[1] - item[0] for item in delta if not isinstance(item, str))
+            added, removed = len(new_lines) - kept, len(old_lines) - kept
+        if previous is None or (version - 1) % self.snapshot_interval == 0:
+            data = zlib.compress(template.encode('utf-8', 'surrogatepass'))
+            row = (name, version, 1, data, time.time(), added, removed)
+        else:
+            data = json.dumps(delta, ensure_ascii=False, separators=(',', ':'))
+            row = (name, version, 0, data, time.time(), added, removed)
+        self.connection.execute('INSERT OR REPLACE INTO versions VALUES (?, ?, ?, ?, ?, ?, ?)', row)
+        self._latest[name] = (version, template)
+        self._latest.move_to_end(name)
+        while len(self._latest) > _LATEST_CACHE_SIZE:
+            self._latest.popitem(last=False)
+
+    def _load_latest(self, name):
+        """最新の版と本文を取得する (ロックを取得した状態で呼び出す)。"""
+        latest = self._latest.get(name)
+        if latest is not None:
+            self._latest.move_to_end(name)
+            return latest
+        row = self.connection.execute('SELECT MAX(version) FROM versions WHERE name = ?', (name,)).fetchone()
+        if row[0] is None:
+            return None
+        return row[0], self._rebuild(name, row[0])
+
+    def _rebuild(self, name, version):
+        """直前のスナップショットから差分を順に適用して、版の本文を復元する (ロックを取得した状態で呼び出す)。"""
+        rows = self.connection.execute(
+            'SELECT snapshot, data FROM versions WHERE name = ? AND version <= ? AND version >= '
+            '(SELECT MAX(version) FROM versions WHERE name = ? AND version <= ? AND snapshot = 1) '
+            'ORDER BY version', (name, version, name, version)).fetchall()
+        if not rows:
+            return None
+        text = zlib.decompress(rows[0][1]).decode('utf-8', 'surrogatepass')
+        for _, data in rows[1:]:
+            text = apply_delta(text.splitlines(keepends=True), json.loads(data))
+        return text
+
+    def get(self, name, version):
+        """
+        指定した版の本文を取得する。
+
+        Args:
+            name (str): テンプレート名。
+            version (int): 版。
+
+        Returns:
+            str or None: 本文。版が存在しない場合は None。
+        """
+        with self._lock:
+            latest = self._latest.get(name)
+            if latest is not None and latest[0] == version:
+                return latest[1]
+            return self._rebuild(name, version)
+
+    def versions(self, name):
+        """
+        テンプレートの版の一覧を新しい順に取得する。
+
+        Returns:
+            list: (版, 保存日時 (time.time() の値), 追加・変更行数, 削除・変更行数) のタプルのリスト。
+        """
+        with self._lock:
+            return self.connection.execute(
+                'SELECT version, saved_at, added, removed FROM versions WHERE name = ? ORDER BY version DESC',
+                (name,)).fetchall()
+
+    def rename(self, name, new_name):
+        """
+        テンプレートの改名に合わせて履歴の名前を変更する。
+
+        Args:
+            name (str): 変更前の名前。
+            new_name (str): 変更後の名前。
+        """
+        with self._lock, self.connection:
+            self.connection.execute('DELETE FROM versions WHERE name = ?', (new_name,))
+            self.connection.execute('UPDATE versions SET name = ? WHERE name = ?', (new_name, name))
+            self._latest.pop(new_name, None)
+            latest = self._latest.pop(name, None)
+            if latest is not None:
+                self._latest[new_name] = latest
+
+    def delete(self, name):
+        """
+        テンプレートの履歴を削除する。
+
+        Args:
+            name (str): テンプレート名。
+        """
+        with self._lock, self.connection:
+            self.connection.execute('DELETE FROM versions WHERE name = ?', (name,))
+            self._latest.pop(name, None)
+
+    def close(self):
+        """データベースの接続を閉じる。"""
+        with self._lock:
+            self.connection.close()
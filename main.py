@@ -1,21 +1,122 @@
 """
 アプリケーションのエントリーポイント。
 
-Tkinterアプリケーションのメインループを開始します。
+引数なしで起動した場合はTkinterアプリケーションのメインループを開始します。
+第1引数に render を指定した場合は、GUIを起動せずにコマンドラインからテンプレートを描画します。
+
+--profile-startup を指定した場合は起動処理の各フェーズとインポートの所要時間を計測し、
+全てのテンプレートの読み込みと検索索引の作成が終わった時点でJSONのレポートを書き出して終了します。
+
+設定で single_instance が有効な場合、既に起動中のプロセスがあればそのウィンドウを
+前面に表示させて (--open を指定した場合はテンプレートを開かせて) すぐに終了します。
 """
 
-import tkinter as tk
-from views import FlashPromptApp
+import sys
+import argparse
+
+def parse_args(argv):
+    """
+    GUI起動時のコマンドライン引数を解析する。
+
+    Args:
+        argv (list): コマンドライン引数。
+
+    Returns:
+        argparse.Namespace: 解析結果。
+    """
+    parser = argparse.ArgumentParser(prog='flashprompt')
+    parser.add_argument('--open', metavar='NAME', help="指定したテンプレートでプロンプト作成ウィンドウを開く")
+    parser.add_argument('--profile-startup', metavar='PATH', nargs='?', const='startup_profile.json',
+                        help="起動時間を計測してJSONのレポートを書き出す (既定: startup_profile.json)")
+    return parser.parse_args(argv)
+
+def _finish_profile_when_ready(root, app, profiler, path):
+    """
+    最初の画面の表示、テンプレートの読み込み、検索索引の作成が終わるのを待ってレポートを書き出す。
+
+    Args:
+        root (tk.Tk): ルートウィンドウ。
+        app (FlashPromptApp): 計測中のアプリケーション。
+        profiler (StartupProfiler): 計測に使用している StartupProfiler。
+        path (str): レポートを書き出すファイルのパス。
+    """
+    import profiling
+
+    def on_map(event):
+        if event.widget is root:
+            root.after_idle(profiler.mark, 'first_frame')
+
+    def poll():
+        if all(name in profiler.marks for name in ('first_frame', 'prompts_loaded', 'search_index_ready')):
+            profiler.info['prompt_count'] = len(app.prompt_manager)
+            profiling.stop()
+            profiler.write_report(path)
+            root.destroy()
+        else:
+            root.after(10, poll)
+
+    root.bind('<Map>', on_map, add='+')
+    root.after(10, poll)
 
 def main():
     """
     アプリケーションのメイン関数。
 
     Tkinterのルートウィンドウを作成し、FlashPromptAppを実行します。
+    tkinter はGUIを起動する場合にだけ読み込みます。
     """
+    # exe 版で起動された描画用のワーカープロセスは、引数 (--multiprocessing-fork ...) を解析する前に
+    # ここでワーカーとして実行して終了する
+    import multiprocessing
+    multiprocessing.freeze_support()
+
+    if sys.argv[1:2] == ['render']:
+        import cli
+        sys.exit(cli.main(sys.argv[2:]))
+
+    args = parse_args(sys.argv[1:])
+    if args.profile_startup:
+        import profiling
+        profiler = profiling.start()
+
+    from models import SettingsManager
+    instance_server = None
+    # 計測時は起動中のプロセスを再利用しない
+    if not args.profile_startup and SettingsManager().get_settings().get('single_instance', False):
+        import single_instance
+        message = {'command': 'open', 'name': args.open} if args.open else {'command': 'show'}
+        if single_instance.notify_running_instance(message):
+            return
+        try:
+            instance_server = single_instance.InstanceServer()
+        except OSError:
+            # 同時に起動した他のプロセスが先に待ち受けを始めた場合は、そちらに表示させる
+            if single_instance.notify_running_instance(message):
+                return
+            instance_server = None  # 待ち受けできない場合は通常どおり起動する
+
+    if args.profile_startup:
+        with profiler.phase('import_tkinter'):
+            import tkinter as tk
+        with profiler.phase('import_views'):
+            from views import FlashPromptApp
+        with profiler.phase('tk_init'):
+            root = tk.Tk()
+        with profiler.phase('app_init'):
+            app = FlashPromptApp(root, open_name=args.open)
+        _finish_profile_when_ready(root, app, profiler, args.profile_startup)
+        root.mainloop()
+        return
+
+    import tkinter as tk
+    from views import FlashPromptApp
     root = tk.Tk()
-    app = FlashPromptApp(root)
-    root.mainloop()
+    try:
+        app = FlashPromptApp(root, instance_server=instance_server, open_name=args.open)
+        root.mainloop()
+    finally:
+        if instance_server is not None:
+            instance_server.close()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,68 +1,457 @@
 import os
+import sys
 import json
+import sqlite3
+import traceback
 from constants import DEFAULT_SETTINGS
+from storage import create_storage, unique_name
+from persistence import atomic_write, get_writer
+from template_engine import TemplateComposer
+from history import TemplateHistory
+
+
+def get_appdata_path():
+    """
+    アプリケーションデータディレクトリのパスを取得する。
+
+    Windowsでは %LOCALAPPDATA%/flashprompt を使用します。LOCALAPPDATA が定義されていない環境
+    (コマンドライン描画をLinuxで実行する場合など) では ~/.local/share/flashprompt を使用します。
+
+    Returns:
+        str: アプリケーションデータディレクトリのパス。
+    """
+    base = os.getenv('LOCALAPPDATA') or os.path.join(os.path.expanduser('~'), '.local', 'share')
+    return os.path.join(base, 'flashprompt')
+
+
+class Prompt:
+    """
+    1件のプロンプトを表すレコード。
+
+    __slots__ で属性を固定してインスタンスごとの辞書を持たないため、辞書で保持するより
+    1件あたりのメモリ使用量が小さくなります。名前は sys.intern で共有します。
+    辞書と同じく prompt['name'] や prompt['template']、prompt.get('name') でアクセスできます。
+
+    template_loader を指定した場合は本文をメモリに保持せず、参照されるたびに
+    template_loader(名前) でストレージから読み込みます。本文を設定すると以降はその値を保持します。
+    """
+    __slots__ = ('name', '_template', '_loader')
+
+    KEYS = ('name', 'template')
+
+    def __init__(self, name, template=None, template_loader=None):
+        """
+        Promptクラスのコンストラクタ。
+
+        Args:
+            name (str): プロンプト名。
+            template (str, optional): テンプレート本文。
+            template_loader (callable, optional): 名前を受け取って本文を返す関数。
+                template を省略した場合に使用します。
+        """
+        self.name = sys.intern(str(name))
+        self._template = template
+        self._loader = template_loader if template is None else None
+
+    @property
+    def template(self):
+        """テンプレート本文。遅延読み込みの場合はストレージから読み込みます。"""
+        if self._loader is not None:
+            return self._loader(self.name)
+        return self._template
+
+    @template.setter
+    def template(self, value):
+        self._template = value
+        self._loader = None
+
+    @property
+    def is_loaded(self):
+        """本文をメモリに保持している場合はTrue。"""
+        return self._loader is None
+
+    def load(self):
+        """遅延読み込みの本文をストレージから読み込んで保持する。"""
+        if self._loader is not None:
+            self.template = self._loader(self.name)
+
+    def __getitem__(self, key):
+        if key == 'name':
+            return self.name
+        if key == 'template':
+            return self.template
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        if key == 'name':
+            self.name = sys.intern(str(value))
+        elif key == 'template':
+            self.template = value
+        else:
+            raise KeyError(key)
+
+    def get(self, key, default=None):
+        """辞書の get と同じく、キーがない場合は default を返す。"""
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def keys(self):
+        return self.KEYS
+
+    def __iter__(self):
+        return iter(self.KEYS)
+
+    def __len__(self):
+        return len(self.KEYS)
+
+    def __contains__(self, key):
+        return key in self.KEYS
+
+    def __eq__(self, other):
+        if isinstance(other, (Prompt, dict)):
+            return self.to_dict() == dict(other)
+        return NotImplemented
+
+    __hash__ = None  # 辞書と同じく変更可能なためハッシュ不可
+
+    def __repr__(self):
+        return f"Prompt(name={self.name!r})"
+
+    def to_dict(self):
+        """
+        辞書に変換する。
+
+        Returns:
+            dict: {'name': 'prompt_name', 'template': 'prompt_template'} 形式の辞書。
+        """
+        return {'name': self.name, 'template': self.template}
+
+
+class DuplicatePromptError(ValueError):
+    """同じ名前のプロンプトが既に存在する場合に送出される例外。"""
+
 
 class PromptManager:
     """
     プロンプトの保存、読み込み、管理を行うクラス。
 
-    プロンプトはJSONファイルに保存され、アプリケーションのローカルアプリケーションデータディレクトリに格納されます。
+    プロンプトはストレージバックエンド (SQLite、JSON など) を通して
+    アプリケーションのローカルアプリケーションデータディレクトリ、または設定した共有ディレクトリに格納されます。
+    メモリ上では登録順を保持した「名前→プロンプト」の索引で管理するため、
+    名前による取得と削除は O(1) で行えます。
+    各プロンプトは Prompt レコードで保持し、辞書と同じ形式で参照できます。
     """
-    def __init__(self):
+    def __init__(self, backend=None, appdata_path=None, load=True, lazy_templates=None, template_directory=None,
+                 read_only=False):
         """
         PromptManagerクラスのコンストラクタ。
 
-        アプリケーションデータディレクトリのパスを設定し、ディレクトリとプロンプトファイルを初期化します。
+        アプリケーションデータディレクトリのパスを設定し、ストレージを初期化してプロンプトを読み込みます。
+
+        Args:
+            backend (str, optional): ストレージバックエンド ('sqlite'、'json'、'packed'、'directory' のいずれか)。
+                省略した場合は、設定ファイルの 'save_directory' が設定されていれば 'directory'、
+                そうでなければ 'storage_backend' を使用します。
+            appdata_path (str, optional): データディレクトリのパス。省略した場合は get_appdata_path() を使用します。
+            load (bool): False の場合はプロンプトを読み込まずに空の状態で作成します。
+                呼び出し側で read_storage、add_loaded_prompts、finish_loading を順に呼び出して読み込みを完了させます。
+            lazy_templates (bool, optional): True の場合、テンプレート本文を読み込まずに名前だけを読み込み、
+                本文は参照されたときにストレージから読み込みます (SQLite のみ。'packed' は常に遅延読み込み)。
+                省略した場合は設定ファイルの 'lazy_templates' を使用します。
+            template_directory (str, optional): 'directory' の場合にテンプレートを1件1ファイルで保存する保存ディレクトリ。
+                指定した場合は backend を省略すると 'directory' になります。省略した場合は設定ファイルの 'save_directory' を使用します。
+                初めて使う保存ディレクトリには、設定ファイルの 'storage_backend' のライブラリを取り込みます。
+            read_only (bool): True の場合はストレージを読み取り専用で開き、データベースの作成や取り込み、
+                重複した名前の書き直しを行いません (コマンドラインからの描画で使用)。保存・更新・削除はできません。
+        """
+        self.appdata_path = appdata_path or get_appdata_path()
+        self.read_only = read_only
+        if not read_only:
+            self._ensure_directory()
+        if backend is None and template_directory:
+            backend = 'directory'
+        library_backend = None
+        if backend is None or lazy_templates is None or (backend == 'directory' and not read_only):
+            settings = SettingsManager(self.appdata_path, read_only=read_only).get_settings()
+            if backend is None:
+                backend = 'directory' if settings.get('save_directory') else \
+                    settings.get('storage_backend', DEFAULT_SETTINGS['storage_backend'])
+            if backend == 'directory' and not template_directory:
+                template_directory = settings.get('save_directory')
+            if backend == 'directory':
+                library_backend = settings.get('storage_backend', DEFAULT_SETTINGS['storage_backend'])
+            if lazy_templates is None:
+                lazy_templates = settings.get('lazy_templates', DEFAULT_SETTINGS['lazy_templates'])
+        self.lazy_templates = lazy_templates
+        self.backend = backend
+        self.storage = create_storage(backend, self.appdata_path, template_directory, read_only=read_only,
+                                      library_backend=library_backend)
+        self.renamed_duplicates = []  # 読み込み時に重複していた名前の (元の名前, 新しい名前) のリスト
+        self._listeners = []
+        self._index = {}
+        self.loaded = False
+        # {{> テンプレート名}} の展開結果と依存関係。プロンプトの変更通知に合わせて破棄する
+        self.composer = TemplateComposer(self._get_template)
+        self._history = None  # TemplateHistory (最初に使用したときに開く)
+        if load:
+            self.add_loaded_prompts(self.read_storage())
+            self.finish_loading()
+
+    @property
+    def prompts(self):
+        """
+        登録順のプロンプトのリスト。
+
+        Returns:
+            list: Prompt のリスト。
+        """
+        return list(self._index.values())
+
+    def names(self):
+        """
+        登録順のプロンプト名のリストを取得する。
+
+        Returns:
+            list: プロンプト名のリスト。
+        """
+        return list(self._index)
+
+    def __len__(self):
+        return len(self._index)
+
+    def __contains__(self, name):
+        return name in self._index
+
+    def add_listener(self, callback):
+        """
+        プロンプトの変更通知を受け取るコールバックを登録する。
+
+        コールバックは callback(event, name, prompt) の形式で呼び出されます。
+        event は 'insert'、'update'、'remove' のいずれかで、name は変更前の名前、
+        prompt は対象のプロンプトの辞書です。
+
+        Args:
+            callback (callable): 登録するコールバック。
         """
-        self.appdata_path = os.path.join(os.getenv('LOCALAPPDATA'), 'flashprompt')
-        self.prompts_file = os.path.join(self.appdata_path, 'prompts.json')
-        self._ensure_directory()
-        self.prompts = self._load_prompts()
+        self._listeners.append(callback)
+
+    def remove_listener(self, callback):
+        """
+        登録済みのコールバックを解除する。
+
+        Args:
+            callback (callable): 解除するコールバック。
+        """
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    def _notify(self, event, name, prompt):
+        """
+        登録済みのコールバックに変更を通知する。
+
+        変更されたテンプレートを取り込んでいるテンプレートの展開結果もここで破棄します。
+        """
+        self.composer.invalidate(name)
+        if prompt['name'] != name:
+            self.composer.invalidate(prompt['name'])
+        for callback in list(self._listeners):
+            callback(event, name, prompt)
+
+    @property
+    def history(self):
+        """
+        テンプレートの版の履歴。
+
+        コマンドラインからの描画など履歴を使わない場合にデータベースを開かないよう、最初に参照したときに開きます。
+
+        Returns:
+            TemplateHistory: 版の履歴。
+        """
+        if self._history is None:
+            self._history = TemplateHistory(os.path.join(self.appdata_path, 'history.db'))
+        return self._history
+
+    def _update_history(self, method, *args):
+        """
+        版の履歴を更新する。
+
+        履歴の書き込みに失敗してもテンプレートの保存は完了しているため、エラーは表示するだけにします。
+        """
+        try:
+            getattr(self.history, method)(*args)
+        except sqlite3.Error:
+            traceback.print_exc()
 
     def _ensure_directory(self):
         """
-        アプリケーションデータディレクトリとプロンプトファイルが存在することを保証する。
+        アプリケーションデータディレクトリが存在することを保証する。
 
-        存在しない場合は、ディレクトリと空のプロンプトファイルを作成します。
+        存在しない場合は、ディレクトリを作成します。
         """
         if not os.path.exists(self.appdata_path):
             os.makedirs(self.appdata_path)
-        if not os.path.exists(self.prompts_file):
-            with open(self.prompts_file, 'w', encoding='utf-8') as f:
-                json.dump([], f)
 
-    def _load_prompts(self):
+    def read_storage(self):
         """
-        プロンプトファイルからプロンプトを読み込む。
+        ストレージからプロンプトを読み込む。
 
-        ファイルが存在しない場合やJSONの読み込みに失敗した場合は、空のリストを返します。
+        索引には触れないため、バックグラウンドスレッドから呼び出せます。
+        読み込みが終わるまでは他の操作でストレージに書き込まないでください。
+        lazy_templates が有効 (またはストレージが常に遅延読み込みする) で、ストレージが名前だけの読み込みに対応している場合は
+        本文を遅延読み込みする Prompt を返します。名前が重複している場合は本文を名前で
+        特定できないため、全ての本文を読み込みます。
 
         Returns:
-            list: プロンプトのリスト。各プロンプトは辞書形式 ({'name': 'prompt_name', 'template': 'prompt_template'}) です。
+            list: Prompt のリスト。
         """
-        try:
-            with open(self.prompts_file, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except (FileNotFoundError, json.JSONDecodeError): # ファイルが見つからない、またはJSONデコードに失敗した場合の例外処理を追加
-            return []
+        lazy = self.lazy_templates or getattr(self.storage, 'lazy_templates', False)
+        if lazy and hasattr(self.storage, 'load_names'):
+            names = self.storage.load_names()
+            if len(set(names)) == len(names):
+                loader = self.storage.load_template
+                return [Prompt(name, template_loader=loader) for name in names]
+        return [Prompt(p['name'], p['template']) for p in self.storage.load()]
+
+    def add_loaded_prompts(self, prompts):
+        """
+        読み込んだプロンプトを名前の索引に追加する。
+
+        同じ名前のプロンプトが既にある場合は、後のものを「名前 (2)」のように改名して
+        renamed_duplicates に記録します。ストレージへの反映は finish_loading で行います。
+        変更通知は行いません。
+
+        Args:
+            prompts (iterable): Prompt、またはプロンプトの辞書 ({'name': 'prompt_name', 'template': 'prompt_template'}) の列。
+
+        Returns:
+            list: 追加したプロンプト名のリスト。
+        """
+        index = self._index
+        names = []
+        for prompt in prompts:
+            if not isinstance(prompt, Prompt):
+                prompt = Prompt(prompt['name'], prompt['template'])
+            name = prompt.name
+            if name in index:
+                new_name = unique_name(name, index)
+                self.renamed_duplicates.append((name, new_name))
+                name = new_name
+            prompt['name'] = name
+            index[name] = prompt
+            names.append(name)
+        return names
+
+    def finish_loading(self):
+        """
+        読み込みを完了する。
+
+        読み込み中に改名したプロンプトがあれば、ストレージ全体を書き直して反映します (read_only の場合はメモリ上だけで改名します)。
+        """
+        if self.renamed_duplicates and not self.read_only:
+            self.storage.rewrite(list(self._index.values()))
+        self.composer.clear()  # 読み込み中に展開したものは未読み込みのパーシャルを含む可能性がある
+        self.loaded = True
+
+    def _check_writable(self):
+        """読み取り専用で開いている場合に PermissionError を送出する。"""
+        if self.read_only:
+            raise PermissionError("プロンプトは読み取り専用で開かれています。")
+
+    def _check_case_conflict(self, name, ignore=None):
+        """
+        大文字と小文字を区別しないストレージで、大文字と小文字だけが異なる名前のプロンプトがあれば
+        DuplicatePromptError を送出する。
+
+        Args:
+            name (str): 保存する名前。
+            ignore (str, optional): 判定から除く名前 (改名前の名前)。
+        """
+        if not getattr(self.storage, 'case_insensitive_names', False):
+            return
+        folded = name.casefold()
+        for existing in self._index:
+            if existing != ignore and existing.casefold() == folded:
+                raise DuplicatePromptError(existing)
 
     def save_prompt(self, name, template):
         """
         新しいプロンプトを保存します。
+
+        Raises:
+            DuplicatePromptError: 同じ名前のプロンプトが既に存在する場合。
+            PermissionError: 読み取り専用で開いている場合。
+        """
+        self._check_writable()
+        prompt = Prompt(name, template)  # name は文字列に変換される
+        if prompt['name'] in self._index:
+            raise DuplicatePromptError(prompt['name'])
+        self._check_case_conflict(prompt['name'])
+        self._index[prompt['name']] = prompt
+        self.storage.insert(prompt, self._index.values())
+        self._update_history('record', prompt['name'], prompt['template'])
+        self._notify('insert', prompt['name'], prompt)
+
+    def update_prompt(self, name, template, new_name=None):
         """
-        prompt = {
-            'name': str(name), # name を文字列に変換
-            'template': template
-        }
-        self.prompts.append(prompt)
-        self._save_to_file()
+        既存のプロンプトの内容を更新する。
+
+        一覧内の位置は変えずに、テンプレート (と必要であれば名前) を書き換えます。
+        変更前と変更後のテンプレートは版の履歴 (history) に記録します。
 
-    def _save_to_file(self):
+        Args:
+            name (str): 更新するプロンプトの名前。
+            template (str): 新しいテンプレート。
+            new_name (str, optional): 新しい名前。省略した場合は名前を変更しません。
+
+        Returns:
+            bool: プロンプトが見つかり更新された場合はTrue。
+
+        Raises:
+            DuplicatePromptError: 新しい名前のプロンプトが既に存在する場合。
+            PermissionError: 読み取り専用で開いている場合。
         """
-        プロンプトを JSON ファイルに保存します。
+        self._check_writable()
+        prompt = self._index.get(name)
+        if prompt is None:
+            return False
+        # 版の履歴に記録するため、変更前の本文を何も書き換えないうちに読み出しておく
+        previous = prompt['template']
+        if new_name is not None and str(new_name) != name:
+            new_name = str(new_name)
+            if new_name in self._index:
+                raise DuplicatePromptError(new_name)
+            self._check_case_conflict(new_name, name)
+            # 登録順を保つため、改名時のみ索引を作り直す
+            self._index = {(new_name if key == name else key): value for key, value in self._index.items()}
+            prompt['name'] = new_name
+        prompt['template'] = template
+        self.storage.update(name, prompt, self._index.values())
+        if prompt['name'] != name:
+            self._update_history('rename', name, prompt['name'])
+        self._update_history('record', prompt['name'], template, previous)
+        self._notify('update', name, prompt)
+        return True
+
+    def rename_prompt(self, name, new_name):
         """
-        with open(self.prompts_file, 'w', encoding='utf-8') as f:
-            json.dump(self.prompts, f, ensure_ascii=False, indent=2)
+        プロンプトの名前を変更する。
+
+        Args:
+            name (str): 現在の名前。
+            new_name (str): 新しい名前。
+
+        Returns:
+            bool: プロンプトが見つかり改名された場合はTrue。
+
+        Raises:
+            DuplicatePromptError: 新しい名前のプロンプトが既に存在する場合。
+        """
+        prompt = self._index.get(name)
+        if prompt is None:
+            return False
+        return self.update_prompt(name, prompt['template'], new_name=new_name)
 
     def delete_prompt(self, name):
         """
@@ -70,9 +459,86 @@ class PromptManager:
 
         Args:
             name (str): 削除するプロンプトの名前。
+
+        Raises:
+            PermissionError: 読み取り専用で開いている場合。
+        """
+        self._check_writable()
+        prompt = self._index.pop(name, None)
+        if prompt is not None:
+            self.storage.delete(name, self._index.values())
+            self._update_history('delete', name)
+            self._notify('remove', name, prompt)
+
+    def apply_external_changes(self, changes, complete=False):
+        """
+        他のプロセスがストレージに加えた変更を索引に反映する。
+
+        ストレージには書き込まず、変更があったプロンプトについてだけ変更通知を行います。
+        内容が同じ場合 (自分で保存したファイルの変更通知など) は何もしません。
+
+        Args:
+            changes (iterable): (名前, テンプレート) の列。テンプレートが None の場合は削除されたことを表します。
+            complete (bool): True の場合は changes をストレージの全内容とみなし、含まれない名前を削除します。
+
+        Returns:
+            int: 索引に反映した変更の件数。
         """
-        self.prompts = [p for p in self.prompts if p['name'] != name]
-        self._save_to_file()
+        count = 0
+        seen = set()
+        for name, template in changes:
+            seen.add(name)
+            prompt = self._index.get(name)
+            if template is None:
+                if prompt is not None:
+                    del self._index[name]
+                    self._notify('remove', name, prompt)
+                    count += 1
+            elif prompt is None:
+                prompt = Prompt(name, template)
+                self._index[prompt['name']] = prompt
+                self._update_history('record', prompt['name'], template)
+                self._notify('insert', prompt['name'], prompt)
+                count += 1
+            elif not prompt.is_loaded or prompt['template'] != template:
+                # 遅延読み込みの本文はストレージから読むと変更後の内容になるため比較できない。
+                # ストレージは前回読み書きした後に変更されたものだけを返すため、変更として扱う
+                previous = prompt['template'] if prompt.is_loaded else None
+                prompt['template'] = template
+                self._update_history('record', name, template, previous)
+                self._notify('update', name, prompt)
+                count += 1
+        if complete:
+            for name in [name for name in self._index if name not in seen]:
+                self._notify('remove', name, self._index.pop(name))
+                count += 1
+        return count
+
+    def copy_to_backend(self, backend):
+        """
+        現在のプロンプト一覧を、アプリケーションデータディレクトリの別のバックエンドのストレージに書き込む。
+
+        設定で保存形式を切り替えたときに呼び出します。以前に使っていた形式のファイル
+        (SQLite に移行した後の prompts.json など) が残っていても、次回の起動時に古い内容が表示されないようにします。
+
+        Args:
+            backend (str): 'sqlite'、'json'、'packed' のいずれか。
+        """
+        self._check_writable()
+        storage = create_storage(backend, self.appdata_path)
+        try:
+            storage.rewrite(self.prompts)
+            get_writer().flush(getattr(storage, 'path', None))
+        finally:
+            if isinstance(getattr(storage, 'connection', None), sqlite3.Connection):
+                storage.connection.close()
+            elif hasattr(storage, 'close'):
+                storage.close()
+
+    def _get_template(self, name):
+        """TemplateComposer がパーシャルを取得するための関数。"""
+        prompt = self._index.get(name)
+        return None if prompt is None else prompt['template']
 
     def get_prompt(self, name):
         """
@@ -82,28 +548,33 @@ class PromptManager:
             name (str): 取得するプロンプトの名前。
 
         Returns:
-            dict or None: プロンプトが見つかった場合はプロンプトの辞書、見つからない場合はNone。
+            Prompt or None: プロンプトが見つかった場合はプロンプト、見つからない場合はNone。
         """
-        for prompt in self.prompts:
-            if prompt['name'] == name:
-                return prompt
-        return None
+        return self._index.get(name)
 
 class SettingsManager:
     """
     アプリケーション設定の保存、読み込み、管理を行うクラス。
 
     設定はJSONファイルに保存され、アプリケーションのローカルアプリケーションデータディレクトリに格納されます。
+    保存は共有の WriteBehindWriter を通してバックグラウンドスレッドで原子的に行います。
     """
-    def __init__(self):
+    def __init__(self, appdata_path=None, read_only=False):
         """
         SettingsManagerクラスのコンストラクタ。
 
         アプリケーションデータディレクトリのパスを設定し、ディレクトリと設定ファイルを初期化します。
+
+        Args:
+            appdata_path (str, optional): データディレクトリのパス。省略した場合は get_appdata_path() を使用します。
+            read_only (bool): True の場合はディレクトリや設定ファイルを作成せずに読み込むだけにします
+                (設定ファイルがなければデフォルト設定を使用します)。設定は保存できません。
         """
-        self.appdata_path = os.path.join(os.getenv('LOCALAPPDATA'), 'flashprompt')
+        self.appdata_path = appdata_path or get_appdata_path()
         self.settings_file = os.path.join(self.appdata_path, 'settings.json')
-        self._ensure_directory()
+        self.read_only = read_only
+        if not read_only:
+            self._ensure_directory()
         self.settings = self._load_settings()
 
     def _ensure_directory(self):
@@ -115,8 +586,7 @@ class SettingsManager:
         if not os.path.exists(self.appdata_path):
             os.makedirs(self.appdata_path)
         if not os.path.exists(self.settings_file):
-            with open(self.settings_file, 'w', encoding='utf-8') as f:
-                json.dump(DEFAULT_SETTINGS, f)
+            atomic_write(self.settings_file, json.dumps(DEFAULT_SETTINGS).encode('utf-8'))
 
     def _load_settings(self):
         """
@@ -128,6 +598,7 @@ class SettingsManager:
         Returns:
             dict: 設定の辞書。
         """
+        get_writer().flush(self.settings_file)  # 保存が予約されていれば書き込みを待つ
         try:
             with open(self.settings_file, 'r', encoding='utf-8') as f:
                 settings = json.load(f)
@@ -143,12 +614,20 @@ class SettingsManager:
         """
         設定を JSON ファイルに保存します。
 
+        書き込みはバックグラウンドスレッドで行うため、すぐに戻ります。
+
         Args:
             settings (dict): 保存する設定の辞書。
+
+        Raises:
+            PermissionError: 読み取り専用で開いている場合。
         """
+        if self.read_only:
+            raise PermissionError("設定は読み取り専用で開かれています。")
         self.settings = settings
-        with open(self.settings_file, 'w', encoding='utf-8') as f:
-            json.dump(settings, f, ensure_ascii=False, indent=2)
+        data = dict(settings)
+        get_writer().submit(self.settings_file,
+                            lambda: json.dumps(data, ensure_ascii=False, indent=2).encode('utf-8'))
 
     def get_settings(self):
         """
@@ -0,0 +1,194 @@
+"""
+ファイルへの書き込みを安全かつ非同期に行うモジュール。
+
+atomic_write は一時ファイルに書き込んで fsync した後に os.replace で置き換えるため、
+書き込み中にプロセスが異常終了しても元のファイルが壊れることはありません。
+WriteBehindWriter はシリアライズと書き込みをバックグラウンドスレッドで行い、
+同じファイルへの連続した保存を1回の書き込みにまとめます。
+"""
+
+import os
+import sys
+import time
+import atexit
+import threading
+import traceback
+
+# 保存要求を受けてから書き込みを始めるまでの待ち時間 (秒)。この間の保存要求はまとめて1回で書き込む
+WRITE_BEHIND_DELAY = 0.2
+
+
+def atomic_write(path, data):
+    """
+    ファイルの内容を原子的に置き換える。
+
+    同じディレクトリの一時ファイルに書き込んで fsync した後、os.replace で置き換えます。
+    POSIX ではディレクトリも fsync して置き換えを確定させます。
+
+    Args:
+        path (str): 書き込むファイルのパス。
+        data (bytes): 書き込む内容。
+    """
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(temp_path, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    if os.name == 'posix':
+        directory = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+        try:
+            os.fsync(directory)
+        finally:
+            os.close(directory)
+
+
+class WriteBehindWriter:
+    """
+    ファイルの書き込みをバックグラウンドスレッドで行うクラス。
+
+    submit で渡したシリアライズ関数はバックグラウンドスレッドで呼び出されます。
+    同じパスに対して書き込み前に複数回 submit された場合は、最後のものだけを書き込みます。
+    書き込みで発生したエラーはパスごとに保持しておき、そのパスを flush したときに送出します。
+    """
+    def __init__(self, delay=WRITE_BEHIND_DELAY):
+        """
+        WriteBehindWriterクラスのコンストラクタ。
+
+        Args:
+            delay (float): 保存要求を受けてから書き込みを始めるまでの待ち時間 (秒)。
+        """
+        self.delay = delay
+        self._pending = {}    # パス → (シリアライズ関数, 書き込み関数)
+        self._writing = set()  # 書き込み中のパス
+        self._errors = {}     # パス → 最後の書き込みで発生したエラー
+        self._condition = threading.Condition()
+        self._closed = False
+        self._urgent = False  # flush 中は待ち時間を待たずに書き込む
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def submit(self, path, serialize, write=atomic_write):
+        """
+        ファイルの書き込みを予約する。
+
+        Args:
+            path (str): 書き込むファイルのパス。
+            serialize (callable): 引数なしで書き込む内容 (bytes) を返す関数。
+                バックグラウンドスレッドで呼び出されるため、変更される可能性のあるデータは
+                呼び出し側でコピーしておいてください。
+            write (callable, optional): パスと内容を受け取って書き込む関数。
+                省略した場合は atomic_write を使用します。
+        """
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("WriteBehindWriter は既に終了しています。")
+            self._pending[path] = (serialize, write)
+            self._condition.notify_all()
+
+    def flush(self, path=None):
+        """
+        予約済みの書き込みが終わるまで待つ。
+
+        Args:
+            path (str, optional): 指定した場合はそのパスの書き込みだけを待ち、そのパスのエラーだけを送出します。
+
+        Raises:
+            Exception: バックグラウンドの書き込みでエラーが発生していた場合 (OSError や
+                シリアライズ中の UnicodeEncodeError など)。送出したエラーは破棄します。
+        """
+        with self._condition:
+            # 待ち時間を待たずに書き込むよう、書き込みスレッドを起こす
+            self._urgent = True
+            self._condition.notify_all()
+            if path is None:
+                self._condition.wait_for(lambda: not self._pending and not self._writing)
+            else:
+                self._condition.wait_for(lambda: path not in self._pending and path not in self._writing)
+            self._urgent = False
+            if path is None:
+                errors, self._errors = list(self._errors.values()), {}
+            else:
+                errors = [self._errors.pop(path)] if path in self._errors else []
+        if errors:
+            raise errors[-1]
+
+    def close(self):
+        """予約済みの書き込みを全て終えてからスレッドを終了する。"""
+        try:
+            self.flush()
+        finally:
+            with self._condition:
+                self._closed = True
+                self._condition.notify_all()
+            self._thread.join()
+
+    def _run(self):
+        """書き込みスレッドの本体。"""
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._pending or self._closed)
+                if not self._pending:
+                    return
+                # 連続した保存をまとめるため少し待つ (flush された場合はすぐに書き込む)
+                deadline = time.monotonic() + self.delay
+                while not self._urgent and not self._closed:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._condition.wait(remaining)
+                self._urgent = False
+                jobs, self._pending = self._pending, {}
+                self._writing.update(jobs)
+            for path, (serialize, write) in jobs.items():
+                try:
+                    write(path, serialize())
+                except Exception as e:
+                    traceback.print_exc(file=sys.stderr)
+                    with self._condition:
+                        self._errors[path] = e
+                else:
+                    # 後の書き込みが成功していれば、以前のエラーは報告しない
+                    with self._condition:
+                        self._errors.pop(path, None)
+                finally:
+                    with self._condition:
+                        self._writing.discard(path)
+                        self._condition.notify_all()
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_writer():
+    """
+    アプリケーション全体で共有する WriteBehindWriter を取得する。
+
+    初めて呼び出したときに作成し、プロセス終了時に残りの書き込みを終えるよう登録します。
+
+    Returns:
+        WriteBehindWriter: 共有の WriteBehindWriter。
+    """
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = WriteBehindWriter()
+            atexit.register(_writer.close)
+        return _writer
+
+
+def flush_all():
+    """
+    共有の WriteBehindWriter に予約された書き込みを全て終える。
+
+    Raises:
+        Exception: バックグラウンドの書き込みでエラーが発生していた場合。
+    """
+    if _writer is not None:
+        _writer.flush()
@@ -0,0 +1,185 @@
+"""
+起動時間を計測するモジュール。
+
+main.py を --profile-startup 付きで起動したときに使用します。各処理 (フェーズ) の経過時間、
+起動からの経過時刻 (マーク)、モジュールごとのインポート時間を記録し、JSONのレポートに書き出します。
+計測していないときの phase() は何もしないコンテキストマネージャーを返すため、
+計測箇所を通常の起動経路に残しておいても負荷はほとんどありません。
+"""
+
+import sys
+import json
+import time
+import builtins
+import platform
+import threading
+from contextlib import contextmanager, nullcontext
+
+# 計測中の StartupProfiler (計測していないときは None)
+current = None
+
+
+class ImportTimer:
+    """
+    builtins.__import__ を置き換えて、新しく読み込まれたモジュールのインポート時間を記録するクラス。
+
+    python -X importtime と同じく、子モジュールを含む累計時間と、
+    子モジュールを除いた自身の時間を記録します。
+    """
+    def __init__(self):
+        """ImportTimerクラスのコンストラクタ。"""
+        self.records = {}  # モジュール名 → (累計秒, 自身の秒)
+        self._stack = []
+        self._original_import = None
+        self._thread = None
+
+    def start(self):
+        """記録を開始する。"""
+        self._original_import = builtins.__import__
+        self._thread = threading.get_ident()
+        builtins.__import__ = self._import
+
+    def stop(self):
+        """記録を終了する。"""
+        if self._original_import is not None:
+            builtins.__import__ = self._original_import
+            self._original_import = None
+
+    def _import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        """既に読み込み済みのモジュールとメインスレッド以外のインポートは計測せずに委譲する。"""
+        original = self._original_import
+        if level or threading.get_ident() != self._thread:
+            return original(name, globals, locals, fromlist, level)
+        if name in sys.modules:
+            # 「from tkinter import ttk」のようにサブモジュールを新しく読み込む場合だけ計測する
+            if not fromlist or all(f"{name}.{item}" in sys.modules or hasattr(sys.modules[name], item)
+                                   for item in fromlist):
+                return original(name, globals, locals, fromlist, level)
+            key = f"{name}.{','.join(fromlist)}"
+        else:
+            key = name
+        self._stack.append(0.0)
+        start = time.perf_counter()
+        try:
+            return original(name, globals, locals, fromlist, level)
+        finally:
+            elapsed = time.perf_counter() - start
+            children = self._stack.pop()
+            if self._stack:
+                self._stack[-1] += elapsed
+            self.records.setdefault(key, (elapsed, elapsed - children))
+
+
+class StartupProfiler:
+    """
+    起動処理のフェーズごとの経過時間を記録するクラス。
+
+    同じ名前のフェーズを複数回計測した場合は合計時間と回数を記録します。
+    """
+    def __init__(self):
+        """StartupProfilerクラスのコンストラクタ。作成した時刻を起動時刻とします。"""
+        self.started = time.perf_counter()
+        self.phases = {}  # フェーズ名 → [合計秒, 回数]
+        self.marks = {}   # マーク名 → 起動からの秒
+        self.info = {}    # レポートに含めるその他の情報
+        self.imports = ImportTimer()
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def phase(self, name):
+        """
+        with 文の中の処理時間をフェーズとして記録する。
+
+        Args:
+            name (str): フェーズ名。
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                record = self.phases.setdefault(name, [0.0, 0])
+                record[0] += elapsed
+                record[1] += 1
+
+    def mark(self, name):
+        """
+        起動からの経過時刻を記録する。同じ名前のマークは最初の1回だけ記録します。
+
+        Args:
+            name (str): マーク名。
+        """
+        self.marks.setdefault(name, time.perf_counter() - self.started)
+
+    def report(self):
+        """
+        計測結果をレポートの辞書にまとめる。
+
+        Returns:
+            dict: phases、marks、imports (累計時間の降順) などを含む辞書。時間はミリ秒。
+        """
+        imports = sorted(self.imports.records.items(), key=lambda item: item[1][0], reverse=True)
+        return {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'total_ms': (time.perf_counter() - self.started) * 1000,
+            'phases': {name: {'ms': seconds * 1000, 'count': count}
+                       for name, (seconds, count) in self.phases.items()},
+            'marks': {name: seconds * 1000 for name, seconds in self.marks.items()},
+            'imports': [{'module': name, 'cumulative_ms': cumulative * 1000, 'self_ms': own * 1000}
+                        for name, (cumulative, own) in imports],
+            **self.info,
+        }
+
+    def write_report(self, path):
+        """
+        レポートをJSONファイルに書き出す。
+
+        Args:
+            path (str): 書き出すファイルのパス。
+        """
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.report(), f, ensure_ascii=False, indent=2)
+
+
+def start():
+    """
+    計測を開始する。
+
+    Returns:
+        StartupProfiler: 計測に使用する StartupProfiler。
+    """
+    global current
+    current = StartupProfiler()
+    current.imports.start()
+    return current
+
+
+def stop():
+    """計測を終了する。インポート時間の記録も止めます。"""
+    global current
+    if current is not None:
+        current.imports.stop()
+    current = None
+
+
+def phase(name):
+    """
+    計測中であればフェーズを記録するコンテキストマネージャーを返す。
+
+    Args:
+        name (str): フェーズ名。
+
+    Returns:
+        contextmanager: 計測していない場合は何もしないコンテキストマネージャー。
+    """
+    if current is None:
+        return nullcontext()
+    return current.phase(name)
+
+
+def mark(name):
+    """計測中であれば起動からの経過時刻を記録する。"""
+    if current is not None:
+        current.mark(name)
@@ -0,0 +1,475 @@
+"""
+テンプレート検索用のインメモリ索引を定義するモジュール。
+
+テンプレート名は単語 (空白区切り) の部分一致とトライグラム索引で曖昧検索し、テンプレート本文は
+単語の前方一致索引で検索します。どちらにも一致しない語は、編集距離 1 の誤字 (1文字の脱字・余分な文字・
+置換・隣接する2文字の入れ替え) を訂正した語で検索し直します。索引は読み込み時に一度だけ作成し、
+保存・削除のたびに差分更新します。
+"""
+
+import re
+from collections import Counter
+from bisect import bisect_left, bisect_right, insort
+
+# 本文の単語分割: 英数字、ひらがな、カタカナ、漢字の連続をそれぞれ1語とする
+TOKEN_PATTERN = re.compile(r'[0-9a-z_]+|[ぁ-ゖ]+|[ァ-ヺー]+|[々一-鿿]+')
+
+# 曖昧一致とみなすトライグラムの一致率の下限
+FUZZY_THRESHOLD = 0.5
+
+# 誤字の訂正の対象にする語の最小の長さ (短い語は訂正の候補が多すぎるため)
+TYPO_MIN_LENGTH = 4
+# 誤字を訂正して名前に一致した場合のスコアに掛ける係数
+TYPO_SCORE_FACTOR = 0.5
+# 誤字の訂正の候補にする単語 (数字を含まない TYPO_MIN_LENGTH 文字以上の語)
+_TYPO_WORD = re.compile(r'\D{%d,}' % TYPO_MIN_LENGTH)
+
+# 削除済みのIDがこの数と生存しているIDの数の両方以上になったら、索引の作り直しを勧める (needs_compaction)
+COMPACT_MIN_DELETED = 1000
+
+
+def _trigrams(text):
+    """前後に空白を補った文字列のトライグラムの集合を返す。"""
+    padded = f" {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _deletes(word):
+    """語から1文字を削除した形の集合を返す。"""
+    return {word[:i] + word[i + 1:] for i in range(len(word))}
+
+
+def _within_one_edit(a, b):
+    """2つの語の編集距離 (隣接する2文字の入れ替えを1回と数える) が 1 以下かどうかを返す。"""
+    if a == b:
+        return True
+    if abs(len(a) - len(b)) > 1:
+        return False
+    start = 0
+    while start < min(len(a), len(b)) and a[start] == b[start]:
+        start += 1
+    if len(a) == len(b):
+        if a[start + 1:] == b[start + 1:]:
+            return True  # 1文字の置換
+        return (start + 1 < len(a) and a[start] == b[start + 1] and a[start + 1] == b[start]
+                and a[start + 2:] == b[start + 2:])  # 隣接する2文字の入れ替え
+    if len(a) < len(b):
+        a, b = b, a
+    return a[start + 1:] == b[start:]
+
+
+class SearchIndex:
+    """
+    テンプレート名と本文を対象とした検索索引。
+
+    各テンプレートには登録順の内部IDを割り当てます。名前は単語ごととトライグラムごとのID集合、
+    本文は単語ごとのビット集合 (IDをビット位置とする整数) で保持するため、
+    本文の和集合・積集合はビット演算だけで求まります。
+    削除されたIDは生存ビット集合から外し、検索時に除外します。削除済みのIDが増えると
+    needs_compaction が True になるため、呼び出し側で索引を作り直してIDを詰めます。
+    """
+    def __init__(self, prompts=()):
+        """
+        SearchIndexクラスのコンストラクタ。
+
+        Args:
+            prompts (iterable): 索引に登録するプロンプトの辞書の列。
+        """
+        self._names = []        # ID → 名前 (削除済みは None)
+        self._lower_names = []  # ID → 小文字化した名前
+        self._ids = {}          # 名前 → ID
+        self._name_words = {}   # 名前の単語 (小文字化して空白で区切った語) → ID の集合
+        self._word_grams = {}   # トライグラム → そのトライグラムを含む名前の単語の集合
+        self._first_words = {}  # 名前の先頭の単語 → ID の集合
+        self._body_tokens = {}  # 単語 → ID のビット集合
+        self._typo_keys = {}    # 単語、または単語から1文字を削除した形 → 単語の集合 (誤字の訂正用)
+        self._alive = 0         # 生存しているIDのビット集合
+        self._deleted = 0       # 削除済みのIDの数
+        self._word_text = None  # 部分一致検索用に名前の単語を連結した文字列 (単語の増減時に破棄)
+        self._word_list = []
+        self._word_starts = []
+
+        # 初期構築ではビット集合を単語ごとのIDリストからまとめて作る
+        postings = {}
+        for prompt in prompts:
+            doc_id = self._add_name(prompt['name'])
+            for token in self._tokenize(prompt['template']):
+                ids = postings.get(token)
+                if ids is None:
+                    postings[token] = [doc_id]
+                else:
+                    ids.append(doc_id)
+        size = (len(self._names) + 8) // 8
+        for token, ids in postings.items():
+            bits = bytearray(size)
+            for doc_id in ids:
+                bits[doc_id >> 3] |= 1 << (doc_id & 7)
+            self._body_tokens[token] = int.from_bytes(bits, 'little')
+            self._add_typo_word(token)
+        self._alive = (1 << len(self._names)) - 1
+        self._sorted_tokens = sorted(self._body_tokens)
+
+    def __len__(self):
+        return len(self._ids)
+
+    @property
+    def needs_compaction(self):
+        """削除済みのIDが多く、作り直してIDを詰めた方がよい場合はTrue。"""
+        return self._deleted >= max(COMPACT_MIN_DELETED, len(self._ids))
+
+    def add(self, name, template):
+        """
+        プロンプトを索引に追加する。既に同じ名前があれば置き換える。
+
+        Args:
+            name (str): プロンプト名。
+            template (str): テンプレート本文。
+        """
+        if name in self._ids:
+            self.remove(name)
+        doc_id = self._add_name(name)
+        bit = 1 << doc_id
+        for token in self._tokenize(template):
+            bits = self._body_tokens.get(token)
+            if bits is None:
+                insort(self._sorted_tokens, token)
+                self._add_typo_word(token)
+                bits = 0
+            self._body_tokens[token] = bits | bit
+        self._alive |= bit
+
+    def update(self, old_name, name, template):
+        """
+        プロンプトの名前と本文の変更を索引に反映する。
+
+        Args:
+            old_name (str): 変更前の名前。
+            name (str): 変更後の名前。
+            template (str): 変更後のテンプレート本文。
+        """
+        self.remove(old_name)
+        self.add(name, template)
+
+    def remove(self, name):
+        """
+        プロンプトを索引から削除する。
+
+        本文の単語索引からはビットを消さず、生存ビット集合から外すことで除外します。
+
+        Args:
+            name (str): 削除するプロンプト名。
+        """
+        doc_id = self._ids.pop(name, None)
+        if doc_id is None:
+            return
+        lower_name = self._lower_names[doc_id]
+        for word in set(lower_name.split()):
+            ids = self._name_words[word]
+            ids.discard(doc_id)
+            if not ids:
+                del self._name_words[word]
+                self._word_text = None
+                for gram in _trigrams(word):
+                    words = self._word_grams[gram]
+                    words.discard(word)
+                    if not words:
+                        del self._word_grams[gram]
+                if word not in self._body_tokens:
+                    self._remove_typo_word(word)
+        first = self._first_word(lower_name)
+        if first is not None:
+            ids = self._first_words[first]
+            ids.discard(doc_id)
+            if not ids:
+                del self._first_words[first]
+        self._names[doc_id] = None
+        self._lower_names[doc_id] = ''
+        self._alive &= ~(1 << doc_id)
+        self._deleted += 1
+
+    def search(self, query, limit=200):
+        """
+        クエリに一致するプロンプト名を関連度順に返す。
+
+        クエリを空白で区切った各語について、名前への部分一致・曖昧一致、
+        または本文の単語への前方一致のいずれかを満たすプロンプトを返します。
+        どれにも一致しない語は、編集距離 1 で訂正した語 (名前の単語または本文の単語) で検索します。
+        名前に一致したものがスコア順に先に並び、本文だけに一致したものが登録順で続きます。
+        名前の一致は語ごとに上位 limit 件程度を対象とするため、語の多いクエリでは
+        厳密な網羅よりも応答速度を優先します。
+
+        Args:
+            query (str): 検索クエリ。
+            limit (int): 返す件数の上限。
+
+        Returns:
+            list: プロンプト名のリスト。
+        """
+        terms = query.lower().split()
+        if not terms:
+            return []
+
+        # 各語について「名前か本文のどちらかに一致」したIDのビット集合の積を取る
+        matched = self._alive
+        term_levels = []
+        for term in terms:
+            scores = self._match_names(term, limit)
+            bits = self._match_body(term) | _to_bits(scores)
+            if not bits & self._alive and len(term) >= TYPO_MIN_LENGTH:
+                scores, bits = self._match_corrections(term, limit)
+            matched &= bits
+            term_levels.append(_score_levels(scores))
+
+        # 名前に一致したもの: 名前に一致した語はそのスコア、本文だけに一致した語は 1 点の合計で並べる。
+        # スコアは語ごとに数種類しかないため、語ごとの「スコア → ビット集合」の組み合わせで
+        # 合計点ごとのビット集合を求め、上位から limit 件に達するまでだけIDを取り出す
+        totals = {}
+        body_only = 0
+
+        def walk(index, bits, total, named):
+            nonlocal body_only
+            if not bits:
+                return
+            if index == len(term_levels):
+                if named:
+                    totals[total] = totals.get(total, 0) | bits
+                else:
+                    body_only = bits
+                return
+            levels, named_bits = term_levels[index]
+            for score, level_bits in levels:
+                walk(index + 1, bits & level_bits, total + score, True)
+            walk(index + 1, bits & ~named_bits, total + 1, named)
+
+        walk(0, matched, 0, False)
+        results = []
+        for total in sorted(totals, reverse=True):
+            for doc_id in _iter_bits(totals[total]):
+                results.append(self._names[doc_id])
+                if len(results) >= limit:
+                    return results
+
+        # 本文だけに一致したものは登録順で続ける
+        for doc_id in _iter_bits(body_only):
+            results.append(self._names[doc_id])
+            if len(results) >= limit:
+                break
+        return results
+
+    def _add_name(self, name):
+        """名前を登録してIDを返す。"""
+        doc_id = len(self._names)
+        lower_name = name.lower()
+        self._names.append(name)
+        self._lower_names.append(lower_name)
+        self._ids[name] = doc_id
+        for word in lower_name.split():
+            ids = self._name_words.get(word)
+            if ids is None:
+                ids = self._name_words[word] = set()
+                self._word_text = None
+                for gram in _trigrams(word):
+                    words = self._word_grams.get(gram)
+                    if words is None:
+                        words = self._word_grams[gram] = set()
+                    words.add(word)
+                self._add_typo_word(word)
+            ids.add(doc_id)
+        first = self._first_word(lower_name)
+        if first is not None:
+            ids = self._first_words.get(first)
+            if ids is None:
+                ids = self._first_words[first] = set()
+            ids.add(doc_id)
+        return doc_id
+
+    @staticmethod
+    def _first_word(lower_name):
+        """名前の先頭の単語を返す。名前が空白で始まる場合 (前方一致にならない) はNone。"""
+        if not lower_name or lower_name[0].isspace():
+            return None
+        return lower_name.split(None, 1)[0]
+
+    def _add_typo_word(self, word):
+        """誤字の訂正の候補に単語を追加する。"""
+        if _TYPO_WORD.fullmatch(word):
+            for key in _deletes(word) | {word}:
+                words = self._typo_keys.get(key)
+                if words is None:
+                    words = self._typo_keys[key] = set()
+                words.add(word)
+
+    def _remove_typo_word(self, word):
+        """誤字の訂正の候補から単語を除く。"""
+        if _TYPO_WORD.fullmatch(word):
+            for key in _deletes(word) | {word}:
+                words = self._typo_keys.get(key)
+                if words is not None:
+                    words.discard(word)
+                    if not words:
+                        del self._typo_keys[key]
+
+    def _corrections(self, term):
+        """
+        語と編集距離 1 の単語 (名前の単語と本文の単語) を返す。
+
+        語と単語のそれぞれから1文字を削除した形が一致するものを候補とし、編集距離を確かめます。
+
+        Returns:
+            list: 単語のリスト。
+        """
+        candidates = set()
+        for key in _deletes(term) | {term}:
+            candidates.update(self._typo_keys.get(key, ()))
+        return sorted(word for word in candidates if _within_one_edit(term, word))
+
+    def _match_corrections(self, term, limit):
+        """
+        誤字を訂正した語で名前と本文を検索する。
+
+        名前のスコアには TYPO_SCORE_FACTOR を掛け、本文は訂正した単語に完全一致するものだけを対象にします。
+
+        Returns:
+            tuple: (ID → スコアの辞書, 名前か本文に一致したIDのビット集合)。
+        """
+        scores = {}
+        bits = 0
+        for word in self._corrections(term):
+            for doc_id, score in self._match_names(word, limit).items():
+                score *= TYPO_SCORE_FACTOR
+                if score > scores.get(doc_id, 0):
+                    scores[doc_id] = score
+            bits |= self._body_tokens.get(word, 0)
+        return scores, bits | _to_bits(scores)
+
+    @staticmethod
+    def _tokenize(template):
+        """本文を重複のない単語の集合に分割する。"""
+        return set(TOKEN_PATTERN.findall(template.lower()))
+
+    def _match_names(self, term, limit):
+        """
+        名前に一致するIDとスコアを返す。
+
+        名前の前方一致は 6 点、部分一致は 5 点とします。部分一致が limit 件に満たない場合に限り、
+        名前の単語のうちトライグラムの一致率が FUZZY_THRESHOLD 以上のものを曖昧一致とし、
+        その単語を含む名前に一致率の 2 倍 (最大 2 点) を加えます。トライグラムは単語の種類ごとに
+        1回だけ数えるため、同じ単語を含む名前が多くても候補の数は増えません。
+        曖昧一致は部分一致より常に下位になるため、部分一致が十分にあれば省略できます。
+
+        Returns:
+            dict: ID → スコア。
+        """
+        scores = self._match_name_words(term)
+        if len(scores) >= limit or len(term) < 3:
+            return scores
+
+        grams = _trigrams(term)
+        postings = sorted((self._word_grams.get(gram, ()) for gram in grams), key=len)
+        required = max(1, int(len(grams) * FUZZY_THRESHOLD + 0.999))
+        # required 個のトライグラムを含む単語は、少ない方から (k - required + 1) 個の集合のいずれかに含まれる
+        candidates = set().union(*postings[:len(grams) - required + 1])
+        counts = Counter()
+        for words in postings:
+            counts.update(candidates.intersection(words))
+        fuzzy = {}
+        for word, hits in counts.items():
+            if hits >= required:
+                score = 2 * hits / len(grams)
+                for doc_id in self._name_words[word]:
+                    if score > fuzzy.get(doc_id, 0):
+                        fuzzy[doc_id] = score
+        for doc_id, score in fuzzy.items():
+            scores.setdefault(doc_id, score)
+        return scores
+
+    def _match_name_words(self, term):
+        """
+        名前に部分一致するIDとスコアを返す。
+
+        語は空白を含まないため、名前に部分一致することは名前のいずれかの単語に部分一致することと同じです。
+        重複を除いた単語を改行で連結した文字列を str.find で走査し、一致した単語のID集合をまとめて加えるため、
+        走査の回数は一致した名前の数ではなく単語の種類の数で決まります。
+
+        Returns:
+            dict: ID → スコア。
+        """
+        if self._word_text is None:
+            self._word_list = list(self._name_words)
+            self._word_text = '\n'.join(self._word_list) + '\n'
+            self._word_starts = [0]
+            for word in self._word_list:
+                self._word_starts.append(self._word_starts[-1] + len(word) + 1)
+        text = self._word_text
+        starts = self._word_starts
+        words = self._word_list
+        scores = {}
+        prefixed = []
+        position = text.find(term)
+        while position != -1:
+            index = bisect_right(starts, position) - 1
+            word = words[index]
+            scores.update(dict.fromkeys(self._name_words[word], 5))
+            if position == starts[index] and word in self._first_words:
+                prefixed.append(self._first_words[word])
+            # 同じ単語の中の2つ目以降の一致は読み飛ばす
+            position = text.find(term, starts[index + 1])
+        for ids in prefixed:
+            scores.update(dict.fromkeys(ids, 6))
+        return scores
+
+    def _match_body(self, term):
+        """
+        本文の単語に前方一致するIDのビット集合を返す。
+
+        1文字の語は一致する単語が多すぎるため本文は検索しません。
+
+        Returns:
+            int: ID のビット集合。
+        """
+        bits = 0
+        if len(term) < 2:
+            return bits
+        tokens = self._sorted_tokens
+        for i in range(bisect_left(tokens, term), len(tokens)):
+            if not tokens[i].startswith(term):
+                break
+            bits |= self._body_tokens[tokens[i]]
+        return bits
+
+
+def _score_levels(scores):
+    """
+    ID → スコアの辞書を、スコアごとのビット集合に分ける。
+
+    Returns:
+        tuple: ((スコア, ビット集合) のリスト, スコアのある全てのIDのビット集合)。
+    """
+    by_score = {}
+    for doc_id, score in scores.items():
+        ids = by_score.get(score)
+        if ids is None:
+            by_score[score] = [doc_id]
+        else:
+            ids.append(doc_id)
+    return [(score, _to_bits(ids)) for score, ids in by_score.items()], _to_bits(scores)
+
+
+def _to_bits(ids):
+    """IDの集まりをビット集合に変換する。"""
+    if not ids:
+        return 0
+    bits = bytearray(max(ids) // 8 + 1)
+    for doc_id in ids:
+        bits[doc_id >> 3] |= 1 << (doc_id & 7)
+    return int.from_bytes(bits, 'little')
+
+
+def _iter_bits(bits):
+    """ビット集合に含まれるIDを小さい順に返す。"""
+    data = bits.to_bytes((bits.bit_length() + 7) // 8, 'little')
+    for index, byte in enumerate(data):
+        while byte:
+            low = byte & -byte
+            yield (index << 3) + low.bit_length() - 1
+            byte ^= low
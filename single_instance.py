@@ -0,0 +1,157 @@
+"""
+アプリケーションを1つのプロセスだけで動かすための通信を定義するモジュール。
+
+最初に起動したプロセスはローカルの名前付きパイプ (Windows) または
+Unixドメインソケット (その他のOS) で待ち受けます。2回目以降の起動では
+tkinter を読み込む前に起動中のプロセスへメッセージを送り、すぐに終了します。
+メッセージはJSONで、次のいずれかです。
+
+- {'command': 'show'}: ウィンドウを前面に表示する
+- {'command': 'open', 'name': テンプレート名}: 指定したテンプレートでプロンプト作成ウィンドウを開く
+"""
+
+import os
+import sys
+import errno
+import json
+import queue
+import threading
+from multiprocessing.connection import Listener, Client
+from models import get_appdata_path
+
+# 起動中のプロセスからの応答を待つ時間 (秒)
+REPLY_TIMEOUT = 2.0
+
+# 受信を確認したことを送信元に伝える応答
+_ACK = b'ok'
+
+
+def get_instance_address(appdata_path=None):
+    """
+    待ち受けに使うアドレスを取得する。
+
+    Windowsではユーザーごとの名前付きパイプ、その他のOSではデータディレクトリ内の
+    Unixドメインソケットのパスを返します。
+
+    Args:
+        appdata_path (str, optional): データディレクトリのパス。省略した場合は get_appdata_path() を使用します。
+
+    Returns:
+        str: multiprocessing.connection で使用するアドレス。
+    """
+    if sys.platform == 'win32':
+        return rf"\\.\pipe\flashprompt-{os.getenv('USERNAME', 'user')}"
+    return os.path.join(appdata_path or get_appdata_path(), 'instance.sock')
+
+
+def notify_running_instance(message, address=None):
+    """
+    起動中のプロセスにメッセージを送る。
+
+    Args:
+        message (dict): 送信するメッセージ。
+        address (str, optional): 送信先のアドレス。省略した場合は get_instance_address() を使用します。
+
+    Returns:
+        bool: 起動中のプロセスが受信した場合はTrue。起動中のプロセスがない場合はFalse。
+    """
+    try:
+        connection = Client(address or get_instance_address())
+    except OSError:
+        return False
+    with connection:
+        try:
+            connection.send_bytes(json.dumps(message, ensure_ascii=False).encode('utf-8'))
+            return connection.poll(REPLY_TIMEOUT) and connection.recv_bytes() == _ACK
+        except (OSError, EOFError):
+            return False
+
+
+class InstanceServer:
+    """
+    2回目以降の起動から送られるメッセージを受け付けるサーバー。
+
+    接続の受け付けはバックグラウンドスレッドで行い、受信したメッセージは
+    messages キューに入れます。Tkのメインスレッドから after でキューを確認してください。
+    """
+    def __init__(self, address=None):
+        """
+        InstanceServerクラスのコンストラクタ。
+
+        Unixドメインソケットのファイルが残っている場合は、接続を試して拒否された場合
+        (前回のプロセスが異常終了した場合) だけ削除してから待ち受けます。
+
+        Args:
+            address (str, optional): 待ち受けるアドレス。省略した場合は get_instance_address() を使用します。
+
+        Raises:
+            OSError: 待ち受けを開始できなかった場合や、他のプロセスが既に待ち受けている場合。
+        """
+        self.address = address or get_instance_address()
+        self.messages = queue.Queue()
+        self._is_socket_file = not self.address.startswith('\\\\')
+        if self._is_socket_file and os.path.exists(self.address):
+            self._remove_stale_socket()
+        self.listener = Listener(self.address)
+        self._closed = False
+        threading.Thread(target=self._serve, daemon=True).start()
+
+    def _remove_stale_socket(self):
+        """
+        待ち受けているプロセスのいないソケットファイルを削除する。
+
+        Raises:
+            OSError: 他のプロセスがそのソケットで待ち受けている場合。
+        """
+        try:
+            Client(self.address).close()
+        except ConnectionRefusedError:
+            os.remove(self.address)
+        except FileNotFoundError:
+            pass  # 確認している間に他のプロセスが削除した
+        else:
+            raise OSError(errno.EADDRINUSE, "他のプロセスが既に待ち受けています", self.address)
+
+    def _serve(self):
+        """接続を受け付け、受信したメッセージをキューに入れる。"""
+        while not self._closed:
+            try:
+                connection = self.listener.accept()
+            except OSError:
+                return  # close() で待ち受けを終了した
+            with connection:
+                try:
+                    if not connection.poll(REPLY_TIMEOUT):
+                        continue
+                    message = json.loads(connection.recv_bytes().decode('utf-8'))
+                except (OSError, EOFError, ValueError):
+                    continue
+                if isinstance(message, dict):
+                    self.messages.put(message)
+                    try:
+                        connection.send_bytes(_ACK)
+                    except OSError:
+                        pass
+
+    def get_messages(self):
+        """
+        受信済みのメッセージを全て取り出す。
+
+        Returns:
+            list: メッセージの辞書のリスト。
+        """
+        messages = []
+        while True:
+            try:
+                messages.append(self.messages.get_nowait())
+            except queue.Empty:
+                return messages
+
+    def close(self):
+        """待ち受けを終了し、Unixドメインソケットのファイルを削除する。"""
+        if self._closed:
+            return
+        self._closed = True
+        self.listener.close()
+        if self._is_socket_file and os.path.exists(self.address):
+            os.remove(self.address)
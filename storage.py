@@ -0,0 +1,1098 @@
+"""
+プロンプトの永続化を担うストレージバックエンドを定義するモジュール。
+
+PromptManagerはここで定義されたバックエンドを通してプロンプトを読み書きします。
+各バックエンドは同じメソッド (load, insert, update, delete, rewrite) を持ち、
+変更内容と変更後のプロンプト一覧の両方を受け取ります。
+各バックエンドは通常は変更内容だけを書き込み、ファイル全体を書き直すとき
+(JsonStorage のジャーナルの畳み込みなど) にプロンプト一覧を使用します。
+"""
+
+import os
+import re
+import json
+import mmap
+import hashlib
+import sqlite3
+import struct
+import threading
+from urllib.parse import unquote
+from urllib.request import pathname2url
+from persistence import atomic_write, get_writer
+
+# JsonStorage のジャーナルがこのサイズを超えたらスナップショットに畳み込む (バイト)
+JOURNAL_COMPACT_BYTES = 1024 * 1024
+# 保存ディレクトリ ('save_directory') の中で、テンプレートを1件1ファイルで保存するサブディレクトリ
+TEMPLATE_SUBDIRECTORY = 'flashprompt-templates'
+# ローカルのライブラリを取り込み済みの保存ディレクトリを記録するファイル (appdata 内)
+DIRECTORY_IMPORTS_FILE = 'directory_imports.json'
+
+
+def unique_name(name, existing):
+    """
+    existing に含まれない「名前 (n)」形式の名前を返す。
+
+    Args:
+        name (str): 元の名前。
+        existing (container): 既に使われている名前。
+
+    Returns:
+        str: 重複しない名前。
+    """
+    number = 2
+    while f"{name} ({number})" in existing:
+        number += 1
+    return f"{name} ({number})"
+
+
+class JsonStorage:
+    """
+    プロンプト全体を1つのJSONファイル (スナップショット) に保存するバックエンド。
+
+    追加・更新・改名・削除は、スナップショットの隣のジャーナル (prompts.json.journal) に
+    1行1操作のJSONとして追記するため、保存にかかる時間は変更の大きさだけで決まります。
+    ジャーナルが JOURNAL_COMPACT_BYTES を超えると、ジャーナルを凍結 (.old に改名) してから
+    共有の WriteBehindWriter で新しいスナップショットを書き込み、凍結したジャーナルを削除します。
+    読み込み時はスナップショットに凍結したジャーナルと現在のジャーナルを順に適用します。
+
+    スナップショットを置き換える直前に、凍結したジャーナルの末尾に新しいスナップショットの
+    SHA-1 を書いたチェックポイント行を追記します。置き換えの直後に異常終了した場合でも、
+    読み込み時にチェックポイントとスナップショットを照合して二重に適用することはありません。
+    """
+    def __init__(self, path, compact_bytes=None, read_only=False):
+        """
+        JsonStorageクラスのコンストラクタ。
+
+        Args:
+            path (str): prompts.json のパス。
+            compact_bytes (int, optional): スナップショットに畳み込むジャーナルのサイズ (バイト)。
+                省略した場合は JOURNAL_COMPACT_BYTES を使用します。
+            read_only (bool): True の場合はファイルを作成・削除せずに読み込みだけを行います。
+        """
+        self.path = path
+        self.read_only = read_only
+        self.journal_path = f"{path}.journal"
+        self.frozen_journal_path = f"{self.journal_path}.old"
+        self.compact_bytes = JOURNAL_COMPACT_BYTES if compact_bytes is None else compact_bytes
+        self._lock = threading.Lock()
+        self._journal_size = os.path.getsize(self.journal_path) if os.path.exists(self.journal_path) else 0
+        self._compacting = False  # スナップショットの書き込みを予約済み
+        if not read_only and not os.path.exists(self.path):
+            atomic_write(self.path, b'[]')
+
+    def load(self, strict=False):
+        """
+        スナップショットを読み込み、ジャーナルの操作を適用する。
+
+        このファイルへの書き込みが予約されている場合は、書き込みが終わってから読み込みます。
+
+        Args:
+            strict (bool): True の場合、スナップショットが壊れていれば ValueError を送出します
+                (他のストレージへの取り込みで、壊れたファイルを空として扱わないようにするため)。
+
+        Returns:
+            list: プロンプトの辞書のリスト。スナップショットの読み込みに失敗した場合は
+                空のリストにジャーナルを適用した結果。
+        """
+        get_writer().flush(self.path)
+        try:
+            with open(self.path, 'rb') as f:
+                data = f.read()
+            rows = json.loads(data)
+            if not isinstance(rows, list):
+                raise ValueError("prompts.json の内容がリストではありません。")
+        except FileNotFoundError:
+            data, rows = b'', []
+        except ValueError:
+            if strict:
+                raise
+            data, rows = b'', []
+        with self._lock:
+            operations = self._read_frozen_journal(data) + self._read_journal(self.journal_path)
+        if not operations:
+            return rows
+        return self._replay(rows, operations)
+
+    def insert(self, prompt, prompts):
+        """プロンプトの追加をジャーナルに追記する。"""
+        self._append({'op': 'add', 'name': prompt['name'], 'template': prompt['template']}, prompts)
+
+    def update(self, name, prompt, prompts):
+        """プロンプトの更新 (と改名) をジャーナルに追記する。"""
+        if prompt['name'] != name:
+            operation = {'op': 'rename', 'name': name, 'new_name': prompt['name'], 'template': prompt['template']}
+        else:
+            operation = {'op': 'update', 'name': name, 'template': prompt['template']}
+        self._append(operation, prompts)
+
+    def delete(self, name, prompts):
+        """プロンプトの削除をジャーナルに追記する。"""
+        self._append({'op': 'delete', 'name': name}, prompts)
+
+    def rewrite(self, prompts):
+        """プロンプト一覧全体をスナップショットとして書き直し、ジャーナルを空にする。"""
+        if self._compacting:
+            get_writer().flush(self.path)
+        self._compact(prompts)
+
+    # ジャーナル
+
+    def _append(self, operation, prompts):
+        """
+        操作をジャーナルに1行追記し、必要であればスナップショットへの畳み込みを予約する。
+
+        Args:
+            operation (dict): 追記する操作。
+            prompts (iterable): 変更後のプロンプト一覧。畳み込む場合だけ使用します。
+        """
+        line = (json.dumps(operation, ensure_ascii=False) + '\n').encode('utf-8')
+        with self._lock:
+            # Windowsでも凍結 (改名) できるよう、ジャーナルは追記のたびに開き直す
+            with open(self.journal_path, 'ab') as f:
+                if f.tell() and not self._ends_with_newline(self.journal_path):
+                    # 前回の追記が途中で終わっていた場合は、その行と混ざらないよう改行する
+                    f.write(b'\n')
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+            self._journal_size += len(line)
+            compact = self._journal_size >= self.compact_bytes and not self._compacting
+        if compact:
+            self._compact(prompts)
+
+    def _compact(self, prompts):
+        """
+        ジャーナルを凍結し、新しいスナップショットの書き込みを予約する。
+
+        Args:
+            prompts (iterable): 現在のプロンプト一覧。
+        """
+        rows = [(p['name'], p['template']) for p in prompts]
+        with self._lock:
+            if os.path.exists(self.journal_path):
+                if os.path.exists(self.frozen_journal_path):
+                    # 前回の畳み込みが失敗していた場合は、凍結済みのジャーナルの後ろにつなげる
+                    with open(self.journal_path, 'rb') as src, open(self.frozen_journal_path, 'ab') as dst:
+                        dst.write(src.read())
+                        dst.flush()
+                        os.fsync(dst.fileno())
+                    os.remove(self.journal_path)
+                else:
+                    os.replace(self.journal_path, self.frozen_journal_path)
+            self._journal_size = 0
+            self._compacting = True
+
+        def serialize():
+            data = [{'name': name, 'template': template} for name, template in rows]
+            return json.dumps(data, ensure_ascii=False, indent=2).encode('utf-8')
+
+        get_writer().submit(self.path, serialize, write=self._write_snapshot)
+
+    def _write_snapshot(self, path, data):
+        """
+        チェックポイントを凍結したジャーナルに追記してからスナップショットを置き換え、
+        凍結したジャーナルを削除する。WriteBehindWriter のスレッドで呼び出されます。
+        """
+        try:
+            if os.path.exists(self.frozen_journal_path):
+                checkpoint = {'op': 'checkpoint', 'sha1': hashlib.sha1(data).hexdigest()}
+                with open(self.frozen_journal_path, 'ab') as f:
+                    f.write(b'\n' + json.dumps(checkpoint).encode('utf-8') + b'\n')
+                    f.flush()
+                    os.fsync(f.fileno())
+            atomic_write(path, data)
+            if os.path.exists(self.frozen_journal_path):
+                os.remove(self.frozen_journal_path)
+        finally:
+            with self._lock:
+                self._compacting = False
+
+    def _read_frozen_journal(self, snapshot):
+        """
+        凍結したジャーナルのうち、スナップショットにまだ含まれていない操作を読み込む。
+
+        スナップショットと一致するチェックポイントがあれば、それより前の操作は適用済みとして読み飛ばします。
+        全て適用済みの場合は凍結したジャーナルを削除します。
+
+        Args:
+            snapshot (bytes): 読み込んだスナップショットの内容。
+
+        Returns:
+            list: 適用する操作のリスト。
+        """
+        operations = self._read_journal(self.frozen_journal_path)
+        if not operations or self._compacting:
+            return [op for op in operations if op.get('op') != 'checkpoint']
+        digest = hashlib.sha1(snapshot).hexdigest()
+        for i in range(len(operations) - 1, -1, -1):
+            if operations[i].get('op') == 'checkpoint' and operations[i].get('sha1') == digest:
+                operations = operations[i + 1:]
+                if not operations and not self.read_only:
+                    os.remove(self.frozen_journal_path)
+                break
+        return [op for op in operations if op.get('op') != 'checkpoint']
+
+    @staticmethod
+    def _read_journal(path):
+        """
+        ジャーナルの操作を全て読み込む。途中で途切れた行などの読めない行は無視します。
+
+        Returns:
+            list: 操作の辞書のリスト。ファイルがない場合は空のリスト。
+        """
+        try:
+            with open(path, 'rb') as f:
+                lines = f.read().splitlines()
+        except FileNotFoundError:
+            return []
+        operations = []
+        for line in lines:
+            try:
+                operation = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(operation, dict):
+                operations.append(operation)
+        return operations
+
+    @staticmethod
+    def _ends_with_newline(path):
+        """ファイルの最後の1バイトが改行かどうかを返す。"""
+        with open(path, 'rb') as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) == b'\n'
+
+    @staticmethod
+    def _replay(rows, operations):
+        """
+        スナップショットの内容にジャーナルの操作を順に適用する。
+
+        同じ名前が複数ある場合は PromptManager と同じく最初の1件を操作の対象にします。
+
+        Args:
+            rows (list): スナップショットのプロンプトの辞書のリスト。
+            operations (list): 適用する操作のリスト。
+
+        Returns:
+            list: 操作を適用した後のプロンプトの辞書のリスト。
+        """
+        items = [[p['name'], p['template']] for p in rows]
+        positions = {}
+        for i, (name, _) in enumerate(items):
+            positions.setdefault(name, i)
+        for operation in operations:
+            kind = operation.get('op')
+            name = operation.get('name')
+            index = positions.get(name)
+            if kind == 'delete':
+                if index is not None:
+                    items[index] = None
+                    del positions[name]
+            elif kind in ('add', 'update', 'rename'):
+                new_name = operation.get('new_name', name)
+                template = operation.get('template', '')
+                if index is None:
+                    items.append([new_name, template])
+                    positions[new_name] = len(items) - 1
+                else:
+                    if new_name != name:
+                        del positions[name]
+                        positions[new_name] = index
+                    items[index] = [new_name, template]
+        return [{'name': name, 'template': template} for name, template in filter(None, items)]
+
+
+class SQLiteStorage:
+    """
+    プロンプトをSQLiteデータベースに保存するバックエンド。
+
+    WALモードで動作し、追加・更新・削除は対象の行だけを1トランザクションで書き込みます。
+    既存の prompts.json は最初に開いたときに取り込み、取り込みが完了したことを meta テーブルに
+    同じトランザクションで記録します。prompts.json が壊れていた場合は取り込まずに import_error に記録し、
+    次に開いたときに取り込み直します。
+    起動時の読み込みや本文の遅延読み込みは別スレッドからも行われるため、接続の利用はロックで直列化します。
+    """
+    def __init__(self, path, import_path=None, read_only=False):
+        """
+        SQLiteStorageクラスのコンストラクタ。
+
+        Args:
+            path (str): データベースファイルのパス。
+            import_path (str, optional): 初回起動時に取り込む prompts.json のパス。
+            read_only (bool): True の場合は既存のデータベースを読み取り専用で開きます
+                (テーブルの作成や prompts.json の取り込みは行いません)。
+        """
+        self.path = path
+        self.import_error = None  # prompts.json の取り込みに失敗した場合の例外
+        if read_only:
+            self.connection = sqlite3.connect(f"file:{pathname2url(os.path.abspath(path))}?mode=ro",
+                                              uri=True, check_same_thread=False)
+            self._lock = threading.Lock()
+            return
+        # 起動時の読み込みはバックグラウンドスレッドで行うため、作成したスレッド以外からの利用を許可する
+        # (同時に利用しないよう self._lock で直列化する)
+        self.connection = sqlite3.connect(self.path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        with self.connection:
+            # 同時に起動した他のプロセスと取り込みが重ならないよう、書き込みロックを取ってから確認する
+            self.connection.execute('BEGIN IMMEDIATE')
+            has_meta = self.connection.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'meta'").fetchone() is not None
+            self.connection.execute(
+                'CREATE TABLE IF NOT EXISTS prompts ('
+                'id INTEGER PRIMARY KEY AUTOINCREMENT, '
+                'name TEXT NOT NULL, '
+                'template TEXT NOT NULL)'
+            )
+            self.connection.execute('CREATE INDEX IF NOT EXISTS prompts_name ON prompts (name)')
+            self.connection.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)')
+            if not has_meta and self.connection.execute('SELECT 1 FROM prompts LIMIT 1').fetchone():
+                # meta テーブルより前のデータベース。作成したときに取り込み済み
+                self._set_meta('json_imported', '1')
+            if self._get_meta('json_imported') is None:
+                try:
+                    self._import_json(import_path)
+                except ValueError as e:
+                    self.import_error = e  # 取り込みの完了を記録せず、次に開いたときに取り込み直す
+                else:
+                    self._set_meta('json_imported', '1')
+
+    def _get_meta(self, key):
+        row = self.connection.execute('SELECT value FROM meta WHERE key = ?', (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, key, value):
+        self.connection.execute('INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)', (key, value))
+
+    def _import_json(self, import_path):
+        """
+        既存の prompts.json の内容をデータベースに取り込む (コンストラクタのトランザクションの中で呼び出す)。
+
+        Args:
+            import_path (str or None): 取り込む prompts.json のパス。
+
+        Raises:
+            ValueError: prompts.json が壊れている場合。
+        """
+        if not import_path or not os.path.exists(import_path):
+            return
+        prompts = JsonStorage(import_path, read_only=True).load(strict=True)
+        try:
+            rows = [(str(p['name']), str(p['template'])) for p in prompts]
+        except (KeyError, TypeError) as e:
+            raise ValueError(f"prompts.json の形式が正しくありません: {e!r}") from e
+        self.connection.executemany('INSERT INTO prompts (name, template) VALUES (?, ?)', rows)
+
+    def load(self):
+        """
+        データベースからプロンプトを登録順に読み込む。
+
+        Returns:
+            list: プロンプトの辞書のリスト。
+        """
+        with self._lock:
+            rows = self.connection.execute('SELECT name, template FROM prompts ORDER BY id').fetchall()
+        return [{'name': name, 'template': template} for name, template in rows]
+
+    def load_names(self):
+        """
+        プロンプト名だけを登録順に読み込む。
+
+        Returns:
+            list: プロンプト名のリスト。
+        """
+        with self._lock:
+            return [name for name, in self.connection.execute('SELECT name FROM prompts ORDER BY id')]
+
+    def load_template(self, name):
+        """
+        指定された名前のテンプレート本文を読み込む。
+
+        Args:
+            name (str): プロンプト名。
+
+        Returns:
+            str: テンプレート本文。見つからない場合は空文字列。
+        """
+        with self._lock:
+            row = self.connection.execute('SELECT template FROM prompts WHERE name = ? LIMIT 1', (name,)).fetchone()
+        return row[0] if row else ''
+
+    def insert(self, prompt, prompts):
+        """プロンプトを1行追加する。"""
+        row = (prompt['name'], prompt['template'])  # 本文の遅延読み込みはロックの外で行う
+        with self._lock, self.connection:
+            self.connection.execute('INSERT INTO prompts (name, template) VALUES (?, ?)', row)
+
+    def update(self, name, prompt, prompts):
+        """指定された名前の行を更新する。"""
+        row = (prompt['name'], prompt['template'], name)  # 本文の遅延読み込みはロックの外で行う
+        with self._lock, self.connection:
+            self.connection.execute('UPDATE prompts SET name = ?, template = ? WHERE name = ?', row)
+
+    def delete(self, name, prompts):
+        """指定された名前の行を削除する。"""
+        with self._lock, self.connection:
+            self.connection.execute('DELETE FROM prompts WHERE name = ?', (name,))
+
+    def rewrite(self, prompts):
+        """全ての行を1トランザクションで書き直す。"""
+        # 遅延読み込みの本文は行を削除する前に読み込んでおく
+        rows = [(p['name'], p['template']) for p in prompts]
+        with self._lock, self.connection:
+            self.connection.execute('DELETE FROM prompts')
+            self.connection.executemany('INSERT INTO prompts (name, template) VALUES (?, ?)', rows)
+
+
+class PackedStorage:
+    """
+    テンプレート本文を1つのデータファイルに連結して保存し、名前と位置を小さな索引ファイルに保存するバックエンド。
+
+    起動時は索引ファイル (名前・本文の位置と長さ) だけを読み込み、本文は参照されたときに
+    データファイルを mmap した領域から読み出します。そのため起動時間とメモリ使用量は
+    登録数ではなく実際に開いたテンプレートの数に比例します。
+
+    本文の追加と更新はデータファイルの末尾に追記し、索引ファイルにも変更の記録を1件追記するため、
+    保存にかかる時間は登録数によりません。追記した本文は fsync してから索引に記録するため、
+    異常終了しても索引が書き込まれていない本文を指すことはありません。
+    不要になった本文の領域が有効な本文より大きくなったらデータファイルを、不要な記録が有効な記録より
+    多くなったら索引ファイルを詰めて書き直します。
+    既存の prompts.json は最初に開いたときに取り込みます。prompts.json が壊れていた場合は空の索引に
+    取り込み待ちの記録を残して import_error に記録し、次に開いたときに取り込み直します。
+
+    索引ファイルの形式 (リトルエンディアン):
+        ヘッダー: マジック b'FPKI'、バージョン (u16)
+        記録: 種類 (u8)、本文の位置 (u64)、本文のバイト数 (u32)、名前のバイト数 (u32)、
+              新しい名前のバイト数 (u32) に続けて UTF-8 の名前と新しい名前を、変更した順に並べたもの。
+              種類は RECORD_SET (追加・本文の更新)、RECORD_RENAME (名前と本文の更新)、RECORD_DELETE (削除)、
+              RECORD_IMPORT_PENDING (prompts.json の取り込みが終わっていない)
+        末尾の書きかけの記録は無視します。
+    """
+    lazy_templates = True  # 本文は常に参照されたときに読み込む
+
+    MAGIC = b'FPKI'
+    VERSION = 2
+    HEADER = struct.Struct('<4sH')
+    RECORD = struct.Struct('<BQIII')
+    RECORD_SET = 0
+    RECORD_RENAME = 1
+    RECORD_DELETE = 2
+    RECORD_IMPORT_PENDING = 3
+
+    def __init__(self, path, import_path=None, read_only=False):
+        """
+        PackedStorageクラスのコンストラクタ。
+
+        Args:
+            path (str): データファイルのパス。索引ファイルは末尾に .idx を付けたパスに作成します。
+            import_path (str, optional): 初回起動時に取り込む prompts.json のパス。
+            read_only (bool): True の場合は既存の索引を読み込むだけで、ファイルの作成や取り込みは行いません。
+        """
+        self.path = path
+        self.index_path = path + '.idx'
+        self._lock = threading.Lock()
+        self._map = None
+        self._entries = {}  # 名前 → (本文の位置, 本文のバイト数)
+        self._records = 0  # 索引ファイルの記録の数
+        self._import_pending = False  # prompts.json の取り込みが終わっていない
+        self.import_error = None  # prompts.json の取り込みに失敗した場合の例外
+        if read_only or (os.path.exists(self.index_path) and os.path.exists(self.path)):
+            self._read_index(read_only)
+        else:
+            self._import_pending = True
+        if self._import_pending and not read_only:
+            self._import_json(import_path)
+
+    def _import_json(self, import_path):
+        """
+        既存の prompts.json の内容を現在のテンプレートの後ろに取り込み、データファイルと索引ファイルを作り直す。
+
+        prompts.json が壊れている場合は import_error に記録し、取り込み待ちのまま
+        (ファイルがなければ空の索引を作成して) 次に開いたときに取り込み直します。
+
+        Args:
+            import_path (str or None): 取り込む prompts.json のパス。
+        """
+        try:
+            prompts = (JsonStorage(import_path, read_only=True).load(strict=True)
+                       if import_path and os.path.exists(import_path) else [])
+            try:
+                imported = [(str(p['name']), str(p['template'])) for p in prompts]
+            except (KeyError, TypeError) as e:
+                raise ValueError(f"prompts.json の形式が正しくありません: {e!r}") from e
+        except ValueError as e:
+            self.import_error = e
+            if not os.path.exists(self.index_path):
+                with self._lock:
+                    self._rewrite([])
+            return
+        with self._lock:
+            rows = {name: self._read_body(offset, length) for name, (offset, length) in self._entries.items()}
+            # 索引は名前で引くため、取り込むときに重複した名前を「名前 (n)」に改名する
+            for name, template in imported:
+                rows[unique_name(name, rows) if name in rows else name] = template
+            self._import_pending = False
+            self._rewrite(list(rows.items()))
+
+    def _read_index(self, read_only=False):
+        """
+        索引ファイルの記録を順に適用して索引を作る。
+
+        Args:
+            read_only (bool): False の場合、末尾の書きかけの記録を切り詰めて次の追記に備える。
+        """
+        with open(self.index_path, 'rb') as f:
+            data = f.read()
+        magic, version = self.HEADER.unpack_from(data)
+        if magic != self.MAGIC or version != self.VERSION:
+            raise ValueError(f"索引ファイルの形式が正しくありません: {self.index_path}")
+        entries = {}
+        records = 0
+        position = self.HEADER.size
+        while position + self.RECORD.size <= len(data):
+            kind, offset, length, name_length, new_name_length = self.RECORD.unpack_from(data, position)
+            end = position + self.RECORD.size + name_length + new_name_length
+            if end > len(data):
+                break
+            name_end = position + self.RECORD.size + name_length
+            name = data[position + self.RECORD.size:name_end].decode('utf-8')
+            if kind == self.RECORD_SET:
+                entries[name] = (offset, length)
+            elif kind == self.RECORD_RENAME:
+                new_name = data[name_end:end].decode('utf-8')
+                entries = {(new_name if key == name else key): ((offset, length) if key == name else value)
+                           for key, value in entries.items()}
+            elif kind == self.RECORD_DELETE:
+                entries.pop(name, None)
+            elif kind == self.RECORD_IMPORT_PENDING:
+                self._import_pending = True
+            else:
+                raise ValueError(f"索引ファイルの形式が正しくありません: {self.index_path}")
+            records += 1
+            position = end
+        if position < len(data) and not read_only:
+            # 書き込み中に異常終了した記録を取り除く
+            with open(self.index_path, 'r+b') as f:
+                f.truncate(position)
+        self._entries = entries
+        self._records = records
+
+    def _pack_record(self, kind, name, offset=0, length=0, new_name=''):
+        """索引ファイルの記録を1件作成する。"""
+        name = name.encode('utf-8')
+        new_name = new_name.encode('utf-8')
+        return self.RECORD.pack(kind, offset, length, len(name), len(new_name)) + name + new_name
+
+    def _write_index(self):
+        """現在の索引だけを記録した索引ファイルを原子的に書き直す。"""
+        parts = [self.HEADER.pack(self.MAGIC, self.VERSION)]
+        if self._import_pending:
+            parts.append(self._pack_record(self.RECORD_IMPORT_PENDING, ''))
+        parts.extend(self._pack_record(self.RECORD_SET, name, offset, length)
+                     for name, (offset, length) in self._entries.items())
+        atomic_write(self.index_path, b''.join(parts))
+        self._records = len(parts) - 1
+
+    def _append_record(self, record):
+        """索引ファイルの末尾に記録を1件追記し、ディスクに書き込む。"""
+        with open(self.index_path, 'ab') as f:
+            f.write(record)
+            f.flush()
+            os.fsync(f.fileno())
+        self._records += 1
+
+    def _append_body(self, template):
+        """本文をデータファイルの末尾に追記してディスクに書き込み、(位置, バイト数) を返す。"""
+        data = template.encode('utf-8')
+        with open(self.path, 'ab') as f:
+            offset = f.tell()
+            f.write(data)
+            # 索引に記録する前に本文をディスクに書き込んでおく
+            f.flush()
+            os.fsync(f.fileno())
+        return offset, len(data)
+
+    def _close_map(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+
+    def _read_body(self, offset, length):
+        """データファイルの指定範囲を読み出す。追記で範囲が足りなければ mmap し直す。"""
+        if length == 0:
+            return ''
+        if self._map is None or offset + length > len(self._map):
+            self._close_map()
+            with open(self.path, 'rb') as f:
+                self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._map[offset:offset + length].decode('utf-8')
+
+    def load(self):
+        """
+        全てのプロンプトを本文ごと読み込む。
+
+        Returns:
+            list: プロンプトの辞書のリスト。
+        """
+        with self._lock:
+            return [{'name': name, 'template': self._read_body(offset, length)}
+                    for name, (offset, length) in self._entries.items()]
+
+    def load_names(self):
+        """
+        プロンプト名だけを登録順に返す。
+
+        Returns:
+            list: プロンプト名のリスト。
+        """
+        with self._lock:
+            return list(self._entries)
+
+    def load_template(self, name):
+        """
+        指定された名前のテンプレート本文をデータファイルから読み出す。
+
+        Args:
+            name (str): プロンプト名。
+
+        Returns:
+            str: テンプレート本文。見つからない場合は空文字列。
+        """
+        with self._lock:
+            entry = self._entries.get(name)
+            return self._read_body(*entry) if entry is not None else ''
+
+    def insert(self, prompt, prompts):
+        """本文を追記し、索引に1件追加する。"""
+        name, template = prompt['name'], prompt['template']
+        with self._lock:
+            offset, length = self._entries[name] = self._append_body(template)
+            self._append_record(self._pack_record(self.RECORD_SET, name, offset, length))
+
+    def update(self, name, prompt, prompts):
+        """新しい本文を追記し、索引の位置を差し替える (名前が変わった場合も登録順は保つ)。"""
+        new_name, template = prompt['name'], prompt['template']
+        with self._lock:
+            entry = self._append_body(template)
+            if new_name == name:
+                self._entries[name] = entry
+                self._append_record(self._pack_record(self.RECORD_SET, name, *entry))
+            else:
+                self._entries = {(new_name if key == name else key): (entry if key == name else value)
+                                 for key, value in self._entries.items()}
+                self._append_record(self._pack_record(self.RECORD_RENAME, name, *entry, new_name=new_name))
+            self._compact_if_needed()
+
+    def delete(self, name, prompts):
+        """索引から1件削除する (本文の領域は次に詰めるまで残る)。"""
+        with self._lock:
+            if self._entries.pop(name, None) is not None:
+                self._append_record(self._pack_record(self.RECORD_DELETE, name))
+                self._compact_if_needed()
+
+    def rewrite(self, prompts):
+        """データファイルと索引ファイルを書き直す。"""
+        # 遅延読み込みの本文は書き直す前に読み込んでおく
+        rows = [(p['name'], p['template']) for p in prompts]
+        with self._lock:
+            self._rewrite(rows)
+
+    def _rewrite(self, rows):
+        """(名前, 本文) のリストでデータファイルと索引ファイルを作り直す。"""
+        entries = {}
+        offset = 0
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'wb') as f:
+            for name, template in rows:
+                data = template.encode('utf-8')
+                f.write(data)
+                entries[name] = (offset, len(data))
+                offset += len(data)
+            f.flush()
+            os.fsync(f.fileno())
+        # Windows では mmap 中のファイルを置き換えられないため、先に閉じる
+        self._close_map()
+        os.replace(temp_path, self.path)
+        self._entries = entries
+        self._write_index()
+
+    def _compact_if_needed(self):
+        """不要な本文の領域や索引の記録が有効なものより多くなったら、データファイルや索引ファイルを詰める。"""
+        live = sum(length for _, length in self._entries.values())
+        if os.path.getsize(self.path) - live > max(live, 64 * 1024):
+            rows = [(name, self._read_body(offset, length)) for name, (offset, length) in self._entries.items()]
+            self._rewrite(rows)
+        elif self._records - len(self._entries) > max(len(self._entries), 1024):
+            self._write_index()
+
+    def close(self):
+        """mmap を閉じる。"""
+        with self._lock:
+            self._close_map()
+
+
+class DirectoryStorage:
+    """
+    テンプレートを1件1ファイルでディレクトリに保存するバックエンド。
+
+    複数のクライアントで共有するディレクトリ (設定の 'save_directory') の中の
+    専用のサブディレクトリ (TEMPLATE_SUBDIRECTORY) に使用します。保存ディレクトリにある他の .txt は読み込みません。
+    ファイル名は「テンプレート名.txt」で、ファイル名に使えない文字は %XX の形式で表します。
+    変更は対象のテンプレートのファイルだけを原子的に書き換えるため、他のクライアントは
+    変更されたファイルだけを読み直せば最新の状態になります (read_files を参照)。
+    大文字と小文字を区別しないファイルシステムで共有されるため、大文字と小文字だけが異なる名前は使えません
+    (case_insensitive_names を参照)。
+    """
+    EXTENSION = '.txt'
+    # PromptManager は、大文字と小文字だけが異なる名前のテンプレートの保存を拒否する
+    case_insensitive_names = True
+    # ファイル名に使えない文字。% はデコードを一意にするために含める
+    _UNSAFE_CHARS = frozenset('<>:"/\\|?*%')
+    _RESERVED_NAMES = frozenset(['CON', 'PRN', 'AUX', 'NUL', *(f'COM{i}' for i in range(1, 10)),
+                                 *(f'LPT{i}' for i in range(1, 10))])
+
+    def __init__(self, directory, read_only=False):
+        """
+        DirectoryStorageクラスのコンストラクタ。
+
+        Args:
+            directory (str): テンプレートを保存するディレクトリのパス。存在しない場合は作成します。
+            read_only (bool): True の場合はディレクトリを作成しません。
+        """
+        self.directory = os.path.abspath(directory)
+        # ファイル名 → このクライアントが最後に読み書きした時点の (更新日時, サイズ)
+        self._seen = {}
+        self._seen_lock = threading.Lock()
+        if not read_only:
+            os.makedirs(self.directory, exist_ok=True)
+
+    # ファイル名との対応
+
+    @classmethod
+    def filename_for(cls, name):
+        """
+        テンプレート名からファイル名を作成する。
+
+        Args:
+            name (str): テンプレート名。
+
+        Returns:
+            str: ファイル名。
+        """
+        chars = [f"%{ord(c):02X}" if c in cls._UNSAFE_CHARS or ord(c) < 32 else c for c in name]
+        if chars and chars[-1] in ('.', ' '):
+            # Windowsでは末尾のピリオドと空白が削除されるため
+            chars[-1] = f"%{ord(chars[-1]):02X}"
+        if name.startswith('.') or name.split('.')[0].upper() in cls._RESERVED_NAMES:
+            # 先頭のピリオドは隠しファイルになるため、予約名はWindowsで作成できないため
+            chars[0] = f"%{ord(chars[0]):02X}"
+        return ''.join(chars) + cls.EXTENSION
+
+    @classmethod
+    def name_for(cls, filename):
+        """
+        ファイル名からテンプレート名を取得する。
+
+        Args:
+            filename (str): ディレクトリ内のファイル名。
+
+        Returns:
+            str or None: テンプレート名。テンプレートのファイルではない場合 (一時ファイルなど) はNone。
+        """
+        if not filename.endswith(cls.EXTENSION) or filename.startswith('.'):
+            return None
+        name = unquote(filename[:-len(cls.EXTENSION)])
+        # 「a%41.txt」と「aA.txt」のように同じ名前を表すファイルが複数あると、読み込んだファイルと
+        # 書き換える (削除する) ファイルが食い違うため、filename_for と同じ表記のファイルだけを使う
+        if cls.filename_for(name) != filename:
+            return None
+        return name
+
+    def _path(self, name):
+        return os.path.join(self.directory, self.filename_for(name))
+
+    def _read(self, filename):
+        """ファイルを読み込む。ファイルがない場合はNoneを返す。"""
+        try:
+            with open(os.path.join(self.directory, filename), 'r', encoding='utf-8-sig', errors='replace') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def _stat(self, filename):
+        """ファイルの (更新日時, サイズ) を返す。ファイルがない場合はNoneを返す。"""
+        try:
+            stat = os.stat(os.path.join(self.directory, filename))
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _remember(self, filename, stat):
+        """ファイルを読み書きした時点の状態を記録する。stat が None の場合は記録を消す。"""
+        with self._seen_lock:
+            if stat is None:
+                self._seen.pop(filename, None)
+            else:
+                self._seen[filename] = stat
+
+    def _template_files(self):
+        """ディレクトリ内のテンプレートのファイル名をファイル名順に返す。"""
+        return sorted(entry.name for entry in os.scandir(self.directory)
+                      if self.name_for(entry.name) is not None and entry.is_file())
+
+    # 読み込み
+
+    def load(self):
+        """
+        全てのテンプレートを読み込む。
+
+        Returns:
+            list: プロンプトの辞書のリスト (ファイル名順)。
+        """
+        prompts = []
+        for filename in self._template_files():
+            # 読み込みの途中で書き換えられた場合に次の変更通知で読み直すよう、状態は読み込む前に取得する
+            stat = self._stat(filename)
+            template = self._read(filename)
+            if template is not None:
+                self._remember(filename, stat)
+                prompts.append({'name': self.name_for(filename), 'template': template})
+        return prompts
+
+    def load_names(self):
+        """
+        テンプレート名だけを読み込む。
+
+        Returns:
+            list: テンプレート名のリスト (ファイル名順)。
+        """
+        filenames = self._template_files()
+        for filename in filenames:
+            self._remember(filename, self._stat(filename))
+        return [self.name_for(filename) for filename in filenames]
+
+    def load_template(self, name):
+        """
+        指定した名前のテンプレート本文を読み込む。
+
+        Returns:
+            str: テンプレート本文。ファイルが削除されていた場合は空文字列。
+        """
+        template = self._read(self.filename_for(name))
+        return '' if template is None else template
+
+    def read_files(self, filenames):
+        """
+        変更されたファイルだけを読み直す。
+
+        DirectoryWatcher から通知されたファイル名を受け取り、バックグラウンドスレッドで呼び出します。
+        このクライアントが最後に読み書きした時点から更新日時とサイズが変わったファイルだけを返すため、
+        自分で保存したファイルの変更通知は含まれず、遅延読み込みで本文を保持していないテンプレートの変更も検出できます。
+
+        Args:
+            filenames (iterable or None): 変更されたファイル名。None の場合は全てのファイルを確認します。
+
+        Returns:
+            list: (テンプレート名, テンプレート本文) のリスト。ファイルが削除されていた場合、本文は None。
+        """
+        if filenames is None:
+            with self._seen_lock:
+                filenames = set(self._seen)
+            filenames.update(self._template_files())
+        changes = []
+        for filename in sorted(filenames):
+            name = self.name_for(filename)
+            if name is None:
+                continue
+            stat = self._stat(filename)
+            with self._seen_lock:
+                if self._seen.get(filename) == stat:
+                    continue
+            template = self._read(filename) if stat is not None else None
+            self._remember(filename, stat if template is not None else None)
+            changes.append((name, template))
+        return changes
+
+    def import_prompts(self, prompts):
+        """
+        他のストレージのプロンプトを取り込む。
+
+        同じ名前 (大文字と小文字の違いを除く) のテンプレートが既にある場合は、同じ内容であれば取り込まず、
+        内容が異なれば「名前 (2)」のように改名して取り込みます。途中で中断した場合も、
+        もう一度呼び出せば取り込み済みのテンプレートを重複させずに続きを取り込めます。
+
+        Args:
+            prompts (iterable): プロンプトの辞書の列。
+
+        Returns:
+            int: 取り込んだプロンプトの件数。
+        """
+        existing = set()
+        # 改名前の名前 (大文字と小文字の違いを除く) → その名前と「名前 (n)」のテンプレートの本文の集合
+        bodies = {}
+
+        def add(name, template):
+            folded = name.casefold()
+            existing.add(folded)
+            while True:
+                bodies.setdefault(folded, set()).add(template)
+                match = _NUMBERED_NAME.fullmatch(folded)
+                if match is None:
+                    return
+                folded = match.group(1)
+
+        for prompt in self.load():
+            add(prompt['name'], prompt['template'])
+        count = 0
+        for prompt in prompts:
+            name, template = prompt['name'], prompt['template']
+            folded = name.casefold()
+            if template in bodies.get(folded, ()):
+                continue
+            if folded in existing:
+                name = unique_name(name, _CaseInsensitiveNames(existing))
+            self.insert({'name': name, 'template': template}, ())
+            add(name, template)
+            count += 1
+        return count
+
+    # 書き込み
+
+    def insert(self, prompt, prompts):
+        """追加したプロンプトのファイルを作成する。"""
+        filename = self.filename_for(prompt['name'])
+        atomic_write(os.path.join(self.directory, filename), prompt['template'].encode('utf-8'))
+        self._remember(filename, self._stat(filename))
+
+    def update(self, name, prompt, prompts):
+        """更新したプロンプトのファイルを書き換える。改名した場合は古いファイルを削除する。"""
+        self.insert(prompt, prompts)
+        if prompt['name'] != name:
+            try:
+                # 大文字と小文字を区別しないファイルシステムで大文字と小文字だけを変えた場合は同じファイル
+                if os.path.samefile(self._path(name), self._path(prompt['name'])):
+                    self._remember(self.filename_for(name), None)
+                    return
+            except FileNotFoundError:
+                pass
+            self._remove(name)
+
+    def delete(self, name, prompts):
+        """削除したプロンプトのファイルを削除する。"""
+        self._remove(name)
+
+    def rewrite(self, prompts):
+        """全てのプロンプトのファイルを書き直し、一覧にないテンプレートのファイルを削除する。"""
+        filenames = set()
+        for prompt in prompts:
+            filenames.add(self.filename_for(prompt['name']))
+            self.insert(prompt, prompts)
+        for filename in self._template_files():
+            if filename not in filenames:
+                self._remove(self.name_for(filename))
+
+    def _remove(self, name):
+        self._remember(self.filename_for(name), None)
+        try:
+            os.remove(self._path(name))
+        except FileNotFoundError:
+            pass  # 他のクライアントが先に削除した
+
+
+# unique_name で改名した「名前 (n)」
+_NUMBERED_NAME = re.compile(r'(.*) \(\d+\)', re.DOTALL)
+
+
+class _CaseInsensitiveNames:
+    """unique_name に渡すための、大文字と小文字を区別せずに名前の有無を判定するコンテナ。"""
+    def __init__(self, folded_names):
+        self._folded_names = folded_names
+
+    def __contains__(self, name):
+        return name.casefold() in self._folded_names
+
+
+def import_library(storage, appdata_path, library_backend):
+    """
+    ローカルのライブラリ (appdata のプロンプト) を共有ディレクトリのストレージに取り込む。
+
+    保存ディレクトリを設定する前に登録したテンプレートが見えなくならないよう、
+    ディレクトリごとに1回だけ取り込みます。取り込みが完了したディレクトリは appdata の
+    DIRECTORY_IMPORTS_FILE に記録し、失敗した場合は次回の起動で取り込み直します。
+    ライブラリは読み取り専用で開くため、データベースを作成したり変更したりはしません。
+
+    Args:
+        storage (DirectoryStorage): 取り込み先のストレージ。
+        appdata_path (str): アプリケーションデータディレクトリのパス。
+        library_backend (str): ローカルのライブラリのバックエンド ('sqlite'、'json'、'packed' のいずれか)。
+
+    Returns:
+        int: 取り込んだプロンプトの件数。
+    """
+    record_path = os.path.join(appdata_path, DIRECTORY_IMPORTS_FILE)
+    try:
+        with open(record_path, 'r', encoding='utf-8') as f:
+            imported = json.load(f)
+    except (FileNotFoundError, ValueError):
+        imported = []
+    key = os.path.normcase(os.path.realpath(storage.directory))
+    if key in imported:
+        return 0
+    library = create_storage(library_backend, appdata_path, read_only=True)
+    try:
+        count = storage.import_prompts(library.load())
+    finally:
+        connection = getattr(library, 'connection', None)
+        if connection is not None:
+            connection.close()
+        elif hasattr(library, 'close'):
+            library.close()
+    atomic_write(record_path, json.dumps(imported + [key], ensure_ascii=False).encode('utf-8'))
+    return count
+
+
+def create_storage(backend, appdata_path, template_directory=None, read_only=False, library_backend=None):
+    """
+    設定に応じたストレージバックエンドを生成する。
+
+    read_only を指定した場合は、ファイルの作成や prompts.json の取り込みを行わずに既存のデータを読み込みます。
+    SQLite と packed のファイルがまだない場合は、取り込まれるはずの prompts.json を読み込みます。
+
+    Args:
+        backend (str): 'sqlite'、'json'、'packed'、'directory' のいずれか。
+        appdata_path (str): アプリケーションデータディレクトリのパス。
+        template_directory (str, optional): 'directory' の場合の保存ディレクトリのパス。
+            テンプレートはその中の TEMPLATE_SUBDIRECTORY に保存します。
+        read_only (bool): 読み込みだけを行うかどうか (コマンドラインからの描画で使用)。
+        library_backend (str, optional): 'directory' の場合に、初回に取り込むローカルのライブラリのバックエンド
+            (import_library を参照)。
+
+    Returns:
+        JsonStorage, SQLiteStorage, PackedStorage or DirectoryStorage: ストレージバックエンド。
+
+    Raises:
+        ValueError: 未知のバックエンドが指定された場合、または 'directory' でディレクトリが指定されていない場合。
+    """
+    prompts_file = os.path.join(appdata_path, 'prompts.json')
+    if backend == 'json':
+        return JsonStorage(prompts_file, read_only=read_only)
+    if backend == 'sqlite':
+        path = os.path.join(appdata_path, 'prompts.db')
+        if read_only and not os.path.exists(path):
+            return JsonStorage(prompts_file, read_only=True)
+        return SQLiteStorage(path, import_path=prompts_file, read_only=read_only)
+    if backend == 'packed':
+        path = os.path.join(appdata_path, 'prompts.pack')
+        if read_only and not (os.path.exists(path) and os.path.exists(path + '.idx')):
+            return JsonStorage(prompts_file, read_only=True)
+        return PackedStorage(path, import_path=prompts_file, read_only=read_only)
+    if backend == 'directory':
+        if not template_directory:
+            raise ValueError("テンプレートを保存するディレクトリが指定されていません。")
+        storage = DirectoryStorage(os.path.join(template_directory, TEMPLATE_SUBDIRECTORY), read_only=read_only)
+        if library_backend and not read_only:
+            import_library(storage, appdata_path, library_backend)
+        return storage
+    raise ValueError(f"未知のストレージバックエンドです: {backend}")
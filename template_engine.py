@@ -0,0 +1,548 @@
+"""
+テンプレートのコンパイルと描画を行うモジュール。
+
+テンプレート文字列を一度だけ字句解析して「リテラル」と「変数スロット」の
+セグメント列に変換し、描画時は ''.join による一回の連結で結果を生成します。
+描画結果は RenderCache にキャッシュし、同じテンプレートと値の組み合わせでは描画を省略します。
+tkinter に依存しないため、GUI 以外の描画経路からも利用できます。
+また、テンプレートに含まれる変数の抽出と、{{> テンプレート名}} による他のテンプレートの
+取り込み (TemplateComposer) もこのモジュールに集約しています。
+"""
+
+import re
+import sys
+import hashlib
+import threading
+from collections import Counter, OrderedDict, defaultdict
+from functools import lru_cache
+
+# テンプレート内の変数 ({{変数名}}) を表す正規表現
+VARIABLE_PATTERN = re.compile(r'\{\{(\w+)\}\}')
+# 他のテンプレートの取り込み ({{> テンプレート名}}) を表す正規表現
+PARTIAL_PATTERN = re.compile(r'\{\{>\s*([^{}]+?)\s*\}\}')
+
+
+class CompiledTemplate:
+    """
+    コンパイル済みテンプレートを表すクラス。
+
+    parts はリテラルとスロットを出現順に並べたリストで、スロットの位置には
+    元の「{{変数名}}」が入っています。値が与えられなかった変数はそのまま残るため、
+    従来の str.replace による置換と同じ結果になります。
+    """
+    __slots__ = ('source', 'parts', 'slots', 'variables', 'digest')
+
+    def __init__(self, source):
+        """
+        CompiledTemplateクラスのコンストラクタ。
+
+        Args:
+            source (str): コンパイルするテンプレート文字列。
+        """
+        self.source = source
+        self.parts = []
+        self.slots = []  # (parts 内のインデックス, 変数名) のリスト
+        position = 0
+        for match in VARIABLE_PATTERN.finditer(source):
+            if match.start() > position:
+                self.parts.append(source[position:match.start()])
+            self.slots.append((len(self.parts), match.group(1)))
+            self.parts.append(match.group(0))
+            position = match.end()
+        if position < len(source):
+            self.parts.append(source[position:])
+        self._finish()
+
+    @classmethod
+    def concatenate(cls, templates):
+        """
+        複数のコンパイル済みテンプレートを連結したものを、字句解析し直さずに作成する。
+
+        連結した境界をまたいで「{{変数名}}」ができる場合 (「{{」で終わるテンプレートの後に
+        「v}}」で始まるテンプレートが続く場合など) は、連結した文字列全体をコンパイルし直します。
+        そのため結果は常に CompiledTemplate(連結した文字列) と同じになります。
+
+        Args:
+            templates (list): CompiledTemplate のリスト。
+
+        Returns:
+            CompiledTemplate: 連結したコンパイル済みテンプレート。
+        """
+        compiled = cls.__new__(cls)
+        compiled.source = ''.join(template.source for template in templates)
+        compiled.parts = []
+        compiled.slots = []
+        for template in templates:
+            offset = len(compiled.parts)
+            compiled.slots.extend((offset + index, name) for index, name in template.slots)
+            compiled.parts.extend(template.parts)
+        if _crosses_boundary(compiled.source, templates):
+            return cls(compiled.source)
+        compiled._finish()
+        return compiled
+
+    def _finish(self):
+        """parts と slots から残りの属性を設定する。"""
+        # 出現順で重複を除いた変数名のリスト
+        self.variables = list(dict.fromkeys(name for _, name in self.slots))
+        # テンプレートの版。RenderCache のキーに使用する
+        self.digest = hashlib.blake2b(self.source.encode('utf-8', 'surrogatepass'), digest_size=16).digest()
+
+    def render(self, values):
+        """
+        変数の値を埋め込んだ文字列を生成する。
+
+        Args:
+            values (dict): 変数名をキー、置換する文字列を値とする辞書。
+
+        Returns:
+            str: 描画結果の文字列。
+        """
+        parts = self.parts[:]
+        for index, name in self.slots:
+            value = values.get(name)
+            if value is not None:
+                parts[index] = value
+        return ''.join(parts)
+
+    def stream(self, values):
+        """
+        変数の値を埋め込んだ結果を、先頭から順に部分文字列として生成する。
+
+        値が文字列でない場合 (FileValue など) は、その chunks() が返す文字列を順に出力します。
+        大きなファイルの内容を1つの文字列に連結せずに書き出すために使用します。
+
+        Args:
+            values (dict): 変数名をキー、文字列または chunks() を持つオブジェクトを値とする辞書。
+
+        Yields:
+            str: 描画結果の一部。
+        """
+        slot_names = dict(self.slots)
+        for index, part in enumerate(self.parts):
+            value = values.get(slot_names[index]) if index in slot_names else None
+            if value is None:
+                yield part
+            elif isinstance(value, str):
+                yield value
+            else:
+                yield from value.chunks()
+
+
+def _crosses_boundary(source, templates):
+    """
+    連結した文字列で、いずれかのテンプレートの境界をまたぐ変数があるかを判定する。
+
+    変数の内側には「{」が現れないため、境界の直前 (境界の1文字目までを含む) で最後の「{{」から
+    始まる変数だけを調べれば十分です。
+
+    Args:
+        source (str): テンプレートを連結した文字列。
+        templates (list): 連結した CompiledTemplate のリスト。
+
+    Returns:
+        bool: 境界をまたぐ変数がある場合はTrue。
+    """
+    boundary = 0
+    for template in templates[:-1]:
+        boundary += len(template.source)
+        start = source.rfind('{{', 0, boundary + 1)
+        if start != -1 and start < boundary:
+            match = VARIABLE_PATTERN.match(source, start)
+            if match is not None and match.end() > boundary:
+                return True
+    return False
+
+
+@lru_cache(maxsize=256)
+def compile_template(template):
+    """
+    テンプレートをコンパイルする。
+
+    同じテンプレート文字列に対してはキャッシュ済みの結果を返します。
+
+    Args:
+        template (str): テンプレート文字列。
+
+    Returns:
+        CompiledTemplate: コンパイル済みテンプレート。
+    """
+    return CompiledTemplate(template)
+
+
+def render_template(template, values):
+    """
+    テンプレート文字列に変数の値を埋め込んだ結果を返す。
+
+    同じテンプレートと値の組み合わせは描画結果のキャッシュ (render_cache) から返します。
+
+    Args:
+        template (str): テンプレート文字列。
+        values (dict): 変数名をキー、置換する文字列を値とする辞書。
+
+    Returns:
+        str: 描画結果の文字列。
+    """
+    return render_cache.render(compile_template(template), values)
+
+
+# 描画結果のキャッシュの上限 (バイト)
+RENDER_CACHE_BYTES = 32 * 1024 * 1024
+# キャッシュの1件あたりの、描画結果とキーの値以外 (管理情報) のおおよそのサイズ (バイト)
+_RENDER_CACHE_ENTRY_OVERHEAD = 200
+
+
+class RenderCache:
+    """
+    描画結果の LRU キャッシュ。
+
+    キーは (テンプレートID, テンプレートの版, 変数の値のタプル) で、テンプレートの版には
+    テンプレート内容のハッシュ (CompiledTemplate.digest) を使用するため、テンプレートを
+    編集すると古い結果は参照されなくなり、やがて追い出されます。変数の値はテンプレートで
+    使われている変数の分だけを出現順に並べ、値のない変数は None とします。
+    保持する描画結果とキーの値の合計サイズが max_bytes を超えると、最も長く使われていないものから追い出します。
+    複数のスレッドから使用できます。
+    """
+    def __init__(self, max_bytes=RENDER_CACHE_BYTES):
+        """
+        RenderCacheクラスのコンストラクタ。
+
+        Args:
+            max_bytes (int): 保持する描画結果とキーの値の合計サイズの上限 (バイト)。
+        """
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()  # キー → (描画結果, サイズ)
+        self._lock = threading.Lock()
+
+    def render(self, compiled, values, template_id=None):
+        """
+        キャッシュを使ってテンプレートを描画する。
+
+        Args:
+            compiled (CompiledTemplate or str): コンパイル済みテンプレート、またはテンプレート文字列。
+            values (dict): 変数名をキー、置換する文字列を値とする辞書。
+            template_id (str, optional): テンプレートを識別する名前 (テンプレート名など)。
+
+        Returns:
+            str: 描画結果の文字列。
+        """
+        if isinstance(compiled, str):
+            compiled = compile_template(compiled)
+        if not compiled.slots:
+            return compiled.source
+        # 値のタプルをキーにすると、ハッシュ値は文字列ごとにキャッシュされたものが使われる
+        key = (template_id, compiled.digest, tuple([values.get(name) for name in compiled.variables]))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+        rendered = compiled.render(values)
+        self._store(key, rendered)
+        return rendered
+
+    def _store(self, key, rendered):
+        """描画結果を追加し、上限を超えた分を古いものから追い出す。"""
+        # キーの値は全て描画結果に含まれているため、その合計は描画結果のサイズを超えない
+        size = 2 * sys.getsizeof(rendered) + _RENDER_CACHE_ENTRY_OVERHEAD
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.size -= previous[1]
+            self._entries[key] = (rendered, size)
+            self.size += size
+            while self.size > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.size -= evicted
+                self.evictions += 1
+
+    def clear(self):
+        """キャッシュを空にする。カウンターはそのまま残します。"""
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def stats(self):
+        """
+        キャッシュの利用状況を取得する。
+
+        Returns:
+            dict: hits、misses、evictions、entries (件数)、bytes (合計サイズ)、hit_rate を含む辞書。
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+                'bytes': self.size,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
+
+
+# アプリケーション全体で共有する描画結果のキャッシュ
+render_cache = RenderCache()
+
+
+class TemplateComposer:
+    """
+    {{> テンプレート名}} で他のテンプレート (パーシャル) を取り込んだテンプレートを展開してコンパイルするクラス。
+
+    取り込みは描画の前に一度だけ展開します。パーシャルはそれぞれ一度だけコンパイルし、
+    取り込む側ではコンパイル済みのセグメントをつなぎ合わせるため、共通の前文を字句解析し直すことはなく、
+    描画の手間も取り込みのないテンプレートと変わりません。取り込みの境界をまたいで「{{変数名}}」が
+    できる場合は展開後の文字列をコンパイルし直すため、結果は常に compile_template(expand(...)) と同じです。パーシャルに含まれる変数は、
+    取り込んだテンプレートの変数として扱います。見つからないテンプレートや循環する取り込みは
+    「{{> テンプレート名}}」のまま残します。
+
+    展開結果はテンプレート名 (パーシャル) とテンプレート文字列ごとにキャッシュし、
+    どのテンプレートがどのパーシャルを取り込んでいるかの依存関係を保持します。
+    テンプレートが変更されたときに invalidate を呼び出すと、そのテンプレートと
+    それを (間接的に) 取り込んでいるものだけが次回の使用時に展開し直されます。
+    """
+    def __init__(self, get_source, max_sources=256):
+        """
+        TemplateComposerクラスのコンストラクタ。
+
+        Args:
+            get_source (callable): テンプレート名を受け取り、テンプレート文字列 (見つからない場合は None) を返す関数。
+            max_sources (int): コンパイル結果をキャッシュするテンプレート文字列の最大数。
+        """
+        self.get_source = get_source
+        self.max_sources = max_sources
+        self._partials = {}                  # テンプレート名 → 展開してコンパイルしたパーシャル
+        self._compiled = OrderedDict()       # テンプレート文字列 → CompiledTemplate (LRU)
+        self._dependencies = {}              # ノード → 直接取り込んでいるテンプレート名の集合
+        self._dependents = defaultdict(set)  # テンプレート名 → それを直接取り込んでいるノードの集合
+        self._lock = threading.RLock()
+
+    def compile(self, source):
+        """
+        テンプレート文字列の取り込みを展開してコンパイルする。
+
+        Args:
+            source (str): テンプレート文字列。
+
+        Returns:
+            CompiledTemplate: コンパイル済みテンプレート。取り込みがなければ compile_template と同じものを返します。
+        """
+        if '{{>' not in source:
+            return compile_template(source)
+        with self._lock:
+            compiled = self._compiled.get(source)
+            if compiled is not None:
+                self._compiled.move_to_end(source)
+                return compiled
+            compiled, _ = self._compose(source, ('source', source), ())
+            self._compiled[source] = compiled
+            if len(self._compiled) > self.max_sources:
+                oldest, _ = self._compiled.popitem(last=False)
+                self._set_dependencies(('source', oldest), ())
+            return compiled
+
+    def expand(self, source):
+        """
+        テンプレート文字列の取り込みを展開した文字列を返す。
+
+        Args:
+            source (str): テンプレート文字列。
+
+        Returns:
+            str: 展開後のテンプレート文字列。
+        """
+        return self.compile(source).source
+
+    def invalidate(self, name):
+        """
+        テンプレートの変更に合わせて、そのテンプレートと、それを取り込んでいるものの展開結果を破棄する。
+
+        Args:
+            name (str): 追加・変更・削除されたテンプレートの名前。
+        """
+        with self._lock:
+            for node in self._walk_dependents(name):
+                if isinstance(node, tuple):
+                    self._compiled.pop(node[1], None)
+                else:
+                    self._partials.pop(node, None)
+                self._set_dependencies(node, ())
+
+    def clear(self):
+        """全ての展開結果と依存関係を破棄する。"""
+        with self._lock:
+            self._partials.clear()
+            self._compiled.clear()
+            self._dependencies.clear()
+            self._dependents.clear()
+
+    def _walk_dependents(self, name):
+        """name とそれを直接または間接的に取り込んでいるノードを列挙する。"""
+        seen = {name}
+        pending = [name]
+        while pending:
+            node = pending.pop()
+            for dependent in self._dependents.get(node, ()):
+                if dependent not in seen:
+                    seen.add(dependent)
+                    pending.append(dependent)
+        return seen
+
+    def _set_dependencies(self, node, names):
+        """ノードが直接取り込んでいるテンプレート名を記録し直す。"""
+        for name in self._dependencies.pop(node, ()):
+            dependents = self._dependents.get(name)
+            if dependents is not None:
+                dependents.discard(node)
+                if not dependents:
+                    del self._dependents[name]
+        if names:
+            self._dependencies[node] = set(names)
+            for name in names:
+                self._dependents[name].add(node)
+
+    def _compose(self, source, node, stack):
+        """
+        テンプレート文字列の取り込みを再帰的に展開してコンパイルする。
+
+        Args:
+            source (str): テンプレート文字列。
+            node: 依存関係を記録するノード (テンプレート名、または ('source', テンプレート文字列))。
+            stack (tuple): 展開中のテンプレート名 (循環の検出に使用)。
+
+        Returns:
+            tuple: (CompiledTemplate, 循環する取り込みを含むかどうか)。
+        """
+        pieces = []
+        names = set()
+        cyclic = False
+        position = 0
+        for match in PARTIAL_PATTERN.finditer(source):
+            if match.start() > position:
+                pieces.append(CompiledTemplate(source[position:match.start()]))
+            name = match.group(1)
+            names.add(name)
+            partial = None
+            if name in stack:
+                cyclic = True
+            else:
+                partial, partial_cyclic = self._compile_partial(name, stack)
+                cyclic = cyclic or partial_cyclic
+            # 見つからない・循環する取り込みは「{{> テンプレート名}}」のまま残す
+            pieces.append(partial if partial is not None else CompiledTemplate(match.group(0)))
+            position = match.end()
+        if position < len(source):
+            pieces.append(CompiledTemplate(source[position:]))
+        self._set_dependencies(node, names)
+        return CompiledTemplate.concatenate(pieces), cyclic
+
+    def _compile_partial(self, name, stack):
+        """パーシャルを展開してコンパイルする。見つからない場合は None を返す。"""
+        compiled = self._partials.get(name)
+        if compiled is not None:
+            return compiled, False
+        source = self.get_source(name)
+        if source is None:
+            return None, False
+        compiled, cyclic = self._compose(source, name, stack + (name,))
+        # 循環を含む展開結果はどこから取り込んだかで変わるため、キャッシュしない
+        if not cyclic:
+            self._partials[name] = compiled
+        return compiled, cyclic
+
+
+# extract_variables のキャッシュ (テンプレートのハッシュ → 変数名のタプル)
+_variables_cache = OrderedDict()
+_VARIABLES_CACHE_SIZE = 256
+
+
+def extract_variables(template):
+    """
+    テンプレートに含まれる変数名を出現順・重複なしで返す。
+
+    結果はテンプレート内容のハッシュをキーにキャッシュされるため、
+    同じテンプレートに対する2回目以降の呼び出しでは正規表現を実行しません。
+
+    Args:
+        template (str): テンプレート文字列。
+
+    Returns:
+        tuple: 変数名のタプル。
+    """
+    key = hashlib.blake2b(template.encode('utf-8'), digest_size=16).digest()
+    variables = _variables_cache.get(key)
+    if variables is None:
+        variables = tuple(dict.fromkeys(VARIABLE_PATTERN.findall(template)))
+        _variables_cache[key] = variables
+        if len(_variables_cache) > _VARIABLES_CACHE_SIZE:
+            _variables_cache.popitem(last=False)
+    else:
+        _variables_cache.move_to_end(key)
+    return variables
+
+
+class VariableTracker:
+    """
+    編集中のテンプレートに含まれる変数を行単位で追跡するクラス。
+
+    変数 ({{変数名}}) は改行をまたがないため、行ごとの変数を保持しておけば
+    編集された行だけを再走査して全体の変数集合を更新できます。
+    """
+    def __init__(self, text=''):
+        """
+        VariableTrackerクラスのコンストラクタ。
+
+        Args:
+            text (str): 初期テキスト。
+        """
+        self.line_variables = []
+        self.counts = Counter()
+        self.set_text(text)
+
+    @property
+    def line_count(self):
+        return len(self.line_variables)
+
+    def set_text(self, text):
+        """
+        テキスト全体を設定し直す。
+
+        Args:
+            text (str): テキスト全体。
+        """
+        self.line_variables = []
+        self.counts = Counter()
+        self.replace_lines(0, 0, text.split('\n'))
+
+    def replace_lines(self, start, end, lines):
+        """
+        指定した範囲の行を新しい行で置き換え、その行だけを再走査する。
+
+        Args:
+            start (int): 置き換える最初の行 (0始まり)。
+            end (int): 置き換える範囲の終わり (この行は含まない)。
+            lines (list): 新しい行のリスト。
+        """
+        for variables in self.line_variables[start:end]:
+            self.counts.subtract(variables)
+        new_variables = [VARIABLE_PATTERN.findall(line) for line in lines]
+        for variables in new_variables:
+            self.counts.update(variables)
+        self.line_variables[start:end] = new_variables
+
+    def variables(self):
+        """
+        現在のテキストに含まれる変数名の集合を返す。
+
+        Returns:
+            set: 変数名の集合。
+        """
+        return {name for name, count in self.counts.items() if count > 0}
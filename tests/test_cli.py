@@ -0,0 +1,86 @@
+"""
+コマンドラインからの描画 (cli.py) のテスト。
+
+使い方:
+    python -m pytest tests
+"""
+
+import io
+import os
+import sys
+import json
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cli
+from storage import JsonStorage
+
+
+class OutputDirectoryTest(unittest.TestCase):
+    def setUp(self):
+        self._directory = tempfile.TemporaryDirectory()
+        self.root = self._directory.name
+        self.output_dir = os.path.join(self.root, 'out')
+        self.template_file = os.path.join(self.root, 'template.txt')
+        with open(self.template_file, 'w', encoding='utf-8') as f:
+            f.write("{{text}}")
+
+    def tearDown(self):
+        self._directory.cleanup()
+
+    def render(self, rows, *options):
+        stdin = io.StringIO(''.join(json.dumps(row, ensure_ascii=False) + '\n' for row in rows))
+        argv = ['--template-file', self.template_file, '--output-dir', self.output_dir,
+                '--name-field', 'name', *options]
+        return cli.main(argv, stdin=stdin, stdout=io.StringIO())
+
+    def test_name_cannot_escape_output_directory(self):
+        self.assertEqual(self.render([{'name': '../../escaped', 'text': "x"}]), 0)
+        self.assertEqual(sorted(os.listdir(self.root)), ['out', 'template.txt'])
+        self.assertEqual(os.listdir(self.output_dir), ['%2E.%2F..%2Fescaped.txt'])
+
+    def test_duplicate_names_get_numbered(self):
+        rows = [{'name': 'a', 'text': "1"}, {'name': 'A', 'text': "2"}, {'name': 'a', 'text': "3"},
+                {'name': 'a (2)', 'text': "4"}, {'text': "5"}]
+        for options in ([], ['--workers', '2', '--batch-size', '2']):
+            with self.subTest(options=options):
+                self.assertEqual(self.render(rows, *options), 0)
+                contents = {}
+                for file_name in os.listdir(self.output_dir):
+                    with open(os.path.join(self.output_dir, file_name), encoding='utf-8') as f:
+                        contents[file_name] = f.read()
+                self.assertEqual(contents, {'a.txt': "1", 'A (2).txt': "2", 'a (3).txt': "3",
+                                            'a (2) (2).txt': "4", '000004.txt': "5"})
+                for file_name in contents:
+                    os.remove(os.path.join(self.output_dir, file_name))
+
+
+class ReadOnlyLibraryTest(unittest.TestCase):
+    def test_render_does_not_modify_library(self):
+        with tempfile.TemporaryDirectory() as appdata_path:
+            storage = JsonStorage(os.path.join(appdata_path, 'prompts.json'))
+            storage.rewrite([{'name': '要約', 'template': "要約: {{text}}"},
+                             {'name': '要約', 'template': "重複"}])
+            before = sorted(os.listdir(appdata_path))
+            stdout = io.StringIO()
+            status = cli.main(['--template', '要約', '--data-dir', appdata_path, '--backend', 'sqlite'],
+                              stdin=io.StringIO('{"text": "本文"}\n'), stdout=stdout)
+            self.assertEqual(status, 0)
+            self.assertEqual(stdout.getvalue(), "要約: 本文\n")
+            self.assertEqual(sorted(os.listdir(appdata_path)), before)
+
+    def test_render_does_not_create_data_directory(self):
+        with tempfile.TemporaryDirectory() as root:
+            appdata_path = os.path.join(root, 'appdata')
+            stdout = io.StringIO()
+            status = cli.main(['--template', '要約', '--data-dir', appdata_path],
+                              stdin=io.StringIO('{"text": "本文"}\n'), stdout=stdout)
+            # 設定を読むためにデータディレクトリや settings.json を作成しない
+            self.assertNotEqual(status, 0)
+            self.assertEqual(os.listdir(root), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
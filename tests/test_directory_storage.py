@@ -0,0 +1,122 @@
+"""
+保存ディレクトリに1件1ファイルで保存するストレージ (DirectoryStorage) のテスト。
+
+使い方:
+    python -m pytest tests
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import PromptManager, DuplicatePromptError
+from storage import DirectoryStorage, SQLiteStorage, TEMPLATE_SUBDIRECTORY
+
+
+class DirectoryStorageTest(unittest.TestCase):
+    def setUp(self):
+        self._directory = tempfile.TemporaryDirectory()
+        self.appdata_path = os.path.join(self._directory.name, 'appdata')
+        self.save_directory = os.path.join(self._directory.name, 'shared')
+        self.template_directory = os.path.join(self.save_directory, TEMPLATE_SUBDIRECTORY)
+        os.makedirs(self.appdata_path)
+        os.makedirs(self.save_directory)
+
+    def tearDown(self):
+        self._directory.cleanup()
+
+    def manager(self, lazy_templates=False):
+        return PromptManager('directory', appdata_path=self.appdata_path, lazy_templates=lazy_templates,
+                             template_directory=self.save_directory)
+
+    def write(self, filename, text):
+        with open(os.path.join(self.template_directory, filename), 'w', encoding='utf-8') as f:
+            f.write(text)
+
+    def test_other_files_in_save_directory_are_not_templates(self):
+        with open(os.path.join(self.save_directory, 'notes.txt'), 'w', encoding='utf-8') as f:
+            f.write("メモ")
+        manager = self.manager()
+        manager.save_prompt('a', "本文")
+        manager.storage.rewrite(manager.prompts)
+        self.assertEqual(manager.get_prompt('notes'), None)
+        self.assertTrue(os.path.exists(os.path.join(self.save_directory, 'notes.txt')))
+        self.assertEqual(os.listdir(self.template_directory), ['a.txt'])
+
+    def test_library_is_imported_once(self):
+        storage = SQLiteStorage(os.path.join(self.appdata_path, 'prompts.db'))
+        storage.insert({'name': 'ローカル', 'template': "ローカルの本文"}, [])
+        storage.insert({'name': 'Shared', 'template': "ローカルで編集した本文"}, [])
+        storage.connection.close()
+        os.makedirs(self.template_directory)
+        self.write('shared.txt', "共有の本文")
+
+        manager = self.manager()
+        self.assertEqual({p['name']: p['template'] for p in manager.prompts},
+                         {'ローカル': "ローカルの本文", 'shared': "共有の本文", 'Shared (2)': "ローカルで編集した本文"})
+        # 取り込み済みのため、共有ディレクトリで削除したテンプレートは取り込み直さない
+        manager.delete_prompt('ローカル')
+        self.assertIsNone(self.manager().get_prompt('ローカル'))
+
+    def test_import_can_be_resumed(self):
+        storage = DirectoryStorage(self.template_directory)
+        prompts = [{'name': 'a', 'template': "1"}, {'name': 'A', 'template': "2"}, {'name': 'a', 'template': "3"},
+                   {'name': 'b', 'template': "4"}]
+        self.assertEqual(storage.import_prompts(prompts[:2]), 2)
+        # 中断した取り込みをやり直しても、改名して取り込んだテンプレートは重複させない
+        self.assertEqual(storage.import_prompts(prompts), 2)
+        self.assertEqual(storage.import_prompts(prompts), 0)
+        self.assertEqual({p['name']: p['template'] for p in storage.load()},
+                         {'a': "1", 'A (2)': "2", 'a (3)': "3", 'b': "4"})
+
+    def test_only_canonical_file_names_are_templates(self):
+        os.makedirs(self.template_directory)
+        self.write('aA.txt', "正しい表記")
+        self.write('a%41.txt', "別の表記")
+        self.write('%ZZ.txt', "不正な表記")
+        manager = self.manager()
+        self.assertEqual([p['name'] for p in manager.prompts], ['aA'])
+        manager.delete_prompt('aA')
+        self.assertEqual(sorted(os.listdir(self.template_directory)), ['%ZZ.txt', 'a%41.txt'])
+
+    def test_names_differing_only_in_case_are_rejected(self):
+        manager = self.manager()
+        manager.save_prompt('Summary', "本文")
+        with self.assertRaises(DuplicatePromptError):
+            manager.save_prompt('summary', "別の本文")
+        manager.save_prompt('other', "本文")
+        with self.assertRaises(DuplicatePromptError):
+            manager.rename_prompt('other', 'SUMMARY')
+        self.assertTrue(manager.rename_prompt('Summary', 'summary'))
+
+    def test_external_change_of_lazy_template_is_detected(self):
+        manager = self.manager()
+        manager.save_prompt('a', "古い本文")
+        manager = self.manager(lazy_templates=True)
+        self.assertFalse(manager.get_prompt('a').is_loaded)
+        events = []
+        manager.add_listener(lambda event, name, prompt: events.append((event, name)))
+        # 自分で保存したファイルの変更通知は変更として扱わない
+        manager.update_prompt('a', "自分の本文")
+        storage = manager.storage
+        self.assertEqual(storage.read_files(['a.txt']), [])
+
+        other = DirectoryStorage(self.template_directory)
+        other.update('a', {'name': 'a', 'template': "他のPCで編集した本文です"}, [])
+        self.assertEqual(manager.apply_external_changes(storage.read_files(['a.txt'])), 1)
+        self.assertEqual(manager.get_prompt('a')['template'], "他のPCで編集した本文です")
+        self.assertEqual(events, [('update', 'a'), ('update', 'a')])
+
+    def test_lazy_template_changed_before_first_read(self):
+        manager = self.manager()
+        manager.save_prompt('a', "古い本文")
+        manager = self.manager(lazy_templates=True)
+        DirectoryStorage(self.template_directory).update('a', {'name': 'a', 'template': "新しい本文です"}, [])
+        self.assertEqual(manager.apply_external_changes(manager.storage.read_files(None)), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+"""
+テンプレートの版の履歴 (history.py と PromptManager からの記録) のテスト。
+
+使い方:
+    python -m pytest tests
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from history import TemplateHistory
+from models import PromptManager
+from storage import SQLiteStorage
+
+
+class PromptManagerHistoryTest(unittest.TestCase):
+    def setUp(self):
+        self._directory = tempfile.TemporaryDirectory()
+        self.appdata_path = self._directory.name
+
+    def tearDown(self):
+        self._directory.cleanup()
+
+    def test_first_edit_of_existing_template_keeps_old_body(self):
+        # 履歴の機能を使う前から登録されていたテンプレート
+        storage = SQLiteStorage(os.path.join(self.appdata_path, 'prompts.db'))
+        storage.insert({'name': 'a', 'template': "元の本文\n{{text}}"}, [])
+        storage.connection.close()
+
+        manager = PromptManager('sqlite', appdata_path=self.appdata_path, lazy_templates=False)
+        self.assertTrue(manager.update_prompt('a', "編集した本文\n{{text}}"))
+
+        history = manager.history
+        self.assertEqual([row[0] for row in history.versions('a')], [2, 1])
+        self.assertEqual(history.get('a', 1), "元の本文\n{{text}}")
+        self.assertEqual(history.get('a', 2), "編集した本文\n{{text}}")
+
+    def test_rename_moves_history(self):
+        manager = PromptManager('sqlite', appdata_path=self.appdata_path, lazy_templates=False)
+        manager.save_prompt('a', "one")
+        manager.update_prompt('a', "two", new_name='b')
+        self.assertEqual(manager.history.versions('a'), [])
+        self.assertEqual([manager.history.get('b', v) for v in (1, 2)], ["one", "two"])
+
+
+class TemplateHistoryTest(unittest.TestCase):
+    def test_every_version_is_rebuilt(self):
+        with tempfile.TemporaryDirectory() as directory:
+            history = TemplateHistory(os.path.join(directory, 'history.db'), snapshot_interval=3)
+            versions = []
+            lines = [f"line {i}\n" for i in range(50)]
+            for number in range(10):
+                lines[number * 3] = f"edited {number}\n"
+                if number % 2:
+                    del lines[number]
+                else:
+                    lines.insert(number, "inserted\n")
+                versions.append(''.join(lines))
+                history.record('t', versions[-1])
+            self.assertIsNone(history.record('t', versions[-1]))
+            history.close()
+
+            history = TemplateHistory(os.path.join(directory, 'history.db'), snapshot_interval=3)
+            for version, text in enumerate(versions, 1):
+                self.assertEqual(history.get('t', version), text)
+            history.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
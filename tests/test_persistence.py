@@ -0,0 +1,59 @@
+"""
+バックグラウンドでの書き込み (persistence.py) のテスト。
+
+使い方:
+    python -m pytest tests
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from persistence import WriteBehindWriter
+
+
+class WriteBehindWriterTest(unittest.TestCase):
+    def setUp(self):
+        self._directory = tempfile.TemporaryDirectory()
+        self.writer = WriteBehindWriter(delay=0)
+
+    def tearDown(self):
+        self.writer.close()
+        self._directory.cleanup()
+
+    def path(self, name):
+        return os.path.join(self._directory.name, name)
+
+    def test_errors_are_reported_for_their_own_path(self):
+        broken, other = self.path('broken.json'), self.path('other.json')
+        self.writer.submit(broken, lambda: "\ud800".encode('utf-8'))
+        self.writer.submit(other, lambda: b'{}')
+        # 他のパスのエラーは送出も破棄もしない
+        self.writer.flush(other)
+        with self.assertRaises(UnicodeEncodeError):
+            self.writer.flush(broken)
+        self.writer.flush(broken)
+
+    def test_flush_all_reports_every_path(self):
+        self.writer.submit(self.path('broken.json'), lambda: "\ud800".encode('utf-8'))
+        with self.assertRaises(UnicodeEncodeError):
+            self.writer.flush()
+        self.writer.flush()
+
+    def test_later_successful_write_clears_error(self):
+        path = self.path('prompts.json')
+        self.writer.submit(path, lambda: "\ud800".encode('utf-8'))
+        # 後から予約したパスの書き込みを待てば、先に予約した書き込みも終わっている
+        self.writer.submit(self.path('unrelated.json'), lambda: b'{}')
+        self.writer.flush(self.path('unrelated.json'))
+        self.writer.submit(path, lambda: b'[]')
+        self.writer.flush(path)
+        with open(path, 'rb') as f:
+            self.assertEqual(f.read(), b'[]')
+
+
+if __name__ == '__main__':
+    unittest.main()
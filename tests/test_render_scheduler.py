@@ -0,0 +1,90 @@
+"""
+プレビュー更新をまとめるスケジューラ (utils.RenderScheduler) のテスト。
+
+使い方:
+    python -m pytest tests
+"""
+
+import os
+import sys
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import utils
+from utils import RenderScheduler
+
+
+class FakeWidget:
+    """after() の予約を記録し、テストの時計に合わせて実行するウィジェットの代わり。"""
+    def __init__(self, clock):
+        self.clock = clock
+        self.jobs = {}  # ID → (実行する時刻, 処理)
+        self._next_id = 0
+
+    def after(self, ms, func):
+        self._next_id += 1
+        self.jobs[self._next_id] = (self.clock() + ms / 1000, func)
+        return self._next_id
+
+    def after_idle(self, func):
+        return self.after(0, func)
+
+    def after_cancel(self, after_id):
+        self.jobs.pop(after_id, None)
+
+    def run_due(self):
+        """実行する時刻になった処理を実行する。"""
+        for after_id, (due, func) in list(self.jobs.items()):
+            if due <= self.clock() + 1e-9:
+                del self.jobs[after_id]
+                func()
+
+
+class RenderSchedulerTest(unittest.TestCase):
+    def setUp(self):
+        self.now = 100.0
+        patcher = mock.patch.object(utils.time, 'monotonic', lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.widget = FakeWidget(lambda: self.now)
+        self.renders = []
+        self.scheduler = RenderScheduler(self.widget, lambda: self.renders.append(self.now), 50)
+
+    def test_held_key_renders_once_per_interval(self):
+        # 10ミリ秒ごとのキーリピートを200ミリ秒続ける
+        for step in range(20):
+            self.now = 100.0 + step * 0.01
+            self.widget.run_due()
+            self.scheduler.schedule()
+            self.widget.run_due()
+        # キーを離す前から、最初の入力を含めて間隔ごとに描画される
+        self.assertEqual(self.renders[0], 100.0)
+        self.assertGreaterEqual(len(self.renders), 3)
+        for previous, current in zip(self.renders, self.renders[1:]):
+            self.assertGreaterEqual(current - previous, 0.05 - 1e-9)
+
+    def test_requests_while_pending_are_coalesced(self):
+        self.scheduler.schedule()
+        self.scheduler.schedule()
+        self.assertEqual(len(self.widget.jobs), 1)
+        self.widget.run_due()
+        self.assertEqual(len(self.renders), 1)
+        # 間隔内の要求は前回から interval_ms 後に予約する
+        self.now += 0.02
+        self.scheduler.schedule()
+        [(due, _)] = self.widget.jobs.values()
+        self.assertGreaterEqual(due, 100.05)
+
+    def test_flush_runs_pending_render(self):
+        self.scheduler.schedule()
+        self.scheduler.flush()
+        self.assertEqual(self.renders, [100.0])
+        self.assertEqual(self.widget.jobs, {})
+        self.scheduler.flush()
+        self.assertEqual(len(self.renders), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+"""
+テンプレート検索索引 (search_index.py) のテスト。
+
+使い方:
+    python -m pytest tests
+"""
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import search_index
+from search_index import SearchIndex
+
+PROMPTS = [
+    {'name': 'Code review checklist', 'template': "review the {{code}} carefully"},
+    {'name': 'Email draft', 'template': "write a polite email about {{topic}}"},
+    {'name': 'Meeting minutes', 'template': "summarize the meeting and list action items"},
+    {'name': 'Reviewer reply', 'template': "reply to the reviewer"},
+    {'name': '議事録の要約', 'template': "会議の要約を作成してください"},
+]
+
+
+class SearchIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.index = SearchIndex(PROMPTS)
+
+    def test_name_prefix_ranks_before_substring_and_body(self):
+        self.assertEqual(self.index.search('review'),
+                         ['Reviewer reply', 'Code review checklist'])
+        self.assertEqual(self.index.search('email'), ['Email draft'])
+        self.assertEqual(self.index.search('action'), ['Meeting minutes'])
+
+    def test_every_term_must_match(self):
+        self.assertEqual(self.index.search('email polite'), ['Email draft'])
+        self.assertEqual(self.index.search('email meeting'), [])
+        self.assertEqual(self.index.search('要約 会議'), ['議事録の要約'])
+
+    def test_typo_is_corrected(self):
+        self.assertEqual(self.index.search('reveiw'), ['Reviewer reply', 'Code review checklist'])
+        self.assertEqual(self.index.search('emial'), ['Email draft'])
+        self.assertEqual(self.index.search('meetnig minutes'), ['Meeting minutes'])
+        # 短い語は訂正しない
+        self.assertEqual(self.index.search('emal'), ['Email draft'])
+        self.assertEqual(self.index.search('eml'), [])
+
+    def test_removed_words_are_forgotten(self):
+        self.index.remove('Email draft')
+        self.assertEqual(self.index.search('email'), [])
+        self.assertEqual(self.index.search('draft'), [])
+        self.index.update('Meeting minutes', 'Weekly sync', "agenda for the week")
+        self.assertEqual(self.index.search('meeting'), [])
+        self.assertEqual(self.index.search('weekly'), ['Weekly sync'])
+
+    def test_needs_compaction_after_many_deletions(self):
+        original = search_index.COMPACT_MIN_DELETED
+        search_index.COMPACT_MIN_DELETED = 3
+        try:
+            # 削除済みのIDが生存しているIDの数 (5) 以上になったら作り直す
+            for number in range(5):
+                self.index.update('Email draft', 'Email draft', f"version {number}")
+                self.assertEqual(self.index.needs_compaction, number == 4)
+        finally:
+            search_index.COMPACT_MIN_DELETED = original
+
+
+if __name__ == '__main__':
+    unittest.main()
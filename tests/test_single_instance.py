@@ -0,0 +1,57 @@
+"""
+起動中のプロセスとの通信 (single_instance.py) のテスト。
+
+Unixドメインソケットを使用するため、Windows以外で実行します。
+
+使い方:
+    python -m pytest tests
+"""
+
+import os
+import sys
+import socket
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from single_instance import InstanceServer, notify_running_instance
+
+
+@unittest.skipIf(sys.platform == 'win32', "Unixドメインソケットを使用するため")
+class InstanceServerTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        # サーバーを閉じた後にディレクトリを削除するよう、最初に登録する
+        self.addCleanup(directory.cleanup)
+        self.address = os.path.join(directory.name, 'instance.sock')
+
+    def start_server(self):
+        server = InstanceServer(self.address)
+        self.addCleanup(server.close)
+        return server
+
+    def test_message_reaches_running_instance(self):
+        server = self.start_server()
+        self.assertTrue(notify_running_instance({'command': 'open', 'name': "要約"}, self.address))
+        self.assertEqual(server.get_messages(), [{'command': 'open', 'name': "要約"}])
+
+    def test_stale_socket_file_is_replaced(self):
+        # 異常終了したプロセスのソケットファイル (待ち受けているプロセスがいない)
+        stale = socket.socket(socket.AF_UNIX)
+        stale.bind(self.address)
+        stale.close()
+        self.assertFalse(notify_running_instance({'command': 'show'}, self.address))
+        self.start_server()
+        self.assertTrue(notify_running_instance({'command': 'show'}, self.address))
+
+    def test_live_socket_file_is_kept(self):
+        server = self.start_server()
+        with self.assertRaises(OSError):
+            InstanceServer(self.address)
+        self.assertTrue(notify_running_instance({'command': 'show'}, self.address))
+        self.assertEqual(server.get_messages(), [{'command': 'show'}])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,223 @@
+"""
+ストレージバックエンド (storage.py) の取り込みと保存形式の切り替えのテスト。
+
+使い方:
+    python -m pytest tests
+"""
+
+import os
+import sys
+import json
+import hashlib
+import sqlite3
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import PromptManager
+from persistence import get_writer
+from storage import JsonStorage, PackedStorage, SQLiteStorage
+
+
+class JsonJournalTest(unittest.TestCase):
+    def setUp(self):
+        self._directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self._directory.name, 'prompts.json')
+
+    def tearDown(self):
+        get_writer().flush()
+        self._directory.cleanup()
+
+    def write(self, path, data):
+        with open(path, 'wb') as f:
+            f.write(data)
+
+    def test_operations_are_replayed(self):
+        storage = JsonStorage(self.path)
+        storage.insert({'name': 'a', 'template': "1"}, [])
+        storage.insert({'name': 'b', 'template': "2"}, [])
+        storage.update('a', {'name': 'c', 'template': "改名後"}, [])
+        storage.update('b', {'name': 'b', 'template': "更新後"}, [])
+        storage.insert({'name': 'd', 'template': "削除する"}, [])
+        storage.delete('d', [])
+        self.assertEqual(JsonStorage(self.path).load(), [{'name': 'c', 'template': "改名後"},
+                                                         {'name': 'b', 'template': "更新後"}])
+
+    def test_compaction_writes_snapshot_and_removes_journals(self):
+        storage = JsonStorage(self.path, compact_bytes=1)
+        prompts = [{'name': 'a', 'template': "1"}]
+        storage.insert(prompts[0], prompts)
+        get_writer().flush(self.path)
+        with open(self.path, 'rb') as f:
+            self.assertEqual(json.loads(f.read()), prompts)
+        self.assertFalse(os.path.exists(storage.journal_path))
+        self.assertFalse(os.path.exists(storage.frozen_journal_path))
+        self.assertEqual(JsonStorage(self.path).load(), prompts)
+
+    def test_torn_last_line_is_ignored(self):
+        storage = JsonStorage(self.path)
+        storage.insert({'name': 'a', 'template': "1"}, [])
+        # 追記の途中で異常終了した行
+        with open(storage.journal_path, 'ab') as f:
+            f.write(b'{"op": "add", "name": "b", "temp')
+        storage = JsonStorage(self.path)
+        self.assertEqual(storage.load(), [{'name': 'a', 'template': "1"}])
+        # 次の追記は途切れた行と混ざらない
+        storage.insert({'name': 'c', 'template': "3"}, [])
+        self.assertEqual(JsonStorage(self.path).load(), [{'name': 'a', 'template': "1"},
+                                                         {'name': 'c', 'template': "3"}])
+
+    def test_frozen_journal_left_after_snapshot_is_not_applied_twice(self):
+        # スナップショットを置き換えた直後、凍結したジャーナルを削除する前に異常終了した状態
+        snapshot = json.dumps([{'name': 'a', 'template': "1"}]).encode('utf-8')
+        self.write(self.path, snapshot)
+        storage = JsonStorage(self.path)
+        checkpoint = {'op': 'checkpoint', 'sha1': hashlib.sha1(snapshot).hexdigest()}
+        self.write(storage.frozen_journal_path,
+                   b'{"op": "add", "name": "a", "template": "1"}\n' + json.dumps(checkpoint).encode('utf-8') + b'\n')
+        self.write(storage.journal_path, b'{"op": "add", "name": "b", "template": "2"}\n')
+        self.assertEqual(storage.load(), [{'name': 'a', 'template': "1"}, {'name': 'b', 'template': "2"}])
+        self.assertFalse(os.path.exists(storage.frozen_journal_path))
+
+    def test_frozen_journal_left_before_snapshot_is_applied(self):
+        # 新しいスナップショットに置き換える前に異常終了した状態 (チェックポイントと一致しない)
+        self.write(self.path, b'[]')
+        storage = JsonStorage(self.path)
+        checkpoint = {'op': 'checkpoint', 'sha1': hashlib.sha1(b'unwritten').hexdigest()}
+        self.write(storage.frozen_journal_path,
+                   b'{"op": "add", "name": "a", "template": "1"}\n' + json.dumps(checkpoint).encode('utf-8') + b'\n')
+        self.write(storage.journal_path, b'{"op": "update", "name": "a", "template": "2"}\n')
+        self.assertEqual(storage.load(), [{'name': 'a', 'template': "2"}])
+        # 次の畳み込みで凍結したジャーナルとスナップショットがまとまる
+        storage.rewrite(storage.load())
+        get_writer().flush(self.path)
+        self.assertFalse(os.path.exists(storage.frozen_journal_path))
+        self.assertEqual(JsonStorage(self.path).load(), [{'name': 'a', 'template': "2"}])
+
+
+class SQLiteImportTest(unittest.TestCase):
+    def setUp(self):
+        self._directory = tempfile.TemporaryDirectory()
+        self.appdata_path = self._directory.name
+        self.db_path = os.path.join(self.appdata_path, 'prompts.db')
+        self.json_path = os.path.join(self.appdata_path, 'prompts.json')
+
+    def tearDown(self):
+        self._directory.cleanup()
+
+    def write_json(self, text):
+        with open(self.json_path, 'w', encoding='utf-8') as f:
+            f.write(text)
+
+    def open(self):
+        storage = SQLiteStorage(self.db_path, import_path=self.json_path)
+        self.addCleanup(storage.connection.close)
+        return storage
+
+    def test_import_runs_once(self):
+        self.write_json('[{"name": "a", "template": "本文"}]')
+        self.assertEqual(self.open().load(), [{'name': 'a', 'template': "本文"}])
+        self.assertEqual(self.open().load(), [{'name': 'a', 'template': "本文"}])
+
+    def test_malformed_json_is_imported_after_it_is_fixed(self):
+        self.write_json('[{"name": "a", "template": "本文"')
+        storage = self.open()
+        self.assertIsInstance(storage.import_error, ValueError)
+        storage.insert({'name': 'new', 'template': "新規"}, [])
+        # 取り込みの完了は記録されていないため、修正後に開き直すと取り込む
+        self.write_json('[{"name": "a", "template": "本文"}]')
+        storage = self.open()
+        self.assertIsNone(storage.import_error)
+        self.assertEqual([p['name'] for p in storage.load()], ['new', 'a'])
+        self.assertEqual(len(self.open().load()), 2)
+
+    def test_database_from_before_meta_table_is_not_reimported(self):
+        self.write_json('[{"name": "a", "template": "本文"}]')
+        connection = sqlite3.connect(self.db_path)
+        connection.execute('CREATE TABLE prompts (id INTEGER PRIMARY KEY AUTOINCREMENT, '
+                           'name TEXT NOT NULL, template TEXT NOT NULL)')
+        connection.execute("INSERT INTO prompts (name, template) VALUES ('a', '編集後')")
+        connection.commit()
+        connection.close()
+        self.assertEqual(self.open().load(), [{'name': 'a', 'template': "編集後"}])
+
+
+class PackedStorageTest(unittest.TestCase):
+    def setUp(self):
+        self._directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self._directory.name, 'prompts.pack')
+
+    def tearDown(self):
+        self._directory.cleanup()
+
+    def open(self):
+        storage = PackedStorage(self.path)
+        self.addCleanup(storage.close)
+        return storage
+
+    def test_changes_are_appended_to_index(self):
+        storage = self.open()
+        storage.insert({'name': 'a', 'template': "本文"}, [])
+        storage.insert({'name': 'b', 'template': "別の本文"}, [])
+        size = os.path.getsize(storage.index_path)
+        storage.update('a', {'name': 'c', 'template': "改名後"}, [])
+        storage.update('b', {'name': 'b', 'template': "更新後"}, [])
+        storage.insert({'name': 'd', 'template': "削除する"}, [])
+        storage.delete('d', [])
+        # 保存のたびに索引全体を書き直さず、記録を追記する
+        self.assertGreater(os.path.getsize(storage.index_path), size)
+        self.assertEqual(self.open().load(), [{'name': 'c', 'template': "改名後"},
+                                              {'name': 'b', 'template': "更新後"}])
+
+    def test_malformed_json_is_imported_after_it_is_fixed(self):
+        json_path = os.path.join(self._directory.name, 'prompts.json')
+        with open(json_path, 'w', encoding='utf-8') as f:
+            f.write('[{"name": "a", "template": "本文"')
+        storage = PackedStorage(self.path, import_path=json_path)
+        self.addCleanup(storage.close)
+        self.assertIsInstance(storage.import_error, ValueError)
+        storage.insert({'name': 'new', 'template': "新規"}, [])
+        storage.close()
+        # 取り込みの完了は記録されていないため、修正後に開き直すと取り込む
+        with open(json_path, 'w', encoding='utf-8') as f:
+            f.write('[{"name": "a", "template": "本文"}, {"name": "new", "template": "重複"}]')
+        storage = PackedStorage(self.path, import_path=json_path)
+        self.addCleanup(storage.close)
+        self.assertIsNone(storage.import_error)
+        self.assertEqual(storage.load(), [{'name': 'new', 'template': "新規"}, {'name': 'a', 'template': "本文"},
+                                          {'name': 'new (2)', 'template': "重複"}])
+        self.assertEqual(PackedStorage(self.path, import_path=json_path).load_names(), ['new', 'a', 'new (2)'])
+
+    def test_partial_record_is_ignored(self):
+        storage = self.open()
+        storage.insert({'name': 'a', 'template': "本文"}, [])
+        size = os.path.getsize(storage.index_path)
+        storage.insert({'name': 'b', 'template': "書きかけ"}, [])
+        with open(storage.index_path, 'r+b') as f:
+            f.truncate(os.path.getsize(storage.index_path) - 1)
+        storage = self.open()
+        self.assertEqual(storage.load_names(), ['a'])
+        self.assertEqual(os.path.getsize(storage.index_path), size)
+        storage.insert({'name': 'c', 'template': "追加"}, [])
+        self.assertEqual(self.open().load_names(), ['a', 'c'])
+
+
+class BackendSwitchTest(unittest.TestCase):
+    def test_switching_back_to_json_shows_current_prompts(self):
+        with tempfile.TemporaryDirectory() as appdata_path:
+            manager = PromptManager('json', appdata_path=appdata_path, lazy_templates=False)
+            manager.save_prompt('a', "古い本文")
+            manager = PromptManager('sqlite', appdata_path=appdata_path, lazy_templates=False)
+            manager.update_prompt('a', "SQLite で編集した本文")
+            manager.save_prompt('b', "追加")
+            manager.copy_to_backend('json')
+            manager.storage.connection.close()
+
+            manager = PromptManager('json', appdata_path=appdata_path, lazy_templates=False)
+            self.assertEqual([p.to_dict() for p in manager.prompts],
+                             [{'name': 'a', 'template': "SQLite で編集した本文"}, {'name': 'b', 'template': "追加"}])
+
+
+if __name__ == '__main__':
+    unittest.main()
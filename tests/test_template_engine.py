@@ -0,0 +1,59 @@
+"""
+テンプレートのコンパイルと取り込み (template_engine.py) のテスト。
+
+使い方:
+    python -m pytest tests
+"""
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from template_engine import CompiledTemplate, TemplateComposer
+
+
+class TemplateComposerTest(unittest.TestCase):
+    def setUp(self):
+        self.sources = {
+            'name': "v",
+            'open': "前文 {{",
+            'close': "v}} 後文",
+            'greeting': "こんにちは {{name}} さん",
+        }
+        self.composer = TemplateComposer(self.sources.get)
+
+    def assert_same_as_expanded(self, source):
+        compiled = self.composer.compile(source)
+        expected = CompiledTemplate(self.composer.expand(source))
+        self.assertEqual(compiled.source, expected.source)
+        self.assertEqual(compiled.variables, expected.variables)
+        # リテラルの区切り方は異なってもよいが、描画結果は同じになる
+        values = {name: f"<{name}>" for name in expected.variables}
+        self.assertEqual(compiled.render(values), expected.render(values))
+        self.assertEqual(compiled.render({}), expected.render({}))
+        return compiled
+
+    def test_partials_are_expanded(self):
+        compiled = self.assert_same_as_expanded("{{> greeting}}\n{{body}}")
+        self.assertEqual(compiled.variables, ['name', 'body'])
+        self.assertEqual(compiled.render({'name': "山田", 'body': "本文"}), "こんにちは 山田 さん\n本文")
+
+    def test_variable_across_partial_boundary(self):
+        # 「{{」+ 取り込んだ「v」+「}}」は、展開後の文字列と同じく変数 v になる
+        compiled = self.assert_same_as_expanded("{{{{> name}}}}")
+        self.assertEqual(compiled.variables, ['v'])
+        self.assertEqual(compiled.render({'v': "値"}), "値")
+        compiled = self.assert_same_as_expanded("{{> open}}{{> close}}")
+        self.assertEqual(compiled.variables, ['v'])
+        self.assertEqual(compiled.render({'v': "値"}), "前文 値 後文")
+
+    def test_braces_next_to_boundary_without_variable(self):
+        for source in ("{{{{> greeting}}", "{{> open}}{{> greeting}}", "{{> open}} {{> close}}"):
+            with self.subTest(source=source):
+                self.assert_same_as_expanded(source)
+
+
+if __name__ == '__main__':
+    unittest.main()
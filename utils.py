@@ -2,6 +2,8 @@
 UIユーティリティ関数とスタイル設定を定義するモジュール。
 """
 
+import time
+import bisect
 import tkinter as tk
 from tkinter import ttk
 from constants import COLORS, FONTS
@@ -141,4 +143,105 @@ def add_text_context_menu(widget):
     def show_menu(event):
         menu.tk_popup(event.x_root, event.y_root)
         menu.grab_release()
-    widget.bind("<Button-3>", show_menu)
\ No newline at end of file
+    widget.bind("<Button-3>", show_menu)
+
+
+def sync_listbox_items(listbox, items):
+    """
+    Listboxの項目を、指定した項目のソート済み一覧と一致するように差分更新する。
+
+    全項目を削除して入れ直す代わりに、なくなった項目の削除と新しい項目の挿入だけを行います。
+
+    Args:
+        listbox (tk.Listbox): 更新するListbox。項目はソート済みであることを前提とします。
+        items (iterable): 表示する項目。
+    """
+    items = set(items)
+    current = listbox.get(0, tk.END)
+    # 後ろから削除してインデックスのずれを防ぐ
+    for index in range(len(current) - 1, -1, -1):
+        if current[index] not in items:
+            listbox.delete(index)
+    remaining = [item for item in current if item in items]
+    for item in sorted(items.difference(remaining)):
+        index = bisect.bisect_left(remaining, item)
+        remaining.insert(index, item)
+        listbox.insert(index, item)
+
+
+def track_text_edit(widget, tracker):
+    """
+    Textウィジェットの直前の編集を、カーソル周辺の行だけを読み直して VariableTracker に反映する。
+
+    キー入力や貼り付けはカーソル位置で行われるため、行数の増減とカーソル行から
+    変更された行の範囲を求め、前後1行を含めて再走査します。
+
+    Args:
+        widget (tk.Text): 編集されたTextウィジェット。
+        tracker (VariableTracker): 追跡中のトラッカー。
+    """
+    line_count = int(widget.index('end-1c').split('.')[0])
+    cursor = int(widget.index(tk.INSERT).split('.')[0])
+    delta = line_count - tracker.line_count
+    start = max(1, cursor - max(delta, 0) - 1)
+    new_end = min(line_count, cursor + 1)
+    old_end = new_end - delta
+    if old_end < start - 1 or old_end > tracker.line_count:
+        # 想定外の編集 (カーソル位置以外の変更など) は全体を読み直す
+        tracker.set_text(widget.get('1.0', 'end-1c'))
+        return
+    lines = widget.get(f'{start}.0', f'{new_end}.end').split('\n')
+    tracker.replace_lines(start - 1, old_end, lines)
+
+
+class RenderScheduler:
+    """
+    短時間に連続した更新要求を、interval_ms ミリ秒に1回までの処理にまとめるスケジューラ。
+
+    前回の処理から interval_ms ミリ秒以上経っていれば、要求を受けたイベントの処理が終わった時点
+    (after_idle) で直ちに実行し、経っていなければ前回から interval_ms ミリ秒後に実行を予約します。
+    予約がある間の要求はその予約にまとめます。要求のたびに予約し直すことはないため、
+    キーを押し続けている間もプレビューは interval_ms ミリ秒ごとに更新されます。
+    """
+    def __init__(self, widget, callback, interval_ms):
+        """
+        RenderSchedulerクラスのコンストラクタ。
+
+        Args:
+            widget (tk.Widget): after() を呼び出すウィジェット。
+            callback (callable): まとめて実行する処理。
+            interval_ms (int): 処理を実行する最小の間隔 (ミリ秒)。
+        """
+        self.widget = widget
+        self.callback = callback
+        self.interval_ms = max(0, int(interval_ms))
+        self._after_id = None
+        self._last_run = None  # 前回処理した時刻 (time.monotonic)
+
+    def schedule(self):
+        """処理の実行を予約する。既に予約がある場合は何もしない。"""
+        if self._after_id is not None:
+            return
+        elapsed_ms = (float('inf') if self._last_run is None
+                      else (time.monotonic() - self._last_run) * 1000)
+        if elapsed_ms >= self.interval_ms:
+            self._after_id = self.widget.after_idle(self._run)
+        else:
+            self._after_id = self.widget.after(int(self.interval_ms - elapsed_ms) + 1, self._run)
+
+    def cancel(self):
+        """予約済みの処理を取り消す。"""
+        if self._after_id is not None:
+            self.widget.after_cancel(self._after_id)
+            self._after_id = None
+
+    def flush(self):
+        """予約済みの処理があれば直ちに実行する。"""
+        if self._after_id is not None:
+            self.cancel()
+            self._run()
+
+    def _run(self):
+        self._after_id = None
+        self._last_run = time.monotonic()
+        self.callback()
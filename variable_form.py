@@ -0,0 +1,362 @@
+"""
+仮想化された変数入力フォームを定義するモジュール。
+
+VariableFormは表示されている行の分だけ入力欄 (ラベルとTextウィジェット) を作成し、
+スクロールに合わせて各行に割り当てる変数を差し替えます。変数が80個あっても
+作成する入力欄は画面に収まる数だけで、テンプレートを保存して変数の構成が変わっても
+既存の入力欄を使い回すため、ウィジェットの破棄と再作成は行いません。
+入力された値は変数名ごとに保持し、変数の構成が変わっても残った変数の値は失われません。
+「ファイル...」ボタンで変数をファイルに結び付けると、入力欄にはパスだけを表示し、
+ファイルの内容は Text ウィジェットを通さずに FileValue から読み出します。
+"""
+
+import os
+import tkinter as tk
+from tkinter import ttk, filedialog
+from constants import FONTS
+from file_values import FileValue
+from utils import add_text_context_menu
+
+# 各入力欄の行数
+ROW_TEXT_LINES = 3
+# 行の上下の余白 (ピクセル)
+ROW_PADDING = 4
+# フォームが要求する高さ (行数)。ウィンドウが大きい場合はそれ以上の行を表示する
+REQUESTED_ROWS = 4
+
+
+class _VariableRow:
+    """フォームの1行分の入力欄。表示する変数は bind で差し替える。"""
+    def __init__(self, form):
+        self.var = None
+        self.file_value = None
+        self.frame = ttk.Frame(form.rows_frame)
+        self.label = ttk.Label(self.frame, font=FONTS['input'], anchor='nw')
+        self.label.pack(side='left', anchor='n', padx=(0, 5), pady=2)
+        self.file_button = ttk.Button(self.frame, text="ファイル...", width=8, command=lambda: form._on_file_button(self))
+        self.file_button.pack(side='right', anchor='n', padx=(5, 0))
+
+        text_frame = ttk.Frame(self.frame)
+        text_frame.pack(side='left', fill='both', expand=True)
+        self.text = tk.Text(text_frame, width=1, height=ROW_TEXT_LINES, font=FONTS['input'], undo=True)
+        self.text.pack(side='left', fill='both', expand=True)
+        add_text_context_menu(self.text)
+        scrollbar = ttk.Scrollbar(text_frame, orient="vertical", command=self.text.yview)
+        scrollbar.pack(side='right', fill='y')
+        self.text.configure(yscrollcommand=scrollbar.set)
+
+        on_change = lambda event: form._on_row_changed(self)
+        self.text.bind('<KeyRelease>', on_change)
+        # Bind the custom event triggered after paste/cut actions.
+        self.text.bind('<<ContentChanged>>', on_change)
+        for widget in (self.frame, self.label):
+            widget.bind('<MouseWheel>', form._on_mousewheel)
+            widget.bind('<Button-4>', lambda e: form._scroll_units(-1))
+            widget.bind('<Button-5>', lambda e: form._scroll_units(1))
+        # 入力欄の上では、内容がすべて見えている場合だけフォームをスクロールする
+        self.text.bind('<MouseWheel>', lambda e: form._on_mousewheel(e) if self._fits() else None)
+        self.text.bind('<Button-4>', lambda e: form._scroll_units(-1) if self._fits() else None)
+        self.text.bind('<Button-5>', lambda e: form._scroll_units(1) if self._fits() else None)
+        # Ctrl+Tab で前後の変数へ移動する (表示範囲外ならスクロールする)
+        self.text.bind('<Control-Tab>', lambda e: form._focus_relative(self, 1))
+        self.text.bind('<Control-Shift-Tab>', lambda e: form._focus_relative(self, -1))
+
+    def bind(self, var, value, file_value=None):
+        """この行に表示する変数と値 (ファイルに結び付けた変数では FileValue) を設定する。"""
+        if file_value is not None:
+            value = f"ファイル: {file_value.path}\n{file_value.size():,} バイト"
+        if file_value is not self.file_value:
+            self.file_value = file_value
+            self.text.config(state='normal')
+            self.file_button.config(text="解除" if file_value is not None else "ファイル...")
+        if self.text.get("1.0", "end-1c") != value:
+            self.text.config(state='normal')
+            self.text.delete("1.0", tk.END)
+            self.text.insert("1.0", value)
+        if file_value is not None:
+            self.text.config(state='disabled')
+        if var != self.var:
+            self.var = var
+            self.label.config(text=f"{var}:")
+            # 別の変数の入力を元に戻せないように、差し替えたときは取り消し履歴を消す
+            self.text.edit_reset()
+
+    def value(self):
+        return self.text.get("1.0", "end-1c")
+
+    def _fits(self):
+        return self.text.yview() == (0.0, 1.0)
+
+
+class VariableForm(ttk.LabelFrame):
+    """
+    変数名ごとの入力欄を並べた仮想化フォーム。
+
+    変数の一覧と値はPythonのリストと辞書で保持し、Textウィジェットは表示範囲の行だけ作成します。
+    作成した行はプールとして保持し、スクロールや変数の構成の変更では行に割り当てる変数を差し替えます。
+    """
+    def __init__(self, parent, on_change=None, **kwargs):
+        """
+        VariableFormクラスのコンストラクタ。
+
+        Args:
+            parent (tk.Widget): 親ウィジェット。
+            on_change (callable, optional): 入力が変更されたときに変数名を引数に呼び出す関数。
+        """
+        super().__init__(parent, text="変数入力", **kwargs)
+        self.on_change = on_change
+        self.variables = []
+        self._values = {}  # 変数名 → 入力された値 (表示中の行の値は Text が正で、読み出したときに反映する)
+        self._files = {}  # 変数名 → FileValue (ファイルに結び付けた変数)
+        self.top = 0  # 表示範囲の先頭の変数のインデックス
+        self.visible_count = REQUESTED_ROWS
+        self._rows = []  # 作成済みの行 (プール)
+        self._row_height = None
+
+        # 行の数ではなくフォームの大きさから表示する行数を決めるため、大きさの伝播を止める
+        self.rows_frame = ttk.Frame(self)
+        self.rows_frame.pack_propagate(False)
+        self.rows_frame.pack(side='left', fill='both', expand=True, padx=5)
+        self.scrollbar = ttk.Scrollbar(self, orient='vertical', command=self._on_scrollbar)
+        self.rows_frame.bind('<Configure>', self._on_configure)
+        self.rows_frame.bind('<MouseWheel>', self._on_mousewheel)
+
+    # データ操作
+
+    def set_variables(self, variables):
+        """
+        表示する変数の一覧を設定する。
+
+        残った変数の入力済みの値はそのまま保持し、新しい変数は空欄にします。
+        行のウィジェットは作り直さずに割り当てを差し替えます。
+
+        Args:
+            variables (iterable): 変数名の列 (出現順)。
+        """
+        self._store_visible_values()
+        self.variables = list(variables)
+        self._values = {var: self._values.get(var, '') for var in self.variables}
+        self._files = {var: value for var, value in self._files.items() if var in self._values}
+        self.top = max(0, min(self.top, len(self.variables) - self.visible_count))
+        self._render()
+
+    def __contains__(self, var):
+        return var in self._values
+
+    def get(self, var):
+        """
+        変数の入力値を取得する。
+
+        ファイルに結び付けた変数では、結び付ける前に入力欄に入力されていた値を返します。
+
+        Args:
+            var (str): 変数名。
+
+        Returns:
+            str: 入力値。変数がない場合は空文字列。
+        """
+        row = self._row_for(var)
+        if row is not None and row.file_value is None:
+            # 入力欄の内容は変更時には読み出さず、値が必要になったここで読み出して保持する
+            self._values[var] = row.value()
+        return self._values.get(var, '')
+
+    def file_value(self, var):
+        """
+        変数に結び付けたファイルを取得する。
+
+        Args:
+            var (str): 変数名。
+
+        Returns:
+            FileValue: 結び付けたファイル。結び付けていない場合は None。
+        """
+        return self._files.get(var)
+
+    def files(self):
+        """
+        ファイルに結び付けた全ての変数を取得する。
+
+        Returns:
+            dict: 変数名 → FileValue の辞書。
+        """
+        return dict(self._files)
+
+    def bind_file(self, var, path):
+        """
+        変数をファイルに結び付ける。
+
+        入力欄に入力済みの値は保持し、結び付けを解除すると元に戻ります。
+
+        Args:
+            var (str): 変数名。
+            path (str): 値とするファイルのパス。
+        """
+        if var not in self._values:
+            return
+        self._store_visible_values()
+        self._files[var] = FileValue(path)
+        self._render()
+        self._notify(var)
+
+    def unbind_file(self, var):
+        """
+        変数とファイルの結び付けを解除する。
+
+        Args:
+            var (str): 変数名。
+        """
+        if self._files.pop(var, None) is not None:
+            self._store_visible_values()
+            self._render()
+            self._notify(var)
+
+    def values(self):
+        """
+        全ての変数の入力値を取得する。
+
+        Returns:
+            dict: 変数名 → 入力値の辞書 (変数の出現順)。
+        """
+        self._store_visible_values()
+        return dict(self._values)
+
+    def focus_first(self):
+        """先頭の変数の入力欄にフォーカスを移動し、内容を選択する。"""
+        if not self.variables:
+            return
+        self._scroll_to(0)
+        row = self._row_for(self.variables[0])
+        if row is not None:
+            row.text.focus_set()
+            row.text.tag_add('sel', '1.0', tk.END)
+
+    # 描画
+
+    def _row_for(self, var):
+        """変数が表示されている行を返す。表示されていない場合は None。"""
+        for row in self._rows[:self._shown_count()]:
+            if row.var == var:
+                return row
+        return None
+
+    def _shown_count(self):
+        return max(0, min(self.visible_count, len(self.variables) - self.top))
+
+    def _store_visible_values(self):
+        """表示中の行の入力値を保持している値に反映する。"""
+        for row in self._rows[:self._shown_count()]:
+            if row.var in self._values and row.file_value is None:
+                self._values[row.var] = row.value()
+
+    def _render(self):
+        """表示範囲の変数を行に割り当てる。足りない行だけを作成する。"""
+        count = self._shown_count()
+        while len(self._rows) < count:
+            row = _VariableRow(self)
+            if self._row_height is None:
+                # Text の要求サイズはフォントと行数から作成時に決まるため、描画前でも行の高さが分かる
+                self._row_height = row.text.winfo_reqheight() + ROW_PADDING * 2
+            self._rows.append(row)
+        if self._row_height is not None:
+            requested = min(len(self.variables), REQUESTED_ROWS)
+            self.rows_frame.configure(height=max(1, requested) * self._row_height)
+        for i, row in enumerate(self._rows):
+            if i < count:
+                var = self.variables[self.top + i]
+                row.bind(var, self._values[var], self._files.get(var))
+                if not row.frame.winfo_manager():
+                    row.frame.pack(fill='x', padx=0, pady=ROW_PADDING)
+            elif row.frame.winfo_manager():
+                row.frame.pack_forget()
+                row.var = None
+        self._update_scrollbar()
+
+    def _update_scrollbar(self):
+        """スクロールバーの位置を更新し、全ての変数が表示されている場合は隠す。"""
+        total = len(self.variables)
+        if total <= self.visible_count:
+            self.scrollbar.pack_forget()
+            return
+        if not self.scrollbar.winfo_manager():
+            self.scrollbar.pack(side='right', fill='y', before=self.rows_frame)
+        self.scrollbar.set(self.top / total, min(1.0, (self.top + self.visible_count) / total))
+
+    def _scroll_to(self, top):
+        """先頭の変数のインデックスを変更して再描画する。"""
+        top = max(0, min(top, len(self.variables) - self.visible_count))
+        if top != self.top:
+            self._store_visible_values()
+            self.top = top
+            self._render()
+
+    def _scroll_units(self, units):
+        self._scroll_to(self.top + units)
+        return 'break'
+
+    # イベントハンドラ
+
+    def _on_configure(self, event):
+        """フォームの高さから表示する行数を計算する。"""
+        if self._row_height is None:
+            return
+        visible_count = max(1, event.height // self._row_height)
+        if visible_count != self.visible_count:
+            self._store_visible_values()
+            self.visible_count = visible_count
+            self.top = max(0, min(self.top, len(self.variables) - self.visible_count))
+            self._render()
+
+    def _on_scrollbar(self, *args):
+        """スクロールバーの操作を処理する。"""
+        if args[0] == 'moveto':
+            self._scroll_to(int(float(args[1]) * len(self.variables)))
+        elif args[0] == 'scroll':
+            amount = int(args[1])
+            if args[2] == 'pages':
+                amount *= self.visible_count
+            self._scroll_to(self.top + amount)
+
+    def _on_mousewheel(self, event):
+        return self._scroll_units(-(event.delta // 120))
+
+    def _on_row_changed(self, row):
+        """
+        入力の変更を on_change に通知する。
+
+        キー入力のたびに入力欄全体を読み出さないよう、内容は get() や
+        _store_visible_values() で値が必要になったときに読み出します。
+        """
+        if row.var is None or row.file_value is not None:
+            return
+        self._notify(row.var)
+
+    def _notify(self, var):
+        if self.on_change is not None:
+            self.on_change(var)
+
+    def _on_file_button(self, row):
+        """ファイルの結び付けまたは解除を行う。"""
+        if row.var is None:
+            return
+        if row.file_value is not None:
+            self.unbind_file(row.var)
+            return
+        path = filedialog.askopenfilename(parent=self, title=f"{row.var} の値とするファイルを選択")
+        if path:
+            self.bind_file(row.var, os.path.normpath(path))
+
+    def _focus_relative(self, row, step):
+        """前後の変数の入力欄にフォーカスを移動する。"""
+        if row.var is None:
+            return 'break'
+        index = self.variables.index(row.var) + step
+        if 0 <= index < len(self.variables):
+            if index < self.top:
+                self._scroll_to(index)
+            elif index >= self.top + self.visible_count:
+                self._scroll_to(index - self.visible_count + 1)
+            target = self._row_for(self.variables[index])
+            if target is not None:
+                target.text.focus_set()
+        return 'break'
@@ -7,11 +7,27 @@ PromptCreationWindowクラスはプロンプト作成/編集ウィンドウを
 
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
-import re
-from models import PromptManager, SettingsManager
-from constants import COLORS, FONTS, WINDOW_SIZES, DEFAULT_SETTINGS, VERSION
-from utils import setup_styles, calculate_window_position, add_text_context_menu
+from models import PromptManager, SettingsManager, DuplicatePromptError
+from constants import (COLORS, FONTS, WINDOW_SIZES, DEFAULT_SETTINGS, VERSION, SEARCH_DELAY_MS, SEARCH_RESULT_LIMIT,
+                       PROMPT_LOAD_CHUNK, PROMPT_LOAD_POLL_MS, INSTANCE_POLL_MS, FILE_CHANGE_POLL_MS,
+                       EXPORT_POLL_MS)
+from utils import (setup_styles, calculate_window_position, add_text_context_menu, RenderScheduler,
+                   sync_listbox_items, track_text_edit)
+from template_engine import extract_variables, VariableTracker, render_cache
+from virtual_list import VirtualListView
+from search_index import SearchIndex
+from file_watcher import DirectoryWatcher
+from variable_form import VariableForm
+from export import (ExportJob, EXPORT_SUBDIRECTORY, SYNC_EXPORT_CHARS, estimate_length, export_path, export_to_file,
+                    prepare_clipboard_text)
+import profiling
+import persistence
 import os
+import queue
+import sqlite3
+import difflib
+import threading
+from datetime import datetime
 
 class PromptCreationWindow:
     """
@@ -19,7 +35,9 @@ class PromptCreationWindow:
 
     既存のプロンプトを編集したり、新しいプロンプトを作成したりするために使用されます。
     """
-    def __init__(self, parent, prompt_data, initial_tab='prompt', always_on_top=True):
+    def __init__(self, parent, prompt_data, initial_tab='prompt', always_on_top=True,
+                 preview_debounce_ms=DEFAULT_SETTINGS['preview_debounce_ms'], prompt_manager=None,
+                 export_directory=None):
         """
         PromptCreationWindowクラスのコンストラクタ。
 
@@ -30,8 +48,13 @@ class PromptCreationWindow:
             prompt_data (dict): 編集するプロンプトのデータ（新規作成の場合は空の辞書）。
             initial_tab (str): 初期に選択するタブの名前。'prompt' または 'template'。
             always_on_top (bool): ウィンドウを常に最前面に表示するかどうか。
+            preview_debounce_ms (int): 変数入力からプレビューを更新する最小の間隔 (ミリ秒)。
+            prompt_manager (PromptManager, optional): 保存と変更通知に使う、アプリケーションで共有の PromptManager。
+                省略した場合はこのウィンドウ用に作成します。
+            export_directory (str, optional): 「保存ディレクトリへ書き出し」で使うディレクトリ (設定の 'save_directory')。
         """
         self.window = tk.Toplevel(parent)
+        self.prompt_manager = prompt_manager if prompt_manager is not None else PromptManager()
         self.window.title(prompt_data.get('name', 'プロンプト作成'))
         self.window.attributes('-topmost', always_on_top)
 
@@ -43,9 +66,30 @@ class PromptCreationWindow:
         x, y = calculate_window_position(parent, *WINDOW_SIZES['prompt_creation'])
         self.window.geometry(f"{WINDOW_SIZES['prompt_creation'][0]}x{WINDOW_SIZES['prompt_creation'][1]}+{x}+{y}")
 
-        self.prompt_data = prompt_data
-        self.original_template = prompt_data['template']  # 編集をキャンセルするために元のテンプレートを保存
-        self.original_name = prompt_data['name'] # 編集をキャンセルするために元のテンプレート名を保存
+        # PromptManager の Prompt は他のウィンドウと共有しているため、このウィンドウ用に複製して保持する。
+        # 共有のプロンプトは PromptManager.update_prompt を通してだけ変更し、他のウィンドウや他のPCでの変更は
+        # _on_prompts_changed で複製と比較して反映する
+        self.prompt_data = {'name': prompt_data.get('name', ''), 'template': prompt_data.get('template', '')}
+        self.export_directory = export_directory
+        # 実行中の書き出し (ExportJob) と、その進捗を確認する after の ID
+        self._export_job = None
+        self._export_after_id = None
+        self.original_template = self.prompt_data['template']  # 編集をキャンセルするために元のテンプレートを保存
+        self.original_name = self.prompt_data['name'] # 編集をキャンセルするために元のテンプレート名を保存
+
+        # 変数の値のキャッシュと、前回のプレビュー更新以降に変更された変数
+        self.variable_values = {}
+        self._dirty_variables = set()
+        # プレビュー内のセグメントの情報 (_show_preview で更新)
+        self._preview_compiled = None
+        self._preview_segment_count = 0
+        self._preview_empty = []
+        self._preview_var_segments = {}
+        # 連続した入力によるプレビュー更新を1回にまとめる
+        self.preview_scheduler = RenderScheduler(self.window, self._flush_preview, preview_debounce_ms)
+        self.window.bind('<Destroy>', self._on_destroy)
+        # 他のウィンドウや他のPCでの変更をこのウィンドウにも反映する
+        self.prompt_manager.add_listener(self._on_prompts_changed)
 
         # スタイルの設定
         self.style = ttk.Style()
@@ -76,28 +120,39 @@ class PromptCreationWindow:
         prompt_frame = ttk.Frame(self.prompt_tab)
         prompt_frame.pack(fill='both', expand=True, padx=10, pady=10)
 
-        # 変数入力エリアのセットアップ
-        self._setup_variable_input_area(prompt_frame)
+        # 変数入力エリア (表示範囲の入力欄だけを作成し、変数の構成が変わっても使い回す)
+        self.variable_form = VariableForm(prompt_frame, on_change=self._on_variable_changed)
 
         # プレビューエリア
-        preview_frame = ttk.LabelFrame(prompt_frame, text="生成されたプロンプト")
-        preview_frame.pack(fill='both', expand=True, padx=10, pady=5)
+        self.preview_frame = ttk.LabelFrame(prompt_frame, text="生成されたプロンプト")
+        self.preview_frame.pack(fill='both', expand=True, padx=10, pady=5)
+        self._update_variables_prompt_creation_tab()
 
-        self.preview_text = tk.Text(preview_frame, height=5, width=50, font=FONTS['input'])
+        self.preview_text = tk.Text(self.preview_frame, height=5, width=50, font=FONTS['input'])
         self.preview_text.pack(padx=5, pady=5, fill='both', expand=True)
         add_text_context_menu(self.preview_text)
 
         # コピーボタンをインスタンス変数として保存
-        self.copy_button = ttk.Button(prompt_frame, text="コピー", command=self.copy_to_clipboard)
-        self.copy_button.pack(pady=10)
+        button_frame = ttk.Frame(prompt_frame)
+        button_frame.pack(pady=(10, 0))
+        self.copy_button = ttk.Button(button_frame, text="コピー", command=self.copy_to_clipboard)
+        self.copy_button.pack(side='left', padx=5)
+        # プロンプトを文字列に連結せずに、少しずつファイルへ書き出す
+        ttk.Button(button_frame, text="ファイルに保存", command=self.save_to_file).pack(side='left', padx=5)
+        export_button = ttk.Button(button_frame, text="保存ディレクトリへ書き出し",
+                                   command=self.export_to_save_directory)
+        export_button.pack(side='left', padx=5)
+        if not self.export_directory:
+            export_button.state(['disabled'])
+        # 書き出しの進捗と結果
+        self.export_status = ttk.Label(prompt_frame, text="")
+        self.export_status.pack(pady=(2, 5))
 
         # 初期プレビューを生成
         self.update_preview(None)
 
         # 最初の変数入力欄にフォーカスを移動
-        if self.first_entry:
-            self.first_entry.focus_set()
-            self.first_entry.tag_add('sel', '1.0', tk.END)
+        self.variable_form.focus_first()
 
     def _setup_template_change_tab(self):
         """
@@ -123,6 +178,7 @@ class PromptCreationWindow:
         self.template_text.pack(padx=10, pady=5, fill='both', expand=True)
         add_text_context_menu(self.template_text)
         self.template_text.insert("1.0", self.prompt_data['template'])  # 既存のテンプレートを挿入
+        self.template_tracker = VariableTracker(self.prompt_data['template'])
         self.template_text.bind('<KeyRelease>', self._on_template_change_change_tab)
         # Bind the custom event so that right-click menu cut/paste operations update variables immediately.
         self.template_text.bind("<<ContentChanged>>", self._on_template_change_change_tab)
@@ -163,131 +219,355 @@ class PromptCreationWindow:
         ttk.Button(button_frame, text="破棄",
                   command=self._discard_current_template_input_change_tab, # メソッド名を変更
                   style='TButton').pack(side='left', padx=5)
+        ttk.Button(button_frame, text="履歴",
+                  command=self._show_history_change_tab,
+                  style='TButton').pack(side='left', padx=5)
 
 
-    def _setup_variable_input_area(self, parent_frame):
-        """変数入力エリアをセットアップする。"""
-        variables = list(dict.fromkeys(re.findall(r'\{\{(\w+)\}\}', self.prompt_data['template'])))
+    def _update_variables_prompt_creation_tab(self):
+        """
+        テンプレート内の変数の変更に基づいてプロンプト作成タブの変数入力エリアを更新する。
+
+        入力欄は作り直さずに変数の割り当てだけを差し替え、残った変数の入力済みの値は保持します。
+        変数がない場合は変数入力エリアを隠します。
+        """
+        variables = self._compiled_template().variables
+        self.variable_form.set_variables(variables)
         if variables:
-            self.vars_frame = ttk.LabelFrame(parent_frame, text="変数入力")
-            self.vars_frame.pack(fill='both', expand=True, padx=10, pady=5)
+            if not self.variable_form.winfo_manager():
+                self.variable_form.pack(fill='both', expand=True, padx=10, pady=5, before=self.preview_frame)
+        elif self.variable_form.winfo_manager():
+            self.variable_form.pack_forget()
 
-            self.var_entries = {}
-            self.first_entry = None
 
-            for var in variables:
-                self._create_variable_input_row(var)
-        else:
-            # 変数が存在しない場合は入力欄を生成せず、空の dict を初期化する
-            self.var_entries = {}
-            self.first_entry = None
-
-    def _create_variable_input_row(self, var):
-        """変数入力行を作成するヘルパー関数。"""
-        var_frame = ttk.Frame(self.vars_frame)
-        var_frame.pack(fill='both', expand=True, padx=5, pady=4)
-        # ラベルを左側に配置
-        label_frame = ttk.Frame(var_frame)
-        label_frame.pack(side='left', fill='y', padx=(0, 5))
-        ttk.Label(label_frame, text=f"{var}:", font=FONTS['input']).pack(side='left', anchor='n', pady=2)
-
-        # テキストウィジェットとスクロールバーを含むフレーム
-        text_frame = ttk.Frame(var_frame)
-        text_frame.pack(side='left', fill='both', expand=True)
-
-        text = tk.Text(text_frame, width=1, height=3, font=FONTS['input'])
-        text.pack(side='left', fill='both', expand=True)
-        add_text_context_menu(text)
-
-        scrollbar = ttk.Scrollbar(text_frame, orient="vertical", command=text.yview)
-        scrollbar.pack(side='right', fill='y')
-        text.configure(yscrollcommand=scrollbar.set)
-
-        self.var_entries[var] = text
-        if self.first_entry is None:
-            self.first_entry = text
-        text.bind('<KeyRelease>', self.update_preview)
-        # Bind the custom event triggered after paste/cut actions.
-        text.bind('<<ContentChanged>>', self.update_preview)
+    def update_preview(self, event):
+        """
+        変数入力に基づいてプレビューテキストを更新する。
 
+        全ての変数エントリから値を読み直し、プレビューテキストを更新します。
+        テンプレートの保存や破棄など、変数の構成が変わったときに使用します。
+        """
+        self.preview_scheduler.cancel()
+        self._dirty_variables.clear()
+        self.variable_values = {var: self._variable_value(var) for var in self.variable_form.variables}
+        self._show_preview()
 
-    def _update_variables_prompt_creation_tab(self):
+    def _on_variable_changed(self, var):
         """
-        テンプレート内の変数の変更に基づいてプロンプト作成タブの変数入力エリアを更新する。
+        変数入力の変更を記録し、プレビューの更新を予約する。
+
+        Args:
+            var (str): 変更された変数名。
         """
-        if not hasattr(self, 'vars_frame') or not self.vars_frame.winfo_exists():
-            # vars_frame が存在しない場合は作成
-            self._setup_variable_input_area(self.prompt_tab)
-        else:
-            # vars_frame が存在する場合は、中身を更新
-            for child in self.vars_frame.winfo_children():
-                child.destroy()
-            variables = list(dict.fromkeys(re.findall(r'\{\{(\w+)\}\}', self.prompt_data['template'])))
-            if variables:
-                for var in variables:
-                    self._create_variable_input_row(var)
-            else:
-                self.var_entries = {}
-                self.first_entry = None
+        self._dirty_variables.add(var)
+        self.preview_scheduler.schedule()
 
+    def _variable_value(self, var):
+        """
+        プレビューに表示する変数の値を取得する。
 
-    def update_preview(self, event):
+        ファイルに結び付けた変数では、ファイルの先頭と末尾の抜粋を返します。
+
+        Args:
+            var (str): 変数名。
+
+        Returns:
+            str: 変数の値。
         """
-        変数入力に基づいてプレビューテキストを更新する。
+        file_value = self.variable_form.file_value(var)
+        if file_value is not None:
+            return file_value.excerpt()
+        return self.variable_form.get(var).strip()
+
+    def _output_values(self):
+        """
+        コピーや保存に使う変数の値を取得する。
+
+        Returns:
+            dict: 変数名 → 値の辞書。ファイルに結び付けた変数の値は FileValue。
+        """
+        values = dict(self.variable_values)
+        values.update(self.variable_form.files())
+        return values
+
+    def _flush_preview(self):
+        """
+        前回の更新以降に変更された変数だけを読み直してプレビューを更新する。
 
-        テンプレートと変数エントリから値を取得し、プレビューテキストを更新します。
+        プレビューは変数ごとの範囲だけを書き換えます。テンプレートが変わった場合や、
+        ユーザーがプレビューを直接編集した場合は全体を描き直します。
+        """
+        dirty = [var for var in self._dirty_variables if var in self.variable_form]
+        self._dirty_variables.clear()
+        full_render = (self.preview_text.edit_modified()
+                       or self._preview_compiled is not self._compiled_template())
+        for var in dirty:
+            value = self._variable_value(var)
+            if value != self.variable_values.get(var):
+                self.variable_values[var] = value
+                if not full_render:
+                    self._patch_preview(var, value)
+        if full_render:
+            self._show_preview()
+        self.preview_text.edit_modified(False)
+
+    def _show_preview(self):
+        """
+        生成したプロンプトをプレビューテキストに表示する。
+
+        テンプレートのセグメント (リテラルと変数スロット) ごとに挿入し、各セグメントの先頭に
+        マーク seg{n} を置きます。以降の変数の変更は _patch_preview でその範囲だけを書き換えます。
+        スクロール位置は描き直しの前後で保持します。
+        """
+        text = self.preview_text
+        compiled = self._compiled_template()
+        top = text.yview()[0]
+
+        text.delete("1.0", tk.END)
+        if self._preview_segment_count:
+            text.mark_unset(*(f'seg{index}' for index in range(self._preview_segment_count)))
+
+        parts = compiled.parts[:]
+        self._preview_var_segments = {}
+        for index, name in compiled.slots:
+            value = self.variable_values.get(name)
+            if value is not None:
+                parts[index] = value
+                self._preview_var_segments.setdefault(name, []).append(index)
+        for index, part in enumerate(parts):
+            mark = f'seg{index}'
+            text.mark_set(mark, 'end-1c')
+            text.mark_gravity(mark, 'left')
+            text.insert('end-1c', part)
+
+        self._preview_empty = [not part for part in parts]
+        self._preview_segment_count = len(parts)
+        self._preview_compiled = compiled
+        text.yview_moveto(top)
+        text.edit_modified(False)
+
+    def _patch_preview(self, var, value):
         """
-        template = self.prompt_data['template']
-        variables = {var: entry.get("1.0", tk.END).strip() for var, entry in self.var_entries.items()}
+        プレビュー内の指定した変数の範囲だけを新しい値に書き換える。
 
-        # format_mapに渡す辞書を作成 (変数名をキー、空文字列を値とする)
-        # format_dict = {var: variables.get(var, '') for var in re.findall(r'\{\{(\w+)\}\}', template)}
-        # result = template.format_map(format_dict) # format_mapを使用
+        Args:
+            var (str): 変更された変数名。
+            value (str): 新しい値。
+        """
+        text = self.preview_text
+        count = self._preview_segment_count
+        for index in self._preview_var_segments.get(var, ()):
+            start = f'seg{index}'
+            end = f'seg{index + 1}' if index + 1 < count else 'end-1c'
+            text.delete(start, end)
+            text.mark_set('patch_end', start)
+            text.mark_gravity('patch_end', 'right')
+            text.insert(start, value)
+            # 挿入位置に重なっていた後続のセグメントの先頭を、挿入したテキストの後ろへ移す
+            following = index + 1
+            while following < count:
+                text.mark_set(f'seg{following}', 'patch_end')
+                if not self._preview_empty[following]:
+                    break
+                following += 1
+            self._preview_empty[index] = not value
+        text.mark_unset('patch_end')
+
+    def _render_prompt(self):
+        """
+        キャッシュ済みの変数の値からプロンプトを生成する。
 
-        # format_map を使う代わりに、replace で置換処理を行う
-        result = template
-        for var, value in variables.items():
-          result = result.replace(f"{{{{{var}}}}}", value)
+        テンプレートはコンパイル済みのものを再利用し、同じテンプレートと値の組み合わせは
+        描画結果のキャッシュ (render_cache) から返します。
 
+        Returns:
+            str: 生成されたプロンプト。
+        """
+        return render_cache.render(self._compiled_template(), self.variable_values, template_id=self.original_name)
 
-        self.preview_text.delete("1.0", tk.END)
-        self.preview_text.insert("1.0", result)
+    def _compiled_template(self):
+        """
+        プレビューと生成に使うコンパイル済みテンプレートを取得する。
+
+        {{> テンプレート名}} は展開済みで、取り込んだテンプレートの変数も含みます。
+
+        Returns:
+            CompiledTemplate: コンパイル済みテンプレート。
+        """
+        return self.prompt_manager.composer.compile(self.prompt_data['template'])
+
+    def _on_destroy(self, event):
+        """ウィンドウが閉じられたときに予約済みのプレビュー更新を取り消し、変更通知の受け取りをやめる。"""
+        if event.widget is self.window:
+            self.preview_scheduler.cancel()
+            if self._export_after_id is not None:
+                self.window.after_cancel(self._export_after_id)
+                self._export_after_id = None
+            self.prompt_manager.remove_listener(self._on_prompts_changed)
+
+    def _on_prompts_changed(self, event, name, prompt):
+        """
+        共有の PromptManager からの変更通知をこのウィンドウに反映する。
+
+        このテンプレートが他のウィンドウや他のPCで更新・改名された場合は内容を差し替えます
+        (テンプレート編集タブに未保存の変更がある場合は、編集中のテキストはそのまま残します)。
+        取り込んでいるテンプレートが変更された場合は、変数入力とプレビューを更新します。
+
+        Args:
+            event (str): 'insert'、'update'、'remove' のいずれか。
+            name (str): 変更前のプロンプト名。
+            prompt (dict): 対象のプロンプト。
+        """
+        if name == self.original_name:
+            if event == 'remove':
+                self.window.title(f"{self.original_name} (削除済み)")
+                return
+            self.original_name = self.prompt_data['name'] = prompt['name']
+            self.window.title(prompt['name'])
+            template = prompt['template']
+            if template != self.prompt_data['template']:
+                if self.template_text.get("1.0", tk.END).strip() == self.original_template:
+                    self.template_text.delete("1.0", tk.END)
+                    self.template_text.insert("1.0", template)
+                    self.template_tracker.set_text(template)
+                    self._update_variables_listbox()
+                self.prompt_data['template'] = self.original_template = template
+        self._refresh_template_view()
+
+    def _refresh_template_view(self):
+        """
+        テンプレート (または取り込んでいるテンプレート) が変わっていれば、変数入力とプレビューを更新する。
+
+        変数の構成が変わった場合は入力欄の割り当てを差し替えます。残った変数の入力済みの値は保持されます。
+        """
+        compiled = self._compiled_template()
+        if compiled is self._preview_compiled:
+            return
+        if list(compiled.variables) != self.variable_form.variables:
+            self._update_variables_prompt_creation_tab()
+        self.update_preview(None)
 
 
     def copy_to_clipboard(self):
         """
-        プレビューテキストをクリップボードにコピーする。
+        生成されたプロンプトをクリップボードにコピーする。
 
-        プレビューテキストを取得し、クリップボードにコピーした後、
+        プレビューと同じ描画処理でプロンプトを生成し、クリップボードにコピーした後、
         コピーボタンのテキストを一時的に「コピーしました」に変更して、
         5秒後に元の「コピー」に戻します。
+        ファイルに結び付けた変数には、抜粋ではなくファイルの内容全体を埋め込みます。
+        プロンプトが大きい場合は、コピーする文字列をバックグラウンドで作成します。
+        ユーザーがプレビューを直接編集した場合は、プレビューに表示されている内容をそのままコピーします
+        (ファイルに結び付けた変数がある場合は、編集を破棄してファイルの内容全体でコピーするかを確認します)。
         """
-        preview_text = self.preview_text.get("1.0", tk.END).strip()
+        self.preview_scheduler.flush()  # 未反映の入力を反映してから生成する
+        if self._export_job is not None:
+            return
+        if self.preview_text.edit_modified():
+            if not self.variable_form.files():
+                self._finish_copy(self.preview_text.get("1.0", "end-1c").strip())
+                return
+            if not messagebox.askyesno(
+                    "確認", "プレビューは編集されていますが、ファイルに結び付けた変数は抜粋だけが表示されています。\n"
+                            "プレビューの編集を破棄して、ファイルの内容全体でコピーしますか？", parent=self.window):
+                return
+            self.update_preview(None)
+        compiled = self._compiled_template()
+        values = self._output_values()
+        if self.variable_form.files() or estimate_length(compiled, values) > SYNC_EXPORT_CHARS:
+            self._start_export("コピーの準備中", self._finish_copy, prepare_clipboard_text, compiled, values)
+        else:
+            self._finish_copy(self._render_prompt().strip())
+
+    def _finish_copy(self, preview_text):
+        """作成したプロンプトをクリップボードに渡す (Tk のメインスレッドで呼び出す)。"""
         if preview_text:
             self.window.clipboard_clear()
             self.window.clipboard_append(preview_text)
             self.copy_button.config(text="コピーしました")
             self.window.after(5000, lambda: self.copy_button.config(text="コピー"))
 
+    def save_to_file(self):
+        """
+        生成したプロンプトを、ダイアログで指定したファイルに保存する。
+
+        書き出しはバックグラウンドで行います。ファイルに結び付けた変数の内容も、
+        プロンプト全体を文字列に連結せずに少しずつ読み出して書き出します。
+        """
+        self.preview_scheduler.flush()  # 未反映の入力を反映してから生成する
+        if self._export_job is not None:
+            return
+        initial_dir = os.path.join(self.export_directory, EXPORT_SUBDIRECTORY) if self.export_directory else None
+        path = filedialog.asksaveasfilename(parent=self.window, defaultextension='.txt',
+                                            initialdir=initial_dir if initial_dir and os.path.isdir(initial_dir) else None,
+                                            filetypes=[("テキストファイル", "*.txt"), ("すべてのファイル", "*.*")])
+        if path:
+            self._start_export("保存中", self._finish_export, export_to_file,
+                               self._compiled_template(), self._output_values(), path)
+
+    def export_to_save_directory(self):
+        """
+        生成したプロンプトを、保存ディレクトリの exports に「テンプレート名_日時.txt」として書き出す。
+        """
+        self.preview_scheduler.flush()  # 未反映の入力を反映してから生成する
+        if self._export_job is not None or not self.export_directory:
+            return
+        path = export_path(self.export_directory, self.original_name)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        except OSError as e:
+            messagebox.showerror("エラー", f"書き出し先のディレクトリを作成できませんでした。\n{e}")
+            return
+        self._start_export("書き出し中", self._finish_export, export_to_file,
+                           self._compiled_template(), self._output_values(), path)
+
+    def _finish_export(self, path):
+        """書き出したファイルのパスを表示する。"""
+        self.export_status.config(text=f"保存しました: {path}")
+
+    def _start_export(self, label, on_done, function, *args):
+        """
+        書き出しをバックグラウンドで開始し、進捗の表示を始める。
+
+        Args:
+            label (str): 進捗の表示に使う処理の名前。
+            on_done (callable): 終了したときに結果を引数に呼び出す関数。
+            function (callable): ExportJob で実行する関数。
+            *args: function に渡す引数。
+        """
+        self._export_job = ExportJob(function, *args)
+        self.export_status.config(text=f"{label}…")
+        self._export_after_id = self.window.after(EXPORT_POLL_MS, self._poll_export, label, on_done)
+
+    def _poll_export(self, label, on_done):
+        """書き出しの進捗を表示し、終了したら結果を on_done に渡す。"""
+        job = self._export_job
+        if not job.poll():
+            self.export_status.config(text=f"{label}… {job.percent()}%")
+            self._export_after_id = self.window.after(EXPORT_POLL_MS, self._poll_export, label, on_done)
+            return
+        self._export_job = None
+        self._export_after_id = None
+        self.export_status.config(text="")
+        if job.error is not None:
+            messagebox.showerror("エラー", f"{label}にエラーが発生しました。\n{job.error}")
+        else:
+            on_done(job.result)
+
     def _update_variables_listbox(self):
         """
         テンプレート内の変数の変更に基づいて変数一覧リストボックスを更新する。(テンプレート編集タブ用)
         """
-        template = self.prompt_data['template']
-        variables = set(re.findall(r'\{\{(\w+)\}\}', template))
-        self.variables_listbox.delete(0, tk.END)
-        for var in sorted(variables):
-            self.variables_listbox.insert(tk.END, var)
+        sync_listbox_items(self.variables_listbox, extract_variables(self.prompt_data['template']))
 
     def _on_template_change_change_tab(self, event=None):
         """
         テンプレートテキストが変更されたときに変数を更新する。(テンプレート編集タブ用)
+
+        編集された行の周辺だけを再走査し、変数一覧は差分だけを更新します。
         """
-        template = self.template_text.get("1.0", tk.END)
-        variables = set(re.findall(r'\{\{(\w+)\}\}', template))
-        self.variables_listbox.delete(0, tk.END)
-        for var in sorted(variables):
-            self.variables_listbox.insert(tk.END, var)
+        track_text_edit(self.template_text, self.template_tracker)
+        sync_listbox_items(self.variables_listbox, self.template_tracker.variables())
 
     def _insert_selected_variable_change_tab(self, event=None):
         """
@@ -299,6 +579,7 @@ class PromptCreationWindow:
             current_pos = self.template_text.index(tk.INSERT)
             self.template_text.insert(tk.INSERT, f"{{{{{variable}}}}}")
             self.template_text.mark_set(tk.INSERT, f"{current_pos}+{len(variable)+4}c")
+            self._on_template_change_change_tab()  # キー入力と同じく変数の追跡に挿入を反映する
             self.template_text.focus_set()
             self._update_variables_prompt_creation_tab() # テンプレート編集を反映するためにプロンプト作成タブの変数を更新
 
@@ -353,31 +634,74 @@ class PromptCreationWindow:
         # 保存の確認
         if not messagebox.askyesno("確認", "変更を保存しますか？"):
             return
+        if not self.prompt_manager.loaded:
+            messagebox.showinfo("お知らせ", "テンプレートを読み込み中です。しばらくしてから再度お試しください。")
+            return
 
         # 新しいテンプレートを保存
-        new_template = self.template_text.get("1.0", tk.END).strip()
+        self._store_template(self.template_text.get("1.0", tk.END).strip())
+        messagebox.showinfo("成功", "テンプレートを保存しました。") # 保存成功メッセージを表示
+
+    def _store_template(self, new_template):
+        """
+        テンプレートを共有の PromptManager に保存し、変数入力エリアとプレビューを更新する。(テンプレート編集タブ用)
+
+        変更前の内容は PromptManager が版の履歴に記録します。
+
+        Args:
+            new_template (str): 保存するテンプレート。
+        """
         new_name = self.original_name # テンプレート名は変更しない
 
+        # 共有の PromptManager で既存のプロンプトを1回の書き込みで更新 (nameで検索)。
+        # 変更通知により、メインウィンドウの一覧や他のウィンドウにもすぐに反映される。
+        # このウィンドウの複製は、PromptManager が変更前の内容を読み終えてから書き換える
+        if not self.prompt_manager.update_prompt(new_name, new_template):
+            self.prompt_manager.save_prompt(new_name, new_template)
+
         self.prompt_data['template'] = new_template
         self.prompt_data['name'] = new_name # テンプレート名も更新 (念のため)
         self.original_template = new_template # original_templateも更新
         self.original_name = new_name # original_nameも更新
 
-        prompt_manager = PromptManager() # PromptManagerのインスタンスを生成
-        # 既存のプロンプトを削除して新しいプロンプトを保存 (nameで検索して削除)
-        prompt_manager.delete_prompt(self.original_name)
-        prompt_manager.save_prompt(new_name, new_template)
-
         # UIを編集不可状態に戻す (今回は不要)
 
-        # 変数入力エリアを更新 (プロンプト作成タブの変数入力を更新)
-        self._update_variables_prompt_creation_tab()
+        # 変数入力エリアとプレビューを更新 (入力済みの値は残す)
+        self._refresh_template_view()
         # 変数一覧を更新 (テンプレート編集タブの変数一覧を更新)
         self._update_variables_listbox()
 
-        # プレビューを更新
-        self.update_preview(None)
-        messagebox.showinfo("成功", "テンプレートを保存しました。") # 保存成功メッセージを表示
+    def _show_history_change_tab(self):
+        """
+        テンプレートの版の履歴を表示する。(テンプレート編集タブ用)
+        """
+        if not self.prompt_manager.loaded:
+            messagebox.showinfo("お知らせ", "テンプレートを読み込み中です。しばらくしてから再度お試しください。")
+            return
+        HistoryBrowser(self.window, self.prompt_manager.history, self.original_name,
+                       self.template_text.get("1.0", "end-1c"), self._revert_template_change_tab)
+
+    def _revert_template_change_tab(self, version, template):
+        """
+        テンプレートを履歴の版に戻す。(テンプレート編集タブ用)
+
+        戻した内容は新しい版として保存するため、戻す前の版も履歴に残ります。
+
+        Args:
+            version (int): 戻す版。
+            template (str): その版の本文。
+
+        Returns:
+            bool: 戻した場合は True。
+        """
+        if not messagebox.askyesno("確認", f"版 {version} に戻しますか？\n※テンプレート編集タブの未保存の変更は失われます。",
+                                   parent=self.window):
+            return False
+        self.template_text.delete("1.0", tk.END)
+        self.template_text.insert("1.0", template)
+        self.template_tracker.set_text(template)
+        self._store_template(template)
+        return True
 
     def _discard_current_template_input_change_tab(self): # メソッド名変更
         """
@@ -392,6 +716,7 @@ class PromptCreationWindow:
         # テンプレートを元の状態に戻す
         self.template_text.delete("1.0", tk.END)
         self.template_text.insert("1.0", self.original_template)
+        self.template_tracker.set_text(self.original_template)
 
         # UIを編集不可状態に戻す (今回は不要)
         self._update_variables_listbox() # 変数一覧を更新
@@ -399,13 +724,120 @@ class PromptCreationWindow:
         self.update_preview(None) # プレビューを更新
 
 
+class HistoryBrowser:
+    """
+    テンプレートの版の履歴を表示し、選択した版に戻すためのウィンドウクラス。
+
+    左側に版の一覧 (保存日時と変更行数)、右側に選択した版の本文または現在の内容との差分を表示します。
+    """
+    def __init__(self, parent, history, name, current_template, on_revert):
+        """
+        HistoryBrowserクラスのコンストラクタ。
+
+        Args:
+            parent (tk.Toplevel): 親ウィンドウ。
+            history (TemplateHistory): 版の履歴。
+            name (str): テンプレート名。
+            current_template (str): 差分の比較に使う現在のテンプレート。
+            on_revert (callable): 「この版に戻す」で (版, 本文) を引数に呼び出す関数。戻した場合は True を返します。
+        """
+        self.history = history
+        self.name = name
+        self.current_template = current_template
+        self.on_revert = on_revert
+        self.versions = []
+
+        self.window = tk.Toplevel(parent)
+        self.window.title(f"{name} の履歴")
+        self.window.attributes('-topmost', True)
+        x, y = calculate_window_position(parent, *WINDOW_SIZES['history'])
+        self.window.geometry(f"{WINDOW_SIZES['history'][0]}x{WINDOW_SIZES['history'][1]}+{x}+{y}")
+
+        content_frame = ttk.Frame(self.window)
+        content_frame.pack(fill='both', expand=True, padx=10, pady=10)
+
+        list_frame = ttk.LabelFrame(content_frame, text="版")
+        list_frame.pack(side='left', fill='y', padx=(0, 10))
+        self.version_listbox = tk.Listbox(list_frame, width=28, font=FONTS['input'], activestyle='none',
+                                          exportselection=False, selectbackground=COLORS['primary'],
+                                          selectforeground=COLORS['surface'])
+        self.version_listbox.pack(padx=5, pady=5, fill='both', expand=True)
+        self.version_listbox.bind('<<ListboxSelect>>', self._show_selected)
+
+        view_frame = ttk.Frame(content_frame)
+        view_frame.pack(side='left', fill='both', expand=True)
+        self.view_mode = tk.StringVar(value='text')
+        mode_frame = ttk.Frame(view_frame)
+        mode_frame.pack(fill='x')
+        ttk.Radiobutton(mode_frame, text="本文", value='text', variable=self.view_mode,
+                        command=self._show_selected).pack(side='left', padx=5)
+        ttk.Radiobutton(mode_frame, text="現在との差分", value='diff', variable=self.view_mode,
+                        command=self._show_selected).pack(side='left', padx=5)
+        self.view_text = tk.Text(view_frame, width=50, font=FONTS['input'], wrap='word', state='disabled')
+        self.view_text.pack(fill='both', expand=True, pady=5)
+        self.view_text.tag_configure('added', foreground='#2E7D32')
+        self.view_text.tag_configure('removed', foreground='#C62828')
+
+        button_frame = ttk.Frame(self.window)
+        button_frame.pack(fill='x', padx=10, pady=(0, 10))
+        ttk.Button(button_frame, text="この版に戻す", command=self._revert).pack(side='left', padx=5)
+        ttk.Button(button_frame, text="閉じる", command=self.window.destroy).pack(side='left', padx=5)
+
+        self._load_versions()
+
+    def _load_versions(self):
+        """版の一覧を読み込み、最新の版を選択する。"""
+        self.versions = self.history.versions(self.name)
+        self.version_listbox.delete(0, tk.END)
+        for version, saved_at, added, removed in self.versions:
+            saved = datetime.fromtimestamp(saved_at).strftime('%Y-%m-%d %H:%M')
+            self.version_listbox.insert(tk.END, f"版 {version}  {saved}  +{added} -{removed}")
+        if self.versions:
+            self.version_listbox.selection_set(0)
+        self._show_selected()
+
+    def _selected_version(self):
+        selection = self.version_listbox.curselection()
+        return self.versions[selection[0]][0] if selection else None
+
+    def _show_selected(self, event=None):
+        """選択した版の本文、または現在の内容との差分を表示する。"""
+        version = self._selected_version()
+        self.view_text.config(state='normal')
+        self.view_text.delete("1.0", tk.END)
+        if version is None:
+            self.view_text.insert("1.0", "履歴はありません。テンプレートを保存すると版が記録されます。")
+        else:
+            template = self.history.get(self.name, version) or ''
+            if self.view_mode.get() == 'diff':
+                diff = difflib.unified_diff(template.splitlines(), self.current_template.splitlines(),
+                                            fromfile=f"版 {version}", tofile="現在", lineterm='')
+                for line in diff:
+                    tag = ('added' if line.startswith('+') and not line.startswith('+++') else
+                           'removed' if line.startswith('-') and not line.startswith('---') else ())
+                    self.view_text.insert(tk.END, line + '\n', tag)
+            else:
+                self.view_text.insert("1.0", template)
+        self.view_text.config(state='disabled')
+
+    def _revert(self):
+        """選択した版に戻す。"""
+        version = self._selected_version()
+        if version is None:
+            return
+        template = self.history.get(self.name, version)
+        if template is not None and self.on_revert(version, template):
+            self.current_template = template
+            self._load_versions()
+
+
 class FlashPromptApp:
     """
     メインアプリケーションウィンドウクラス。
 
     テンプレート一覧、テンプレート登録、設定のタブを含むメインアプリケーションウィンドウを管理します。
     """
-    def __init__(self, root):
+    def __init__(self, root, instance_server=None, open_name=None):
         """
         FlashPromptAppクラスのコンストラクタ。
 
@@ -413,22 +845,34 @@ class FlashPromptApp:
 
         Args:
             root (tk.Tk): Tkinterのルートウィンドウオブジェクト。
+            instance_server (InstanceServer, optional): 2回目以降の起動からのメッセージを受け付けるサーバー。
+                指定した場合、ウィンドウを閉じてもプロセスは終了せずに常駐します。
+            open_name (str, optional): 読み込み完了後にプロンプト作成ウィンドウで開くテンプレート名。
         """
         self.root = root
         self.root.title("FlashPrompt")
-        self.settings_manager = SettingsManager()
+        with profiling.phase('settings_load'):
+            self.settings_manager = SettingsManager()
         always_on_top = self.settings_manager.get_settings().get('always_on_top', True)
         self.root.attributes('-topmost', always_on_top)
 
         # メインウィンドウの最小サイズを設定
         self.root.minsize(*WINDOW_SIZES['main_min'])
 
-        self.prompt_manager = PromptManager()
+        # プロンプトの読み込みは最初の画面を表示した後にバックグラウンドで行う
+        with profiling.phase('prompt_manager_init'):
+            settings = self.settings_manager.get_settings()
+            # 共有ディレクトリが設定されている場合は、保存形式に関係なく1件1ファイルで保存する
+            template_directory = settings.get('save_directory') or None
+            self.prompt_manager = PromptManager(None if template_directory else settings.get('storage_backend'),
+                                                load=False, lazy_templates=settings.get('lazy_templates', False),
+                                                template_directory=template_directory)
         self.variables = set()  # 変数の一覧を保持
 
         # スタイルの設定
-        self.style = ttk.Style()
-        setup_styles(self.style)
+        with profiling.phase('setup_styles'):
+            self.style = ttk.Style()
+            setup_styles(self.style)
 
         # タブの作成
         self.notebook = ttk.Notebook(root)
@@ -441,17 +885,223 @@ class FlashPromptApp:
         # テンプレート一覧タブ
         self.list_frame = ttk.Frame(self.notebook)
         self.notebook.add(self.list_frame, text='テンプレート一覧')
-        self._setup_list_tab()
+        with profiling.phase('list_tab'):
+            self._setup_list_tab()
 
-        # テンプレート登録タブ
+        # テンプレート登録タブと設定タブは、最初に選択されたときに中身を作成する
         self.template_frame = ttk.Frame(self.notebook)
         self.notebook.add(self.template_frame, text='テンプレート登録')
-        self._setup_template_tab()
-
-        # 設定タブ
         self.settings_frame = ttk.Frame(self.notebook)
         self.notebook.add(self.settings_frame, text='設定')
-        self._setup_settings_tab()
+        self._tab_builders = {
+            str(self.template_frame): self._setup_template_tab,
+            str(self.settings_frame): self._setup_settings_tab,
+        }
+        self.notebook.bind('<<NotebookTabChanged>>', self._on_tab_changed)
+
+        # 常駐モード: 閉じるボタンではウィンドウを隠すだけにし、Ctrl+Q で終了する
+        self.instance_server = instance_server
+        self._pending_open = open_name
+        if self.instance_server is not None:
+            self.root.protocol('WM_DELETE_WINDOW', self._hide_window)
+            self.root.bind('<Control-q>', self._quit)
+            self.root.after(INSTANCE_POLL_MS, self._poll_instance_messages)
+        else:
+            self.root.protocol('WM_DELETE_WINDOW', self._quit)
+
+        self._start_prompt_load()
+
+    def _on_tab_changed(self, event=None):
+        """
+        タブが選択されたときに、まだ作成していないタブの中身を作成する。
+        """
+        builder = self._tab_builders.pop(self.notebook.select(), None)
+        if builder is not None:
+            with profiling.phase(builder.__name__.strip('_')):
+                builder()
+
+    def _start_prompt_load(self):
+        """
+        プロンプトの読み込みをバックグラウンドスレッドで開始する。
+
+        読み込んだプロンプトは PROMPT_LOAD_CHUNK 件ずつキューに入れ、
+        _poll_prompt_load がTkのメインスレッドで受け取って一覧に追加します。
+        読み込みの終わりはキューに入れた None で知らせます。
+        """
+        self._prompt_load_queue = queue.Queue()
+        # 読み込み中の変更を取りこぼさないよう、ディレクトリの監視は読み込みより先に始める
+        self._start_directory_watch()
+
+        def load():
+            try:
+                with profiling.phase('read_storage'):
+                    prompts = self.prompt_manager.read_storage()
+                for start in range(0, len(prompts), PROMPT_LOAD_CHUNK):
+                    self._prompt_load_queue.put(prompts[start:start + PROMPT_LOAD_CHUNK])
+            finally:
+                self._prompt_load_queue.put(None)
+
+        threading.Thread(target=load, daemon=True).start()
+        self.root.after(PROMPT_LOAD_POLL_MS, self._poll_prompt_load)
+
+    def _poll_prompt_load(self):
+        """バックグラウンドで読み込んだプロンプトを受け取り、テンプレート一覧に追加する。"""
+        names = []
+        finished = False
+        with profiling.phase('populate_list'):
+            while True:
+                try:
+                    prompts = self._prompt_load_queue.get_nowait()
+                except queue.Empty:
+                    break
+                if prompts is None:
+                    finished = True
+                    break
+                names.extend(self.prompt_manager.add_loaded_prompts(prompts))
+            # 絞り込み中は、検索欄を空にしたときに一覧全体を表示し直す
+            if names and not self.search_var.get().strip():
+                self.prompt_list.extend(names)
+        if finished:
+            self._on_prompts_loaded()
+        else:
+            self.root.after(PROMPT_LOAD_POLL_MS, self._poll_prompt_load)
+
+    def _on_prompts_loaded(self):
+        """
+        プロンプトの読み込みが完了したときの処理。
+
+        変更通知の受け取りと検索索引の作成を開始し、重複していたテンプレート名を通知します。
+        """
+        self.prompt_manager.finish_loading()
+        profiling.mark('prompts_loaded')
+        # 以降の変更は PromptManager からの通知で差分反映する
+        self.prompt_manager.add_listener(self._on_prompts_changed)
+        self._start_search_index_build()
+
+        if self._pending_open is not None:
+            name, self._pending_open = self._pending_open, None
+            self._open_prompt_by_name(name)
+
+        # 読み込み時に重複していたテンプレート名を通知
+        if self.prompt_manager.renamed_duplicates:
+            renamed = "\n".join(f"{old} → {new}" for old, new in self.prompt_manager.renamed_duplicates)
+            messagebox.showwarning("警告", f"重複していたテンプレート名を変更しました。\n{renamed}")
+        import_error = getattr(self.prompt_manager.storage, 'import_error', None)
+        if import_error is not None:
+            messagebox.showwarning("警告", "prompts.json を取り込めませんでした。ファイルを修正すると、次回の起動時に取り込みます。"
+                                           f"\n{import_error}")
+
+    def _start_directory_watch(self):
+        """
+        共有ディレクトリに保存している場合、ディレクトリの監視を開始する。
+
+        変更されたファイルの読み直しは監視スレッドで行い、結果をキューに入れます。
+        キューは _poll_file_changes がTkのメインスレッドで受け取ります。
+        """
+        self.directory_watcher = None
+        storage = self.prompt_manager.storage
+        if not hasattr(storage, 'read_files'):
+            return
+        self._file_change_queue = queue.Queue()
+
+        def on_change(filenames):
+            self._file_change_queue.put(storage.read_files(filenames))
+
+        try:
+            self.directory_watcher = DirectoryWatcher(storage.directory, on_change)
+        except OSError as e:
+            messagebox.showwarning("警告", f"保存ディレクトリの変更を監視できません。\n{e}")
+            return
+        self.root.after(FILE_CHANGE_POLL_MS, self._poll_file_changes)
+
+    def _poll_file_changes(self):
+        """
+        他のクライアントによる共有ディレクトリの変更を、変更されたテンプレートだけ一覧と検索索引に反映する。
+
+        読み込みが完了するまでは受け取らずにキューに残します。
+        """
+        if self.prompt_manager.loaded:
+            while True:
+                try:
+                    changes = self._file_change_queue.get_nowait()
+                except queue.Empty:
+                    break
+                self.prompt_manager.apply_external_changes(changes)
+        self.root.after(FILE_CHANGE_POLL_MS, self._poll_file_changes)
+
+    def _poll_instance_messages(self):
+        """2回目以降の起動から届いたメッセージを処理する。"""
+        for message in self.instance_server.get_messages():
+            self._show_window()
+            if message.get('command') == 'open' and message.get('name'):
+                self._open_prompt_by_name(str(message['name']))
+        self.root.after(INSTANCE_POLL_MS, self._poll_instance_messages)
+
+    def _show_window(self):
+        """隠れている、または他のウィンドウの後ろにあるメインウィンドウを前面に表示する。"""
+        self.root.deiconify()
+        self.root.lift()
+        # 常に最前面表示が無効でも一度だけ前面に出す
+        self.root.attributes('-topmost', True)
+        self.root.after_idle(lambda: self.root.attributes(
+            '-topmost', self.settings_manager.get_settings().get('always_on_top', True)))
+        self.root.focus_force()
+        self.search_entry.focus_set()
+
+    def _open_prompt_by_name(self, name):
+        """
+        指定した名前のテンプレートでプロンプト作成ウィンドウを開く。
+
+        読み込み中でまだ見つからない場合は、読み込み完了後に開きます。
+
+        Args:
+            name (str): テンプレート名。
+        """
+        prompt_data = self.prompt_manager.get_prompt(name)
+        if prompt_data is not None:
+            PromptCreationWindow(self.root, prompt_data, **self._prompt_window_options())
+        elif not self.prompt_manager.loaded:
+            self._pending_open = name
+        else:
+            messagebox.showwarning("警告", f"テンプレート '{name}' が見つかりません。")
+
+    def _hide_window(self):
+        """メインウィンドウを隠す (プロセスは常駐したまま次の起動を待つ)。"""
+        self._flush_writes()
+        self.root.withdraw()
+
+    def _quit(self, event=None):
+        """予約済みの書き込みを終えてからアプリケーションを閉じる。"""
+        if self._flush_writes() or messagebox.askyesno("確認", "保存に失敗しました。このまま終了しますか？"):
+            self.root.destroy()
+
+    def _flush_writes(self):
+        """
+        バックグラウンドで予約されている書き込みを全て終える。
+
+        Returns:
+            bool: 書き込みに成功した場合はTrue。失敗した場合はエラーを表示してFalse。
+        """
+        try:
+            persistence.flush_all()
+        except Exception as e:  # シリアライズで発生した UnicodeEncodeError なども書き込みの失敗として扱う
+            messagebox.showerror("エラー", f"ファイルの保存に失敗しました。\n{e}")
+            return False
+        return True
+
+    def _ensure_prompts_loaded(self):
+        """
+        プロンプトの読み込みが完了しているかを確認する。
+
+        読み込み中はストレージに書き込めないため、メッセージを表示してFalseを返します。
+
+        Returns:
+            bool: 読み込みが完了している場合はTrue。
+        """
+        if self.prompt_manager.loaded:
+            return True
+        messagebox.showinfo("お知らせ", "テンプレートを読み込み中です。しばらくしてから再度お試しください。")
+        return False
 
     def _setup_list_tab(self):
         """
@@ -472,51 +1122,69 @@ class FlashPromptApp:
                   command=self._delete_prompt,
                   style='Danger.TButton').pack(side='left', padx=5)
 
+        # 検索欄（入力に合わせて一覧を絞り込む）
+        search_frame = ttk.Frame(self.list_frame)
+        search_frame.pack(fill='x', padx=10, pady=(0, 5))
+        ttk.Label(search_frame, text="検索:", style='TLabel').pack(side='left')
+        self.search_var = tk.StringVar()
+        self.search_entry = ttk.Entry(search_frame, textvariable=self.search_var, style='TEntry', font=FONTS['input'])
+        self.search_entry.pack(side='left', fill='x', expand=True, padx=5)
+        self.search_entry.bind('<Down>', self._focus_prompt_list)
+        self.search_entry.bind('<Return>', self._open_prompt_creation)
+        self.search_var.trace_add('write', self._schedule_search)
+        self._search_after_id = None
+
         # テンプレート一覧の表示（下部に配置）
         list_frame = ttk.Frame(self.list_frame)
         list_frame.pack(fill='both', expand=True, padx=10)
 
-        # TreeViewの作成（ヘッダー非表示）
-        self.prompt_list = ttk.Treeview(list_frame,
-                                      columns=('name',),
-                                      show='tree',  # ヘッダーを非表示にする
-                                      height=10)
-        self.prompt_list.column('#0', width=0, stretch=False)  # 最初の列を非表示
-        self.prompt_list.column('name', width=200)
+        # 表示範囲の行だけを生成する仮想化リスト（上下キーのナビゲーションはリスト側で処理）
+        self.prompt_list = VirtualListView(list_frame)
         self.prompt_list.pack(fill='both', expand=True)
 
-        # キーボードナビゲーションとダブルクリックの設定
+        # ダブルクリックとEnterキーの設定
         self.prompt_list.bind('<Double-Button-1>', self._open_prompt_creation)
         self.prompt_list.bind('<Return>', self._open_prompt_creation)
-        self.prompt_list.bind('<Up>', self._navigate_list)
-        self.prompt_list.bind('<Down>', self._navigate_list)
 
-        self._update_prompt_list()
+        # 検索索引は読み込み完了後に作成する
+        self.search_index = None
+        self._search_index_building = False
+        self._pending_index_changes = []
+
+    def _prompt_window_options(self):
+        """
+        PromptCreationWindowに渡す設定値を取得する。
+
+        Returns:
+            dict: always_on_top、preview_debounce_ms、prompt_manager、export_directory を含む辞書。
+        """
+        settings = self.settings_manager.get_settings()
+        return {
+            'always_on_top': settings.get('always_on_top', True),
+            'preview_debounce_ms': settings.get('preview_debounce_ms', DEFAULT_SETTINGS['preview_debounce_ms']),
+            'prompt_manager': self.prompt_manager,
+            'export_directory': settings.get('save_directory') or None,
+        }
 
     def _open_prompt_creation(self, event=None):
-        selection = self.prompt_list.selection()
-        always_on_top = self.settings_manager.get_settings().get('always_on_top', True)
-        if not selection:
-            items = self.prompt_list.get_children()
-            if items:
-                selection = (items[0],)
-        if selection:
-            prompt_name = str(self.prompt_list.item(selection[0])['values'][0])
+        prompt_name = self.prompt_list.selected_name()
+        options = self._prompt_window_options()
+        if prompt_name is None and self.prompt_list.items:
+            prompt_name = self.prompt_list.items[0]
+        if prompt_name is not None:
             if prompt_name:
                 prompt_data = self.prompt_manager.get_prompt(prompt_name)
                 if prompt_data is not None:
-                    PromptCreationWindow(self.root, prompt_data, always_on_top=always_on_top)
+                    PromptCreationWindow(self.root, prompt_data, **options)
         else:
             # 「プロンプト作成」ボタンから新規作成する場合
-            PromptCreationWindow(self.root, {'name': '新しいプロンプト', 'template': ''}, always_on_top=always_on_top)
+            PromptCreationWindow(self.root, {'name': '新しいプロンプト', 'template': ''}, **options)
 
     def _delete_prompt(self):
-        selection = self.prompt_list.selection()
-        if selection:
-            prompt_name = str(self.prompt_list.item(selection[0])['values'][0])
+        prompt_name = self.prompt_list.selected_name()
+        if prompt_name is not None and self._ensure_prompts_loaded():
             if messagebox.askyesno("確認", f"プロンプト '{prompt_name}' を削除しますか？"):
                 self.prompt_manager.delete_prompt(prompt_name)
-                self._update_prompt_list()
 
     def _setup_template_tab(self):
         """
@@ -551,6 +1219,8 @@ class FlashPromptApp:
         self.template_text.pack(padx=10, pady=5, fill='both', expand=True)
         add_text_context_menu(self.template_text)
         
+        self.template_tracker = VariableTracker()
+
         # Bind both key release and the custom content changed events
         self.template_text.bind('<KeyRelease>', self._on_template_change)
         self.template_text.bind("<<ContentChanged>>", self._on_template_change)
@@ -595,12 +1265,11 @@ class FlashPromptApp:
     def _on_template_change(self, event=None):
         """
         テンプレートテキストが変更されたときに変数を更新する。(テンプレート登録タブ用)
+
+        編集された行の周辺だけを再走査し、変数一覧は差分だけを更新します。
         """
-        template = self.template_text.get("1.0", tk.END)
-        variables = set(re.findall(r'\{\{(\w+)\}\}', template))
-        self.variables_listbox.delete(0, tk.END)
-        for var in sorted(variables):
-            self.variables_listbox.insert(tk.END, var)
+        track_text_edit(self.template_text, self.template_tracker)
+        sync_listbox_items(self.variables_listbox, self.template_tracker.variables())
 
     def _insert_selected_variable_template_tab(self, event=None):
         """
@@ -612,6 +1281,7 @@ class FlashPromptApp:
             current_pos = self.template_text.index(tk.INSERT)
             self.template_text.insert(tk.INSERT, f"{{{{{variable}}}}}")
             self.template_text.mark_set(tk.INSERT, f"{current_pos}+{len(variable)+4}c")
+            self._on_template_change()  # キー入力と同じく変数の追跡に挿入を反映する
             self.template_text.focus_set()
 
     def _show_variable_dialog_template_tab(self):
@@ -671,8 +1341,14 @@ class FlashPromptApp:
             messagebox.showerror("エラー", "テンプレートを入力してください。")
             return
 
-        self.prompt_manager.save_prompt(name, template)
-        self._update_prompt_list()
+        if not self._ensure_prompts_loaded():
+            return
+
+        try:
+            self.prompt_manager.save_prompt(name, template)
+        except DuplicatePromptError:
+            messagebox.showerror("エラー", f"テンプレート '{name}' は既に存在します。別の名前を入力してください。")
+            return
         self._clear_template_fields_tab()
         messagebox.showinfo("成功", "テンプレートを保存しました。")
 
@@ -692,12 +1368,127 @@ class FlashPromptApp:
         """
         self.template_name_entry.delete(0, tk.END)
         self.template_text.delete("1.0", tk.END)
+        self.template_tracker.set_text('')
+        sync_listbox_items(self.variables_listbox, ())
 
     def _update_prompt_list(self):
-        for item in self.prompt_list.get_children():
-            self.prompt_list.delete(item)
-        for prompt in self.prompt_manager.prompts:
-            self.prompt_list.insert('', 'end', values=(str(prompt['name']),)) # テンプレート名を文字列に変換して挿入
+        """
+        テンプレート一覧の表示内容をPromptManagerの内容で置き換える。
+        """
+        self.prompt_list.set_items(self.prompt_manager.names())
+
+    def _on_prompts_changed(self, event, name, prompt):
+        """
+        PromptManagerからの変更通知をテンプレート一覧に差分反映する。
+
+        Args:
+            event (str): 'insert'、'update'、'remove' のいずれか。
+            name (str): 変更前のプロンプト名。
+            prompt (dict): 対象のプロンプト。
+        """
+        self._update_search_index(event, name, prompt)
+        if self.search_var.get().strip():
+            # 絞り込み中は検索結果を更新する
+            self._run_search()
+        elif event == 'insert':
+            self.prompt_list.append(prompt['name'])
+        elif event == 'update':
+            self.prompt_list.replace(name, prompt['name'])
+        elif event == 'remove':
+            self.prompt_list.remove(name)
+
+    def _start_search_index_build(self):
+        """
+        検索索引の作成をバックグラウンドスレッドで開始する。
+
+        作成中に発生した変更は保留しておき、索引の完成後に適用します。
+        削除済みのIDを詰めるために作り直す場合は、完成するまで現在の索引で検索します。
+        """
+        self._search_index_building = True
+        self._pending_index_changes = []
+        self._search_index_queue = queue.Queue()
+        # 本文の参照 (遅延読み込みの場合はストレージからの読み込み) もバックグラウンドで行う
+        prompts = self.prompt_manager.prompts
+
+        def build():
+            with profiling.phase('search_index_build'):
+                index = SearchIndex(prompts)
+            self._search_index_queue.put(index)
+
+        threading.Thread(target=build, daemon=True).start()
+        self.root.after(100, self._poll_search_index)
+
+    def _poll_search_index(self):
+        """バックグラウンドで作成した検索索引を受け取る。"""
+        try:
+            index = self._search_index_queue.get_nowait()
+        except queue.Empty:
+            self.root.after(100, self._poll_search_index)
+            return
+        for change in self._pending_index_changes:
+            self._apply_search_index_change(index, *change)
+        self._pending_index_changes = []
+        self._search_index_building = False
+        self.search_index = index
+        profiling.mark('search_index_ready')
+        if self.search_var.get().strip():
+            self._run_search()
+
+    def _update_search_index(self, event, name, prompt):
+        """
+        プロンプトの変更を検索索引に反映する (作成中の索引には完成後に適用するため保留する)。
+
+        削除済みのIDが増えた場合は、索引を作り直してIDを詰めます。
+        """
+        change = (event, name, prompt['name'], prompt['template'])
+        if self._search_index_building:
+            self._pending_index_changes.append(change)
+        if self.search_index is not None:
+            self._apply_search_index_change(self.search_index, *change)
+            if not self._search_index_building and self.search_index.needs_compaction:
+                self._start_search_index_build()
+
+    @staticmethod
+    def _apply_search_index_change(index, event, old_name, name, template):
+        """検索索引に1件の変更を適用する。"""
+        if event == 'insert':
+            index.add(name, template)
+        elif event == 'update':
+            index.update(old_name, name, template)
+        elif event == 'remove':
+            index.remove(old_name)
+
+    def _schedule_search(self, *args):
+        """
+        検索欄の入力が落ち着いてから検索を実行するように予約する。
+
+        連続した入力では直前の予約を取り消し、最後の入力から一定時間後に1回だけ検索します。
+        """
+        if self._search_after_id is not None:
+            self.root.after_cancel(self._search_after_id)
+        self._search_after_id = self.root.after(SEARCH_DELAY_MS, self._run_search)
+
+    def _run_search(self):
+        """
+        検索欄の内容でテンプレート一覧を絞り込む。
+
+        検索欄が空の場合は全てのテンプレートを表示します。
+        """
+        self._search_after_id = None
+        query = self.search_var.get().strip()
+        if not query:
+            self._update_prompt_list()
+        elif self.search_index is None:
+            # 索引の作成中は完成時に改めて検索する
+            return
+        else:
+            self.prompt_list.set_items(self.search_index.search(query, limit=SEARCH_RESULT_LIMIT))
+
+    def _focus_prompt_list(self, event=None):
+        """検索欄から一覧にフォーカスを移し、先頭の項目を選択する。"""
+        self.prompt_list.focus_set()
+        self.prompt_list.select(0)
+        return 'break'
 
     def _setup_settings_tab(self):
         """
@@ -732,6 +1523,9 @@ class FlashPromptApp:
         # 参照ボタン
         browse_btn = ttk.Button(input_frame, text="参照", command=self._browse_directory)
         browse_btn.pack(side='left')
+        ttk.Label(dir_frame, text="※テンプレートを1件1ファイルで保存し、他のPCからの変更も反映します。"
+                                  "空欄の場合はこのPCに保存します (再起動後に反映)",
+                  style='TLabel').pack(side='top', anchor='w', padx=10, pady=(0, 10))
         
         # ウィンドウ常時最前面設定
         topmost_frame = ttk.Frame(content_frame, style='TFrame')
@@ -739,12 +1533,41 @@ class FlashPromptApp:
         self.topmost_var = tk.BooleanVar(value=settings.get('always_on_top', True))
         topmost_check = ttk.Checkbutton(topmost_frame, text="ウィンドウを常に最前面に表示", variable=self.topmost_var)
         topmost_check.pack(side='left', padx=10, pady=5)
+
+        # 常駐設定 (再起動後に反映)
+        resident_frame = ttk.Frame(content_frame, style='TFrame')
+        resident_frame.pack(fill='x', padx=5, pady=5)
+        self.single_instance_var = tk.BooleanVar(value=settings.get('single_instance', False))
+        ttk.Checkbutton(resident_frame, text="閉じても常駐し、次回の起動ですぐに表示する (再起動後に反映)",
+                        variable=self.single_instance_var).pack(side='left', padx=10, pady=5)
         
+        # プレビュー更新の間隔設定
+        debounce_frame = ttk.Frame(content_frame, style='TFrame')
+        debounce_frame.pack(fill='x', padx=5, pady=5)
+        ttk.Label(debounce_frame, text="プレビュー更新の間隔 (ミリ秒):", style='TLabel').pack(side='left', padx=10)
+        self.debounce_var = tk.StringVar(value=str(settings.get('preview_debounce_ms', DEFAULT_SETTINGS['preview_debounce_ms'])))
+        ttk.Spinbox(debounce_frame, from_=0, to=1000, increment=10, width=6,
+                    textvariable=self.debounce_var).pack(side='left')
+
+        # 保存形式設定 (再起動後に反映)
+        backend_frame = ttk.LabelFrame(content_frame, text="保存形式", style='TLabelframe')
+        backend_frame.pack(fill='x', padx=5, pady=5)
+        self.backend_var = tk.StringVar(value=settings.get('storage_backend', DEFAULT_SETTINGS['storage_backend']))
+        backend_combo = ttk.Combobox(backend_frame, textvariable=self.backend_var,
+                                     values=('sqlite', 'json', 'packed'), state='readonly', width=10)
+        backend_combo.pack(side='left', padx=10, pady=10)
+        ttk.Label(backend_frame, text="※再起動後に反映されます", style='TLabel').pack(side='left')
+        self.lazy_templates_var = tk.BooleanVar(value=settings.get('lazy_templates', DEFAULT_SETTINGS['lazy_templates']))
+        ttk.Checkbutton(backend_frame, text="本文を必要になるまで読み込まない (SQLite と保存ディレクトリのみ、省メモリ)",
+                        variable=self.lazy_templates_var).pack(side='left', padx=10)
+
         # 保存ボタン（その他のUI部品はその後に配置）
         save_frame = ttk.Frame(content_frame, style='TFrame')
         save_frame.pack(fill='x', padx=5, pady=10)
         save_btn = ttk.Button(save_frame, text="設定を保存", command=self._save_settings)
         save_btn.pack(side='right')
+        if self.instance_server is not None:
+            ttk.Button(save_frame, text="終了 (Ctrl+Q)", command=self._quit).pack(side='left')
 
     def _browse_directory(self):
         """
@@ -768,9 +1591,31 @@ class FlashPromptApp:
         UIから設定値を取得し、SettingsManagerを使用して保存、さらに
         ルートウィンドウの常に最前面表示の設定を更新します。
         """
+        try:
+            preview_debounce_ms = int(self.debounce_var.get())
+        except ValueError:
+            messagebox.showerror("エラー", "プレビュー更新の間隔には0以上の整数を入力してください。")
+            return
+        if preview_debounce_ms < 0:
+            messagebox.showerror("エラー", "プレビュー更新の間隔には0以上の整数を入力してください。")
+            return
+
         settings = self.settings_manager.get_settings()
+        backend = self.backend_var.get()
+        if backend != settings.get('storage_backend', DEFAULT_SETTINGS['storage_backend']) \
+                and self.prompt_manager.backend not in (None, 'directory', backend) and self.prompt_manager.loaded:
+            # 次回の起動で新しい形式に以前の古い内容が表示されないよう、現在の一覧を書き込んでおく
+            try:
+                self.prompt_manager.copy_to_backend(backend)
+            except (OSError, sqlite3.Error, ValueError) as e:
+                messagebox.showerror("エラー", f"テンプレートを新しい保存形式に書き込めませんでした。\n{e}")
+                return
         settings['save_directory'] = self.dir_entry.get()
+        settings['preview_debounce_ms'] = preview_debounce_ms
         settings['always_on_top'] = self.topmost_var.get()
+        settings['storage_backend'] = backend
+        settings['single_instance'] = self.single_instance_var.get()
+        settings['lazy_templates'] = self.lazy_templates_var.get()
         self.settings_manager.save_settings(settings)
         self.root.attributes('-topmost', self.topmost_var.get())
         messagebox.showinfo("成功", "設定を保存しました。")
@@ -801,49 +1646,16 @@ class FlashPromptApp:
             self.notebook.select(current - 1)
         return 'break'
 
-    def _navigate_list(self, event):
-        """
-        テンプレート一覧をキーボードでナビゲートする。
-
-        上下キーでリスト選択を移動し、リストの端でループしないようにします。
-        """
-        items = self.prompt_list.get_children()
-        if not items:
-            return 'break'
-
-        selection = self.prompt_list.selection()
-        if not selection:
-            # リストが空でない場合、最初のアイテムを選択
-            self.prompt_list.selection_set(items[0])
-            self.prompt_list.focus(items[0])
-            return 'break'
-
-        current_idx = items.index(selection[0])
-        next_idx = current_idx
-
-        if event.keysym == 'Up' and current_idx > 0:
-            next_idx = current_idx - 1
-        elif event.keysym == 'Down' and current_idx < len(items) - 1:
-            next_idx = current_idx + 1
-
-        self.prompt_list.selection_set(items[next_idx])
-        self.prompt_list.focus(items[next_idx])
-        self.prompt_list.see(items[next_idx])  # 選択したアイテムが見えるようにスクロール
-
-        return 'break'
-
     def _open_template_edit(self, event=None):
         """テンプレート編集用のウィンドウを開く"""
-        selection = self.prompt_list.selection()
-        if not selection:
+        prompt_name = self.prompt_list.selected_name()
+        if prompt_name is None:
             messagebox.showwarning("警告", "編集するプロンプトを選択してください")
             return
-            
-        prompt_name = str(self.prompt_list.item(selection[0])['values'][0])
+
         prompt_data = self.prompt_manager.get_prompt(prompt_name)
         if prompt_data:
-            always_on_top = self.settings_manager.get_settings().get('always_on_top', True)
-            window = PromptCreationWindow(self.root, prompt_data, always_on_top=always_on_top)
+            window = PromptCreationWindow(self.root, prompt_data, **self._prompt_window_options())
             window.notebook.select(window.template_change_tab)  # テンプレート編集タブを選択
         else:
             messagebox.showerror("エラー", "プロンプトが見つかりませんでした。")
\ No newline at end of file
@@ -0,0 +1,270 @@
+"""
+仮想化されたリストビューを定義するモジュール。
+
+VirtualListViewは表示されている行だけをTreeviewに生成し、
+スクロールに合わせて行の内容を差し替えます。数万件のテンプレートがあっても
+Treeviewの行数は画面に収まる数のまま変わりません。
+"""
+
+from tkinter import ttk
+
+
+class VirtualListView(ttk.Frame):
+    """
+    名前の一覧を表示する仮想化リストビュー。
+
+    データはPythonのリスト (items) で保持し、Treeviewには表示範囲の行だけを作成します。
+    選択状態はデータ上のインデックスで管理するため、上下キーによる移動は O(1) です。
+    """
+    def __init__(self, parent, **kwargs):
+        """
+        VirtualListViewクラスのコンストラクタ。
+
+        Args:
+            parent (tk.Widget): 親ウィジェット。
+        """
+        super().__init__(parent, **kwargs)
+        self.items = []
+        self.top = 0  # 表示範囲の先頭のデータインデックス
+        self.visible_count = 1
+        self.selected_index = None
+
+        # TreeViewの作成（ヘッダー非表示）
+        self.tree = ttk.Treeview(self, columns=('name',), show='tree', height=10, selectmode='browse')
+        self.tree.column('#0', width=0, stretch=False)  # 最初の列を非表示
+        self.tree.column('name', width=200)
+        self.tree.pack(side='left', fill='both', expand=True)
+
+        self.scrollbar = ttk.Scrollbar(self, orient='vertical', command=self._on_scrollbar)
+        self.scrollbar.pack(side='right', fill='y')
+
+        self.row_height = int(ttk.Style().lookup('Treeview', 'rowheight') or 20)
+
+        self.tree.bind('<Configure>', self._on_configure)
+        self.tree.bind('<<TreeviewSelect>>', self._on_tree_select)
+        self.tree.bind('<MouseWheel>', self._on_mousewheel)
+        self.tree.bind('<Button-4>', lambda e: self._scroll_units(-3))
+        self.tree.bind('<Button-5>', lambda e: self._scroll_units(3))
+        for keysym in ('Up', 'Down', 'Prior', 'Next', 'Home', 'End'):
+            self.tree.bind(f'<{keysym}>', self._on_key)
+
+    def bind(self, sequence=None, func=None, add=None):
+        """イベントのバインドを内部のTreeviewに委譲する。"""
+        return self.tree.bind(sequence, func, add)
+
+    def focus_set(self):
+        """内部のTreeviewにフォーカスを移動する。"""
+        self.tree.focus_set()
+
+    # データ操作
+
+    def set_items(self, items):
+        """
+        表示するデータ全体を置き換える。
+
+        Args:
+            items (list): 表示する名前のリスト。
+        """
+        self.items = list(items)
+        self.selected_index = None
+        self.top = 0
+        self._render()
+
+    def append(self, name):
+        """末尾に1件追加する。"""
+        self.insert(len(self.items), name)
+
+    def extend(self, names):
+        """
+        末尾に複数件を追加する。
+
+        追加した行が表示範囲に入る場合だけ再描画し、それ以外はスクロールバーのみ更新します。
+
+        Args:
+            names (iterable): 追加する名前の列。
+        """
+        start = len(self.items)
+        self.items.extend(names)
+        if start < self.top + self.visible_count:
+            self._render()
+        else:
+            self._update_scrollbar()
+
+    def insert(self, index, name):
+        """
+        指定した位置に1件追加する。
+
+        Args:
+            index (int): 追加する位置。
+            name (str): 追加する名前。
+        """
+        self.items.insert(index, name)
+        if self.selected_index is not None and self.selected_index >= index:
+            self.selected_index += 1
+        if index < self.top + self.visible_count:
+            self._render()
+        else:
+            self._update_scrollbar()
+
+    def remove(self, name):
+        """
+        指定した名前を1件削除する。
+
+        Args:
+            name (str): 削除する名前。
+        """
+        try:
+            index = self.items.index(name)
+        except ValueError:
+            return
+        del self.items[index]
+        if self.selected_index is not None:
+            if self.selected_index == index:
+                self.selected_index = None
+            elif self.selected_index > index:
+                self.selected_index -= 1
+        self.top = max(0, min(self.top, len(self.items) - self.visible_count))
+        self._render()
+
+    def replace(self, old_name, new_name):
+        """
+        指定した名前を別の名前に置き換える。
+
+        Args:
+            old_name (str): 置き換える名前。
+            new_name (str): 新しい名前。
+        """
+        try:
+            index = self.items.index(old_name)
+        except ValueError:
+            return
+        self.items[index] = new_name
+        if self.top <= index < self.top + self.visible_count:
+            self._render()
+
+    # 選択
+
+    def selected_name(self):
+        """
+        選択されている名前を取得する。
+
+        Returns:
+            str or None: 選択されている名前。選択がない場合はNone。
+        """
+        if self.selected_index is None:
+            return None
+        return self.items[self.selected_index]
+
+    def select(self, index):
+        """
+        指定したインデックスを選択し、表示範囲に入るようにスクロールする。
+
+        Args:
+            index (int): 選択するデータインデックス。
+        """
+        if not self.items:
+            return
+        self.selected_index = max(0, min(index, len(self.items) - 1))
+        self.see(self.selected_index)
+
+    def see(self, index):
+        """指定したインデックスが見えるようにスクロールする。"""
+        if index < self.top:
+            self.top = index
+        elif index >= self.top + self.visible_count:
+            self.top = index - self.visible_count + 1
+        self._render()
+
+    # 描画
+
+    def _render(self):
+        """表示範囲の行をTreeviewに反映する。"""
+        rows = self.tree.get_children()
+        count = max(0, min(self.visible_count, len(self.items) - self.top))
+        for i in range(len(rows), count):
+            self.tree.insert('', 'end', iid=f'row{i}')
+        if len(rows) > count:
+            self.tree.delete(*rows[count:])
+        for i in range(count):
+            self.tree.item(f'row{i}', values=(self.items[self.top + i],))
+
+        if self.selected_index is not None and self.top <= self.selected_index < self.top + count:
+            row = f'row{self.selected_index - self.top}'
+            self.tree.selection_set(row)
+            self.tree.focus(row)
+        elif self.tree.selection():
+            self.tree.selection_remove(*self.tree.selection())
+        self._update_scrollbar()
+
+    def _update_scrollbar(self):
+        """スクロールバーの位置を更新する。"""
+        if not self.items:
+            self.scrollbar.set(0, 1)
+            return
+        total = len(self.items)
+        self.scrollbar.set(self.top / total, min(1.0, (self.top + self.visible_count) / total))
+
+    def _scroll_to(self, top):
+        """先頭のデータインデックスを変更して再描画する。"""
+        top = max(0, min(top, len(self.items) - self.visible_count))
+        if top != self.top:
+            self.top = top
+            self._render()
+
+    def _scroll_units(self, units):
+        self._scroll_to(self.top + units)
+        return 'break'
+
+    # イベントハンドラ
+
+    def _on_configure(self, event):
+        """ウィジェットの高さから表示する行数を計算する。"""
+        visible_count = max(1, event.height // self.row_height)
+        if visible_count != self.visible_count:
+            self.visible_count = visible_count
+            self.top = max(0, min(self.top, len(self.items) - self.visible_count))
+            self._render()
+
+    def _on_scrollbar(self, *args):
+        """スクロールバーの操作を処理する。"""
+        if args[0] == 'moveto':
+            self._scroll_to(int(float(args[1]) * len(self.items)))
+        elif args[0] == 'scroll':
+            amount = int(args[1])
+            if args[2] == 'pages':
+                amount *= self.visible_count
+            self._scroll_to(self.top + amount)
+
+    def _on_mousewheel(self, event):
+        return self._scroll_units(-3 * (event.delta // 120))
+
+    def _on_tree_select(self, event):
+        """クリックなどで選択された行をデータインデックスに変換する。"""
+        selection = self.tree.selection()
+        if selection:
+            index = self.top + self.tree.index(selection[0])
+            if index < len(self.items):
+                self.selected_index = index
+
+    def _on_key(self, event):
+        """
+        リストをキーボードでナビゲートする。
+
+        上下キーで選択を移動し、リストの端でループしないようにします。
+        選択がない状態では最初の項目を選択します。
+        """
+        if not self.items:
+            return 'break'
+        if self.selected_index is None:
+            self.select(0)
+            return 'break'
+        steps = {
+            'Up': -1,
+            'Down': 1,
+            'Prior': -self.visible_count,
+            'Next': self.visible_count,
+            'Home': -len(self.items),
+            'End': len(self.items),
+        }
+        self.select(self.selected_index + steps[event.keysym])
+        return 'break'